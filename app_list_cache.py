@@ -0,0 +1,163 @@
+import json
+import time
+import zlib
+from collections import OrderedDict, namedtuple
+
+# Maximum number of app nodes kept, least recently used pages are evicted
+# with their apps until the cache is back under the limit
+CACHE_MAX_APPS = 10000
+
+# Seconds a cached page is served without revalidation
+CACHE_MAX_AGE = 0
+
+# Seconds after CACHE_MAX_AGE during which a stale page is still served right
+# away while it is revalidated, older pages are fetched before rendering
+CACHE_STALE_WHILE_REVALIDATE = 600
+
+CachedPage = namedtuple("CachedPage", ["app_ids", "fetched_at"])
+
+
+def change_fingerprint(node):
+    """
+    CRC32 of everything the change indicator query returns for an app, its
+    fields, deliveries and their attempts: any change to what the app list
+    page displays changes the fingerprint.
+    """
+    return zlib.crc32(json.dumps(node, sort_keys=True).encode())
+
+
+def cursors_from_edges(edges, page_size):
+    """
+    Cursors the pages of page_size apps start after, derived from the edge
+    cursors of the whole list. Matches what the cursor walk collects: the
+    first page starts at None and the walk ends with an empty page.
+    """
+    cursors = [None]
+    cursors.extend(edge["cursor"] for edge in edges[page_size - 1 :: page_size])
+    if len(edges) % page_size:
+        cursors.append(edges[-1]["cursor"])
+    return cursors
+
+
+class AppListCache:
+    """
+    Bounded LRU cache of app list pages. App edges are stored once by app
+    ID, pages map the cursor they were fetched with to the IDs of their
+    apps. A page is fresh for max_age seconds, then stale for
+    stale_while_revalidate seconds: it is served immediately and kept when
+    the change indicator fingerprints of its apps match the previous visit,
+    otherwise it is fetched again. Older pages are expired and fetched
+    before the list is rendered.
+    """
+
+    def __init__(
+        self,
+        max_apps=CACHE_MAX_APPS,
+        max_age=CACHE_MAX_AGE,
+        stale_while_revalidate=CACHE_STALE_WHILE_REVALIDATE,
+    ):
+        self.max_apps = max_apps
+        self.max_age = max_age
+        self.stale_while_revalidate = stale_while_revalidate
+        # app id -> edge
+        self.apps = {}
+        # cursor -> CachedPage, least recently used first
+        self.pages = OrderedDict()
+        # app id -> change indicator fingerprint, as of the last walk
+        self.signals = {}
+        # Page cursors in list order, as of the last full walk
+        self.cursors = []
+        self.start_visit()
+
+    def start_visit(self):
+        """Reset the per-visit counters"""
+        self.hits = 0
+        self.misses = 0
+        # Pages rendered from the cache before they were revalidated
+        self.stale_served = 0
+
+    def clear(self):
+        self.apps.clear()
+        self.pages.clear()
+        self.signals.clear()
+        self.cursors = []
+
+    @property
+    def hit_rate(self):
+        pages = self.hits + self.misses
+        return self.hits / pages if pages else None
+
+    def store_page(self, cursor, edges, now=None):
+        """Cache the edges fetched for the page starting after cursor"""
+        previous = self.pages.pop(cursor, None)
+        app_ids = tuple((edge.get("node") or {}).get("id") for edge in edges)
+        if previous is not None:
+            for app_id in set(previous.app_ids) - set(app_ids):
+                self.apps.pop(app_id, None)
+        for app_id, edge in zip(app_ids, edges):
+            self.apps[app_id] = edge
+        self.pages[cursor] = CachedPage(
+            app_ids, time.monotonic() if now is None else now
+        )
+
+        while len(self.apps) > self.max_apps and self.pages:
+            _, evicted = self.pages.popitem(last=False)
+            for app_id in evicted.app_ids:
+                self.apps.pop(app_id, None)
+
+    def store_signals(self, edges):
+        """Remember the change indicator fingerprints of a whole walk"""
+        self.signals = {
+            (edge.get("node") or {}).get("id"): change_fingerprint(
+                edge.get("node") or {}
+            )
+            for edge in edges
+        }
+
+    def state(self, cursor, now=None):
+        """Page state: fresh, stale or expired, None when it is not cached"""
+        page = self.pages.get(cursor)
+        if page is None or any(app_id not in self.apps for app_id in page.app_ids):
+            return None
+        age = (time.monotonic() if now is None else now) - page.fetched_at
+        if age <= self.max_age:
+            return "fresh"
+        if age <= self.max_age + self.stale_while_revalidate:
+            return "stale"
+        return "expired"
+
+    def all_fresh(self, now=None):
+        return bool(self.cursors) and all(
+            self.state(cursor, now) == "fresh" for cursor in self.cursors
+        )
+
+    def all_servable(self, now=None):
+        """True when every page of the last walk may be rendered before revalidation"""
+        return bool(self.cursors) and all(
+            self.state(cursor, now) in ("fresh", "stale") for cursor in self.cursors
+        )
+
+    def is_unchanged(self, cursor, indicator_edges, now=None):
+        """
+        True when a stale or fresh page holds the apps of the change
+        indicator edges walked for it and none of their fingerprints changed
+        since the last walk, the page is then marked as revalidated.
+        """
+        if self.state(cursor, now) not in ("fresh", "stale"):
+            return False
+        page = self.pages[cursor]
+        nodes = [edge.get("node") or {} for edge in indicator_edges]
+        if tuple(node.get("id") for node in nodes) != page.app_ids:
+            return False
+        for node in nodes:
+            if self.signals.get(node.get("id")) != change_fingerprint(node):
+                return False
+        self.pages[cursor] = page._replace(
+            fetched_at=time.monotonic() if now is None else now
+        )
+        return True
+
+    def page_edges(self, cursor):
+        """Cached edges of a page, most recently used last for eviction"""
+        self.pages.move_to_end(cursor)
+        return [self.apps[app_id] for app_id in self.pages[cursor].app_ids]
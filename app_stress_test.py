@@ -0,0 +1,624 @@
+"""
+Command line entry point for the stress test tools:
+
+    python3 app_stress_test.py install --count 100
+    python3 app_stress_test.py seed-webhooks --count 100 --concurrency 2
+    python3 app_stress_test.py cursors --runs 50 --page-concurrency 10
+    python3 app_stress_test.py virtual-users --users 20 --coalesce-ttl 5
+    python3 app_stress_test.py soak --hours 8 --app-list-interval 10
+    python3 app_stress_test.py replay --log requests.jsonl --speed 2
+    python3 app_stress_test.py report benchmark_results_<timestamp>.csv
+    python3 app_stress_test.py standin --apps 500 --latency 0.05
+    python3 app_stress_test.py cursors --runs 50 --local-agents 4
+    python3 app_stress_test.py agent --coordinator coordinator-host:9000
+
+Only argparse is imported up front; every subcommand imports its own module
+(and gql/aiohttp with it) when it runs, and plotting libraries are only
+loaded when a report is generated.
+"""
+
+import argparse
+import os
+import sys
+
+DEFAULT_URL = "http://localhost:8000/graphql/"
+
+
+def run_distributed(args, tool, options, graphs=True):
+    import logging
+
+    import distributed
+    from loop_monitor import run_event_loop
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    result = run_event_loop(
+        distributed.main(
+            tool,
+            options,
+            url=args.url,
+            token=args.token,
+            listen=args.listen,
+            local_agents=args.local_agents,
+            remote_agents=args.remote_agents,
+            event_loop=args.event_loop,
+            graphs=graphs,
+        ),
+        args.event_loop,
+    )
+    if result["failed_agents"] or (tool == "cursors" and not result["runs"]):
+        sys.exit(1)
+
+
+def run_install(args):
+    options = dict(
+        count=args.count,
+        concurrency=args.concurrency,
+        manifest_url=args.manifest_url,
+        delay=args.delay,
+    )
+    if args.local_agents or args.remote_agents:
+        return run_distributed(args, "install", options)
+
+    import mass_install
+    from loop_monitor import run_event_loop
+
+    run_event_loop(
+        mass_install.main(url=args.url, token=args.token, **options), args.event_loop
+    )
+
+
+def run_seed_webhooks(args):
+    options = dict(
+        count=args.count,
+        concurrency=args.concurrency,
+        target_url=args.target_url,
+        delay=args.delay,
+    )
+    if args.local_agents or args.remote_agents:
+        return run_distributed(args, "seed-webhooks", options)
+
+    import mass_create_webhook
+    from loop_monitor import run_event_loop
+
+    run_event_loop(
+        mass_create_webhook.main(url=args.url, token=args.token, **options),
+        args.event_loop,
+    )
+
+
+def run_cursors(args):
+    options = dict(
+        num_runs=args.runs,
+        page_concurrency=args.page_concurrency,
+        retain_payloads=args.retain_payloads,
+        compression=args.compression,
+        persisted_queries=args.persisted_queries,
+        app_cache=args.app_cache,
+        fetch_strategy=args.fetch_strategy,
+        batch_sizes=args.batch_size,
+        batch_concurrency=args.batch_concurrency,
+        warmup_runs=args.warmup_runs,
+        warmup_seconds=args.warmup_seconds,
+        steady_state=args.steady_state,
+    )
+    if args.local_agents or args.remote_agents:
+        # Agents report their metrics to the coordinator instead of serving them
+        return run_distributed(args, "cursors", options, graphs=not args.no_graphs)
+
+    from datetime import datetime
+
+    import cursors_benchmark
+    from harness_profiler import profile_run
+    from loop_monitor import run_event_loop
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    with profile_run(f"benchmark_profile_{timestamp}", args.profile):
+        run_event_loop(
+            cursors_benchmark.main(
+                url=args.url,
+                token=args.token,
+                graphs=not args.no_graphs,
+                metrics_port=args.metrics_port,
+                metrics_snapshots=args.metrics_snapshots,
+                **options,
+            ),
+            args.event_loop,
+        )
+
+
+def run_soak(args):
+    import soak
+    from loop_monitor import run_event_loop
+
+    run_event_loop(
+        soak.main(
+            url=args.url,
+            token=args.token,
+            duration=args.hours * 3600,
+            app_list_interval=args.app_list_interval,
+            delivery_interval=args.delivery_interval,
+            window=args.window,
+            report_interval=args.report_interval,
+            max_p99_drift=args.max_p99_drift / 100,
+            max_memory_drift=args.max_memory_drift / 100,
+            page_concurrency=args.page_concurrency,
+            compression=args.compression,
+            persisted_queries=args.persisted_queries,
+            fetch_strategy=args.fetch_strategy,
+            batch_size=args.batch_size,
+            metrics_port=args.metrics_port,
+            delivery_timeout=args.delivery_timeout,
+            app_ids_refresh_interval=args.app_ids_refresh_interval,
+        ),
+        args.event_loop,
+    )
+
+
+def run_virtual_users(args):
+    import virtual_users
+    from loop_monitor import run_event_loop
+
+    run_event_loop(
+        virtual_users.main(
+            url=args.url,
+            token=args.token,
+            users=args.users,
+            rounds=args.rounds,
+            stagger=args.stagger,
+            ttl=args.coalesce_ttl,
+            page_concurrency=args.page_concurrency,
+            compression=args.compression,
+        ),
+        args.event_loop,
+    )
+
+
+def run_agent(args):
+    import logging
+
+    import distributed
+    from loop_monitor import run_event_loop
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    run_event_loop(
+        distributed.run_agent(args.coordinator, args.name, args.url, args.token),
+        args.event_loop,
+    )
+
+
+def run_replay(args):
+    import replay_requests
+    from loop_monitor import run_event_loop
+
+    run_event_loop(
+        replay_requests.main(
+            url=args.url,
+            token=args.token,
+            log_path=args.log,
+            speed=args.speed,
+            max_in_flight=args.max_in_flight,
+        ),
+        args.event_loop,
+    )
+
+
+def run_standin(args):
+    import logging
+
+    import standin_server
+    from loop_monitor import run_event_loop
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    run_event_loop(
+        standin_server.main(
+            host=args.host,
+            port=args.port,
+            num_apps=args.apps,
+            num_plugins=args.plugins,
+            latency=args.latency,
+            latency_jitter=args.latency_jitter,
+            rate_limit_every=args.rate_limit_every,
+            server_error_every=args.server_error_every,
+            change_every=args.change_every,
+            delivery_latency=args.delivery_latency,
+            persisted_queries=not args.no_persisted_queries,
+        ),
+        args.event_loop,
+    )
+
+
+def run_report(args):
+    import logging
+
+    from benchmark_report import generate_graphs, load_results_csv
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    samples_file = args.samples
+    if samples_file is None:
+        # benchmark_results_<timestamp>.csv -> benchmark_samples_<timestamp>.bin
+        candidate = args.results.replace("_results_", "_samples_").replace(
+            ".csv", ".bin"
+        )
+        if os.path.exists(candidate) and os.path.exists(f"{candidate}.json"):
+            samples_file = candidate
+
+    output_dir = args.output_dir or os.path.splitext(args.results)[0].replace(
+        "_results_", "_graphs_"
+    )
+    stats = generate_graphs(load_results_csv(args.results), output_dir, samples_file)
+    for category, values in (stats or {}).items():
+        print(f"{category}:")
+        for stat_name, stat_value in values.items():
+            print(f"  {stat_name}: {stat_value:.4f}s")
+
+
+def add_agent_arguments(parser):
+    group = parser.add_argument_group("distributed load generation")
+    group.add_argument(
+        "--local-agents",
+        type=int,
+        default=0,
+        help="split the work between this many agent processes on this host",
+    )
+    group.add_argument(
+        "--remote-agents",
+        type=int,
+        default=0,
+        help="also wait for this many agents started with the agent command elsewhere",
+    )
+    group.add_argument(
+        "--listen",
+        default="127.0.0.1:0",
+        help="coordinator address, e.g. 0.0.0.0:9000 to accept remote agents",
+    )
+
+
+def compression_mode(value):
+    """--compression value, br responses can only be decoded with brotli installed"""
+    if value in ("br", "all"):
+        try:
+            import brotli  # noqa: F401
+        except ImportError:
+            raise argparse.ArgumentTypeError(
+                f"{value} requires brotli: pip install brotli "
+                "(or poetry install --extras brotli)"
+            )
+    return value
+
+
+def build_parser():
+    # Defaults are repeated here instead of being read from the tool modules,
+    # importing those would load gql for every invocation (including --help)
+    parser = argparse.ArgumentParser(
+        prog="app_stress_test.py", description="Saleor app list stress test tools"
+    )
+    parser.add_argument(
+        "--url",
+        default=os.environ.get("SALEOR_GRAPHQL_URL", DEFAULT_URL),
+        help="Saleor GraphQL API URL (default: $SALEOR_GRAPHQL_URL)",
+    )
+    parser.add_argument(
+        "--token",
+        default=os.environ.get("AUTH_TOKEN"),
+        help="staff user token (default: $AUTH_TOKEN)",
+    )
+    parser.add_argument(
+        "--event-loop",
+        choices=("asyncio", "uvloop"),
+        default=os.environ.get("EVENT_LOOP", "asyncio"),
+        help="event loop implementation (default: $EVENT_LOOP or asyncio)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    install = subparsers.add_parser("install", help="install the test app many times")
+    install.add_argument("--count", type=int, default=30)
+    install.add_argument("--concurrency", type=int, default=1)
+    install.add_argument(
+        "--delay", type=float, default=1, help="seconds to wait after each install"
+    )
+    install.add_argument(
+        "--manifest-url",
+        default="https://9d311d3d.saleor-app-hono-pages-template.pages.dev/api/manifest",
+    )
+    add_agent_arguments(install)
+    install.set_defaults(handler=run_install)
+
+    seed_webhooks = subparsers.add_parser(
+        "seed-webhooks", help="create local apps with one webhook each"
+    )
+    seed_webhooks.add_argument("--count", type=int, default=100)
+    seed_webhooks.add_argument("--concurrency", type=int, default=2)
+    seed_webhooks.add_argument(
+        "--delay", type=float, default=1, help="seconds to wait after each app"
+    )
+    seed_webhooks.add_argument("--target-url", default="https://example.com")
+    add_agent_arguments(seed_webhooks)
+    seed_webhooks.set_defaults(handler=run_seed_webhooks)
+
+    cursors = subparsers.add_parser(
+        "cursors", help="run the cursor pagination benchmark"
+    )
+    cursors.add_argument("--runs", type=int, default=50, help="measured runs")
+    cursors.add_argument(
+        "--warmup-runs",
+        type=int,
+        default=int(os.environ.get("WARMUP_RUNS", 0)),
+        help="runs excluded from the statistics before measuring",
+    )
+    cursors.add_argument(
+        "--warmup-seconds",
+        type=float,
+        default=float(os.environ.get("WARMUP_SECONDS", 0)),
+        help="keep warming up for at least this many seconds",
+    )
+    cursors.add_argument(
+        "--steady-state",
+        action="store_true",
+        default=bool(os.environ.get("STEADY_STATE")),
+        help="after the warm-up, keep warming up until the rolling median of run times stabilises",
+    )
+    cursors.add_argument(
+        "--page-concurrency",
+        type=int,
+        default=10,
+        help="page requests running concurrently",
+    )
+    cursors.add_argument(
+        "--retain-payloads",
+        action="store_true",
+        help="keep every app node in memory and check for duplicates (validation runs)",
+    )
+    cursors.add_argument(
+        "--compression",
+        type=compression_mode,
+        choices=("none", "gzip", "br", "all"),
+        default="gzip",
+        help="Accept-Encoding to request, 'all' alternates them between runs",
+    )
+    cursors.add_argument(
+        "--persisted-queries",
+        action="store_true",
+        default=bool(os.environ.get("PERSISTED_QUERIES")),
+        help="send query hashes instead of the query text (automatic persisted queries)",
+    )
+    cursors.add_argument(
+        "--app-cache",
+        action="store_true",
+        default=bool(os.environ.get("APP_CACHE")),
+        help="alternate cold full reloads with repeat visits that only re-fetch changed pages",
+    )
+    cursors.add_argument(
+        "--fetch-strategy",
+        choices=("cursors", "batched", "all"),
+        default=os.environ.get("FETCH_STRATEGY", "cursors"),
+        help="load app details per cursor page, in aliased app(id:) batches, "
+        "or alternate both between runs",
+    )
+    cursors.add_argument(
+        "--batch-size",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[25],
+        help="apps per batched request, a comma-separated list alternates the sizes",
+    )
+    cursors.add_argument(
+        "--batch-concurrency",
+        type=int,
+        default=4,
+        help="batched requests running concurrently",
+    )
+    cursors.add_argument(
+        "--no-graphs", action="store_true", help="only save the results CSV"
+    )
+    cursors.add_argument(
+        "--profile",
+        choices=("off", "cprofile", "sample"),
+        default=os.environ.get("PROFILE", "off"),
+    )
+    cursors.add_argument(
+        "--metrics-port",
+        type=int,
+        default=(
+            int(os.environ["METRICS_PORT"]) if os.environ.get("METRICS_PORT") else None
+        ),
+        help="serve Prometheus metrics on this port",
+    )
+    cursors.add_argument(
+        "--metrics-snapshots",
+        action="store_true",
+        default=bool(os.environ.get("METRICS_SNAPSHOTS")),
+        help="append metrics snapshots to benchmark_metrics_<timestamp>.jsonl",
+    )
+    add_agent_arguments(cursors)
+    cursors.set_defaults(handler=run_cursors)
+
+    users = subparsers.add_parser(
+        "virtual-users",
+        help="measure the duplicate traffic of concurrent dashboard users a "
+        "coalescing backend would eliminate",
+    )
+    users.add_argument("--users", type=int, default=20)
+    users.add_argument(
+        "--rounds", type=int, default=9, help="rounds, alternating the modes"
+    )
+    users.add_argument(
+        "--stagger",
+        type=float,
+        default=0.0,
+        help="spread the user starts of a round over this many seconds",
+    )
+    users.add_argument(
+        "--coalesce-ttl",
+        type=float,
+        default=5.0,
+        help="seconds the cache mode reuses results, 0 only compares single-flight",
+    )
+    users.add_argument("--page-concurrency", type=int, default=10)
+    users.add_argument(
+        "--compression",
+        type=compression_mode,
+        choices=("none", "gzip", "br"),
+        default="gzip",
+    )
+    users.set_defaults(handler=run_virtual_users)
+
+    soak = subparsers.add_parser(
+        "soak",
+        help="run the app list and webhook delivery workloads at a fixed rate for hours",
+    )
+    soak.add_argument("--hours", type=float, default=4, help="0 runs until interrupted")
+    soak.add_argument(
+        "--app-list-interval",
+        type=float,
+        default=10,
+        help="seconds between app list visits, 0 disables them",
+    )
+    soak.add_argument(
+        "--delivery-interval",
+        type=float,
+        default=5,
+        help="seconds between webhook delivery retries, 0 disables them",
+    )
+    soak.add_argument(
+        "--window",
+        type=float,
+        default=300,
+        help="seconds of iterations the latency percentiles are computed over",
+    )
+    soak.add_argument(
+        "--report-interval",
+        type=float,
+        default=60,
+        help="seconds between rows written to soak_<timestamp>.csv",
+    )
+    soak.add_argument(
+        "--max-p99-drift",
+        type=float,
+        default=10,
+        help="percent per hour p99 latency may rise before drift is reported",
+    )
+    soak.add_argument(
+        "--max-memory-drift",
+        type=float,
+        default=10,
+        help="percent per hour load generator memory may grow before drift is reported",
+    )
+    soak.add_argument(
+        "--delivery-timeout",
+        type=float,
+        default=120,
+        help="seconds to wait for the app to answer a retried delivery",
+    )
+    soak.add_argument(
+        "--app-ids-refresh-interval",
+        type=float,
+        default=600,
+        help="seconds between refreshes of the apps deliveries are retried for",
+    )
+    soak.add_argument("--page-concurrency", type=int, default=10)
+    soak.add_argument(
+        "--compression",
+        type=compression_mode,
+        choices=("none", "gzip", "br"),
+        default="gzip",
+    )
+    soak.add_argument("--persisted-queries", action="store_true")
+    soak.add_argument(
+        "--fetch-strategy", choices=("cursors", "batched"), default="cursors"
+    )
+    soak.add_argument("--batch-size", type=int, default=25)
+    soak.add_argument(
+        "--metrics-port", type=int, help="serve Prometheus metrics on this port"
+    )
+    soak.set_defaults(handler=run_soak)
+
+    replay = subparsers.add_parser("replay", help="replay a recorded request log")
+    replay.add_argument("--log", default="requests.jsonl")
+    replay.add_argument(
+        "--speed", type=float, default=1.0, help="timing scale, 2 = twice as fast"
+    )
+    replay.add_argument("--max-in-flight", type=int, default=10)
+    replay.set_defaults(handler=run_replay)
+
+    report = subparsers.add_parser(
+        "report", help="generate graphs from a saved results CSV"
+    )
+    report.add_argument("results", help="benchmark_results_<timestamp>.csv")
+    report.add_argument(
+        "--samples",
+        help="per-request samples file (default: the matching benchmark_samples_<timestamp>.bin)",
+    )
+    report.add_argument("--output-dir")
+    report.set_defaults(handler=run_report)
+
+    standin = subparsers.add_parser(
+        "standin", help="serve a local stand-in of the Saleor API with generated apps"
+    )
+    standin.add_argument("--host", default="127.0.0.1")
+    standin.add_argument("--port", type=int, default=8000)
+    standin.add_argument("--apps", type=int, default=100)
+    standin.add_argument("--plugins", type=int, default=20)
+    standin.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to every response"
+    )
+    standin.add_argument(
+        "--latency-jitter",
+        type=float,
+        default=0.0,
+        help="up to this many extra random seconds per response",
+    )
+    standin.add_argument(
+        "--rate-limit-every",
+        type=int,
+        default=0,
+        help="answer every Nth request with 429 Too Many Requests",
+    )
+    standin.add_argument(
+        "--server-error-every",
+        type=int,
+        default=0,
+        help="answer every Nth request with 500 Internal Server Error",
+    )
+    standin.add_argument(
+        "--change-every",
+        type=int,
+        default=0,
+        help="add a failed delivery to a random app every N requests",
+    )
+    standin.add_argument(
+        "--delivery-latency",
+        type=float,
+        default=0.0,
+        help="seconds a retried delivery stays pending, like a webhook handler call",
+    )
+    standin.add_argument(
+        "--no-persisted-queries",
+        action="store_true",
+        help="reject query hashes like a server without persisted query support",
+    )
+    standin.set_defaults(handler=run_standin)
+
+    agent = subparsers.add_parser(
+        "agent", help="run load for a coordinator started with --remote-agents"
+    )
+    agent.add_argument("--coordinator", required=True, help="coordinator host:port")
+    agent.add_argument("--name", help="agent name in the merged report")
+    agent.set_defaults(handler=run_agent)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,657 @@
+import csv
+import json
+import logging
+import os
+
+import matplotlib
+
+# Render without a display, reports are generated on servers and in CI
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Report category -> result column
+TIME_COLUMNS = {
+    "Cursor Fetching": "cursor_fetch_time",
+    "Data Fetching": "data_fetch_time",
+    "Total Execution": "total_execution_time",
+}
+
+FLAG_COLUMNS = (
+    "rate_limited_during_cursors",
+    "rate_limited_during_data",
+    "generator_saturated",
+)
+
+# Percentiles reported for every timing
+PERCENTILES = (50, 90, 99)
+
+# Bins of the per-operation latency histograms
+HISTOGRAM_BINS = 60
+
+# Width in seconds of the windows the error rate time series is counted in
+ERROR_RATE_INTERVAL = 10
+
+
+def _to_float(value):
+    if value is None or value == "":
+        return np.nan
+    return float(value)
+
+
+def _to_bool(value):
+    return value is True or value == "True"
+
+
+def fetch_strategy_label(result):
+    """cursors, or batched xN for aliased batches of N apps"""
+    strategy = result.get("fetch_strategy") or "cursors"
+    if strategy == "batched":
+        return f"batched x{result.get('batch_size')}"
+    return strategy
+
+
+def results_to_arrays(results):
+    """
+    Convert benchmark result dicts (or rows read back from the results CSV)
+    into one NumPy array per column. Missing timings become NaN.
+    """
+    count = len(results)
+    columns = {
+        name: np.fromiter(
+            (_to_float(r.get(name)) for r in results), dtype=np.float64, count=count
+        )
+        for name in ("run_number", "run_start", "num_requests", *TIME_COLUMNS.values())
+    }
+    # errors_<category> counts, for the error rate when there are no samples
+    for name in dict.fromkeys(k for r in results for k in r if k.startswith("errors_")):
+        columns[name] = np.fromiter(
+            (_to_float(r.get(name)) for r in results), dtype=np.float64, count=count
+        )
+    for name in FLAG_COLUMNS:
+        columns[name] = np.fromiter(
+            (_to_bool(r.get(name)) for r in results), dtype=bool, count=count
+        )
+    columns["error"] = np.fromiter(
+        (r.get("error") not in (None, "") for r in results), dtype=bool, count=count
+    )
+    columns["warmup"] = np.fromiter(
+        (r.get("phase") == "warmup" for r in results), dtype=bool, count=count
+    )
+    columns["fetch_strategy"] = np.array(
+        [fetch_strategy_label(r) for r in results], dtype=str
+    )
+    return columns
+
+
+def load_results_csv(filename):
+    """Load a results CSV written by save_results_to_csv into column arrays"""
+    with open(filename, newline="") as csvfile:
+        return results_to_arrays(list(csv.DictReader(csvfile)))
+
+
+def load_samples(filename):
+    """
+    Memory-map a per-request samples file written by RequestSamples.
+    Returns (samples, sidecar) where samples maps every field listed in the
+    sidecar to a column view of the file, and sidecar holds the operation and
+    encoding names the samples refer to.
+    """
+    with open(f"{filename}.json") as sidecar_file:
+        sidecar = json.load(sidecar_file)
+    fields = sidecar["fields"]
+
+    if os.path.getsize(filename) == 0:
+        rows = np.empty((0, len(fields)))
+    else:
+        rows = np.memmap(filename, dtype=np.float64, mode="r").reshape(-1, len(fields))
+    return {field: rows[:, index] for index, field in enumerate(fields)}, sidecar
+
+
+def valid_mask(columns, include_warmup=False):
+    """Measured runs without errors, rate limiting or missing timings"""
+    mask = ~columns["error"]
+    mask &= ~columns["rate_limited_during_cursors"]
+    mask &= ~columns["rate_limited_during_data"]
+    for name in TIME_COLUMNS.values():
+        mask &= np.isfinite(columns[name])
+    if not include_warmup:
+        mask &= ~columns["warmup"]
+    return mask
+
+
+def describe(values):
+    """min/max/mean/median and PERCENTILES of values in a single pass"""
+    quantiles = np.percentile(values, (0, *PERCENTILES, 100))
+    stats = {
+        "min": quantiles[0],
+        "max": quantiles[-1],
+        "mean": values.mean(),
+        "median": quantiles[1],
+    }
+    for percentile, value in zip(PERCENTILES[1:], quantiles[2:-1]):
+        stats[f"p{percentile}"] = value
+    return {name: float(value) for name, value in stats.items()}
+
+
+def per_run_percentiles(run_numbers, latencies, percentile):
+    """
+    Percentile of latencies within every run, computed with one lexsort
+    instead of a Python loop over runs. Returns (runs, values).
+    """
+    order = np.lexsort((latencies, run_numbers))
+    sorted_runs = run_numbers[order]
+    sorted_latencies = latencies[order]
+    runs, starts, counts = np.unique(sorted_runs, return_index=True, return_counts=True)
+    positions = starts + np.floor((counts - 1) * percentile / 100).astype(np.int64)
+    return runs, sorted_latencies[positions]
+
+
+def succeeded(samples):
+    """Mask of the samples of successful requests"""
+    if "error" not in samples:
+        return np.ones(len(samples["latency"]), dtype=bool)
+    return np.isnan(samples["error"])
+
+
+def measured(samples, warmup_runs=()):
+    """Mask of the samples recorded outside of warm-up runs"""
+    return ~np.isin(samples["run_number"], warmup_runs)
+
+
+def sample_statistics(samples, operations, errors=(), warmup_runs=()):
+    """
+    Latency and client decode time statistics per operation, and the latency
+    at which requests failed per operation and error category, both without
+    the requests of warmup_runs
+    """
+    in_measurement = measured(samples, warmup_runs)
+    ok = succeeded(samples)
+    stats = {}
+    for index, operation in enumerate(operations):
+        operation_mask = (samples["operation"] == index) & in_measurement
+        for error_index, category in enumerate(errors):
+            failed = operation_mask & (samples["error"] == error_index)
+            if failed.any():
+                stats[f"{operation} {category} failures"] = describe(
+                    np.asarray(samples["latency"][failed])
+                )
+
+        mask = operation_mask & ok
+        if not mask.any():
+            continue
+        stats[f"{operation} requests"] = describe(np.asarray(samples["latency"][mask]))
+        decode_times = samples.get("decode_time")
+        if decode_times is not None:
+            decode_times = decode_times[mask]
+            decode_times = decode_times[np.isfinite(decode_times)]
+            if decode_times.size:
+                stats[f"{operation} decoding"] = describe(np.asarray(decode_times))
+    return stats
+
+
+def _error_rate_rows(requests, failed, interval):
+    """Rows of the error rate series from per-window request and failure counts"""
+    total_failed = sum(failed.values(), np.zeros(len(requests)))
+    rows = []
+    for window in range(len(requests)):
+        rows.append(
+            {
+                "start": window * interval,
+                "requests": int(requests[window]),
+                "errors": int(total_failed[window]),
+                "error_rate": (
+                    total_failed[window] / requests[window] if requests[window] else 0.0
+                ),
+                **{
+                    category: int(counts[window]) for category, counts in failed.items()
+                },
+            }
+        )
+    return rows
+
+
+def error_rate_series(samples, errors, interval=ERROR_RATE_INTERVAL):
+    """
+    Requests, failed requests per error category and the error rate in
+    consecutive interval-second windows since the benchmark started
+    """
+    starts = np.asarray(samples["start"])
+    if not starts.size:
+        return []
+    windows = (starts // interval).astype(np.int64)
+    num_windows = int(windows.max()) + 1
+    requests = np.bincount(windows, minlength=num_windows)
+    failed = {
+        category: np.bincount(windows[samples["error"] == index], minlength=num_windows)
+        for index, category in enumerate(errors)
+    }
+    return _error_rate_rows(requests, failed, interval)
+
+
+def run_error_rate_series(columns, interval=ERROR_RATE_INTERVAL):
+    """
+    error_rate_series from the per-run results when there are no per-request
+    samples (distributed runs, results CSVs without a samples file): the
+    requests and errors_<category> counts of every run are counted in the
+    window the run started in. Returns (rows, error categories).
+    """
+    errors = [name[len("errors_") :] for name in columns if name.startswith("errors_")]
+    mask = np.isfinite(columns["run_start"]) & np.isfinite(columns["num_requests"])
+    if not errors or not mask.any():
+        return [], errors
+    windows = (columns["run_start"][mask] // interval).astype(np.int64)
+    num_windows = int(windows.max()) + 1
+    requests = np.bincount(
+        windows, weights=columns["num_requests"][mask], minlength=num_windows
+    )
+    failed = {
+        category: np.bincount(
+            windows,
+            weights=np.nan_to_num(columns[f"errors_{category}"][mask]),
+            minlength=num_windows,
+        )
+        for category in errors
+    }
+    return _error_rate_rows(requests, failed, interval), errors
+
+
+def save_error_rates(rows, output_dir):
+    with open(f"{output_dir}/error_rates.csv", "w", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def payload_statistics(samples, operations, encodings):
+    """
+    Response size and client cost per operation and Content-Encoding:
+    mean bytes on the wire, mean decoded bytes, compression ratio and the
+    median latency and decode time. Request sizes and the parse time
+    reported by the server show what persisted queries save.
+    """
+    if "compressed_bytes" not in samples:
+        return []
+    operation_ids = samples["operation"]
+    encoding_ids = samples["encoding"]
+    rows = []
+    for operation_index, operation in enumerate(operations):
+        for encoding_index, encoding in enumerate(encodings):
+            mask = (operation_ids == operation_index) & (encoding_ids == encoding_index)
+            count = int(mask.sum())
+            if not count:
+                continue
+            compressed = float(samples["compressed_bytes"][mask].mean())
+            uncompressed = float(samples["uncompressed_bytes"][mask].mean())
+            rows.append(
+                {
+                    "operation": operation,
+                    "encoding": encoding,
+                    "requests": count,
+                    "mean_compressed_bytes": compressed,
+                    "mean_uncompressed_bytes": uncompressed,
+                    "compression_ratio": (
+                        uncompressed / compressed if compressed else None
+                    ),
+                    "median_latency": float(np.median(samples["latency"][mask])),
+                    "median_decode_time": float(
+                        np.median(samples["decode_time"][mask])
+                    ),
+                    "mean_request_bytes": _finite_stat(
+                        np.mean, samples.get("request_bytes"), mask
+                    ),
+                    "median_server_parse_time": _finite_stat(
+                        np.median, samples.get("server_parse_time"), mask
+                    ),
+                }
+            )
+    return rows
+
+
+def _finite_stat(function, values, mask):
+    """function of the measured (non-NaN) values under mask, None without any"""
+    if values is None:
+        return None
+    values = values[mask]
+    values = values[np.isfinite(values)]
+    return float(function(values)) if values.size else None
+
+
+def save_payload_statistics(rows, output_dir):
+    with open(f"{output_dir}/payload_sizes.csv", "w", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+
+    for row in rows:
+        request = ""
+        if row["mean_request_bytes"] is not None:
+            request = f"{row['mean_request_bytes'] / 1024:.2f} KiB sent, "
+        if row["median_server_parse_time"] is not None:
+            request += (
+                f"median server parse {row['median_server_parse_time'] * 1000:.2f}ms, "
+            )
+        logger.info(
+            f"{row['operation']} ({row['encoding']}): {request}"
+            f"{row['mean_compressed_bytes'] / 1024:.1f} KiB on the wire, "
+            f"{row['mean_uncompressed_bytes'] / 1024:.1f} KiB decoded, "
+            f"median latency {row['median_latency']:.4f}s, "
+            f"median decode {row['median_decode_time'] * 1000:.2f}ms"
+        )
+
+
+def run_type_counts(columns):
+    """
+    Count the measured runs by type. Warm-up runs are left out of every
+    count, like they are of the clean runs.
+    """
+    measured_runs = ~columns["warmup"]
+    return {
+        "Clean Runs": int(valid_mask(columns).sum()),
+        "Rate Limited (Cursors)": int(
+            (columns["rate_limited_during_cursors"] & measured_runs).sum()
+        ),
+        "Rate Limited (Data)": int(
+            (columns["rate_limited_during_data"] & measured_runs).sum()
+        ),
+        "Error Runs": int((columns["error"] & measured_runs).sum()),
+    }
+
+
+def _save(fig, path):
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def plot_run_graphs(columns, stats, output_dir):
+    valid = valid_mask(columns)
+    times = [columns[name][valid] for name in TIME_COLUMNS.values()]
+    categories = list(TIME_COLUMNS)
+
+    # 1. Line graph showing all three timing metrics across runs, warm-up shaded
+    all_valid = valid_mask(columns, include_warmup=True)
+    fig, ax = plt.subplots(figsize=(12, 6))
+    for name, marker, label in zip(
+        TIME_COLUMNS.values(), ("o-", "s-", "^-"), categories
+    ):
+        ax.plot(
+            columns["run_number"][all_valid],
+            columns[name][all_valid],
+            marker,
+            label=label,
+        )
+    if columns["warmup"].any():
+        last_warmup = columns["run_number"][columns["warmup"]].max()
+        ax.axvspan(0.5, last_warmup + 0.5, color="grey", alpha=0.2, label="Warm-up")
+    ax.set_xlabel("Run Number")
+    ax.set_ylabel("Time (seconds)")
+    ax.set_title("GraphQL Query Performance Across Runs")
+    ax.legend()
+    ax.grid(True, linestyle="--", alpha=0.7)
+    _save(fig, f"{output_dir}/performance_across_runs.png")
+
+    # 2. Bar chart comparing min, median, p99 and max times for each phase
+    x = np.arange(len(categories))
+    width = 0.2
+    fig, ax = plt.subplots(figsize=(12, 6))
+    for offset, stat_name, label in zip(
+        (-1.5, -0.5, 0.5, 1.5),
+        ("min", "median", "p99", "max"),
+        ("Min", "Median", "P99", "Max"),
+    ):
+        ax.bar(
+            x + offset * width,
+            [stats[c][stat_name] for c in categories],
+            width,
+            label=label,
+        )
+    ax.set_xlabel("Operation")
+    ax.set_ylabel("Time (seconds)")
+    ax.set_title("Min, Median, P99 and Max Execution Times")
+    ax.set_xticks(x, categories)
+    ax.legend()
+    ax.grid(True, linestyle="--", alpha=0.7, axis="y")
+    _save(fig, f"{output_dir}/min_median_max_comparison.png")
+
+    # 3. Pie chart showing proportion of time spent in each phase (using median values)
+    median_cursor = stats["Cursor Fetching"]["median"]
+    median_data = stats["Data Fetching"]["median"]
+    # "Other time" is overhead not in the two main phases
+    median_other = max(
+        0, stats["Total Execution"]["median"] - (median_cursor + median_data)
+    )
+    fig, ax = plt.subplots(figsize=(10, 8))
+    ax.pie(
+        [median_cursor, median_data, median_other],
+        labels=["Cursor Fetching", "Data Fetching", "Other Operations"],
+        autopct="%1.1f%%",
+        startangle=90,
+        shadow=True,
+        explode=(0.05, 0.05, 0.05),
+    )
+    ax.axis("equal")
+    ax.set_title("Proportion of Time Spent in Each Phase (Median Values)")
+    _save(fig, f"{output_dir}/time_proportion_pie.png")
+
+    # 4. Box plot showing distribution of times
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.boxplot(times, tick_labels=categories)
+    ax.set_ylabel("Time (seconds)")
+    ax.set_title("Distribution of Execution Times")
+    ax.grid(True, linestyle="--", alpha=0.7, axis="y")
+    _save(fig, f"{output_dir}/time_distribution_boxplot.png")
+
+    # 4b. Warm-up and steady-state distributions side by side
+    warmup = all_valid & columns["warmup"]
+    if warmup.any():
+        fig, ax = plt.subplots(figsize=(12, 6))
+        positions = np.arange(len(categories)) * 3
+        for offset, mask, label, color in (
+            (0, warmup, "Warm-up", "tab:orange"),
+            (1, valid, "Steady state", "tab:blue"),
+        ):
+            parts = ax.boxplot(
+                [columns[name][mask] for name in TIME_COLUMNS.values()],
+                positions=positions + offset,
+                patch_artist=True,
+            )
+            for box in parts["boxes"]:
+                box.set_facecolor(color)
+            parts["boxes"][0].set_label(label)
+        ax.set_xticks(positions + 0.5, categories)
+        ax.set_ylabel("Time (seconds)")
+        ax.set_title("Warm-up vs Steady-state Execution Times")
+        ax.legend()
+        ax.grid(True, linestyle="--", alpha=0.7, axis="y")
+        _save(fig, f"{output_dir}/warmup_vs_steady_state_boxplot.png")
+
+    # 4c. Total execution time per fetch strategy and batch size
+    strategies = list(dict.fromkeys(columns["fetch_strategy"][valid]))
+    if len(strategies) > 1:
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.boxplot(
+            [
+                columns["total_execution_time"][
+                    valid & (columns["fetch_strategy"] == strategy)
+                ]
+                for strategy in strategies
+            ],
+            tick_labels=strategies,
+        )
+        ax.set_xlabel("Fetch strategy")
+        ax.set_ylabel("Total execution time (seconds)")
+        ax.set_title("Total Execution Time by Fetch Strategy")
+        ax.grid(True, linestyle="--", alpha=0.7, axis="y")
+        _save(fig, f"{output_dir}/fetch_strategy_boxplot.png")
+
+    # 5. Success rate and rate limiting occurrences
+    counts = run_type_counts(columns)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.bar(
+        list(counts),
+        list(counts.values()),
+        color=["green", "orange", "orange", "red"],
+    )
+    ax.set_xlabel("Run Type")
+    ax.set_ylabel("Count")
+    ax.set_title("Distribution of Run Types")
+    ax.grid(True, linestyle="--", alpha=0.7, axis="y")
+    _save(fig, f"{output_dir}/run_type_distribution.png")
+
+
+def plot_sample_graphs(samples, operations, output_dir, warmup_runs=()):
+    ok = succeeded(samples) & measured(samples, warmup_runs)
+    run_numbers = samples["run_number"][ok]
+    operation_ids = samples["operation"][ok]
+    latencies = samples["latency"][ok]
+
+    # 6. Per-request p50/p99 latency of every operation across runs
+    fig, ax = plt.subplots(figsize=(12, 6))
+    for index, operation in enumerate(operations):
+        mask = operation_ids == index
+        if not mask.any():
+            continue
+        for percentile, style in ((50, "-"), (99, "--")):
+            runs, values = per_run_percentiles(
+                run_numbers[mask], latencies[mask], percentile
+            )
+            ax.plot(runs, values, style, label=f"{operation} p{percentile}")
+    ax.set_xlabel("Run Number")
+    ax.set_ylabel("Request latency (seconds)")
+    ax.set_title("Per-request Latency Across Runs")
+    ax.legend()
+    ax.grid(True, linestyle="--", alpha=0.7)
+    _save(fig, f"{output_dir}/request_latency_across_runs.png")
+
+    # 7. Latency histogram of every operation (log-spaced bins)
+    positive = latencies[latencies > 0]
+    if positive.size:
+        bins = np.geomspace(positive.min(), positive.max() * 1.001, HISTOGRAM_BINS)
+        fig, ax = plt.subplots(figsize=(12, 6))
+        for index, operation in enumerate(operations):
+            counts, edges = np.histogram(latencies[operation_ids == index], bins=bins)
+            ax.stairs(counts, edges, label=operation)
+        ax.set_xscale("log")
+        ax.set_xlabel("Request latency (seconds)")
+        ax.set_ylabel("Requests")
+        ax.set_title("Request Latency Distribution")
+        ax.legend()
+        ax.grid(True, linestyle="--", alpha=0.7)
+        _save(fig, f"{output_dir}/request_latency_histogram.png")
+
+
+def plot_error_rates(rows, errors, output_dir):
+    # 9. Error rate over time, in total and per error category
+    starts = [row["start"] for row in rows]
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(starts, [row["error_rate"] for row in rows], "k-", label="All errors")
+    for category in errors:
+        ax.plot(
+            starts,
+            [row[category] / row["requests"] if row["requests"] else 0 for row in rows],
+            "--",
+            label=category,
+        )
+    ax.set_xlabel("Time since start (seconds)")
+    ax.set_ylabel("Failed requests / requests")
+    ax.set_title(f"Error Rate per {ERROR_RATE_INTERVAL}s Window")
+    ax.legend()
+    ax.grid(True, linestyle="--", alpha=0.7)
+    _save(fig, f"{output_dir}/error_rate_over_time.png")
+
+
+def plot_payload_graphs(rows, output_dir):
+    # 8. Mean response size per operation on the wire and decoded, by encoding
+    labels = [f"{row['operation']}\n{row['encoding']}" for row in rows]
+    x = np.arange(len(rows))
+    width = 0.4
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.bar(
+        x - width / 2,
+        [row["mean_compressed_bytes"] / 1024 for row in rows],
+        width,
+        label="On the wire",
+    )
+    ax.bar(
+        x + width / 2,
+        [row["mean_uncompressed_bytes"] / 1024 for row in rows],
+        width,
+        label="Decoded",
+    )
+    ax.set_ylabel("Mean response size (KiB)")
+    ax.set_title("Response Size by Operation and Content-Encoding")
+    ax.set_xticks(x, labels)
+    ax.legend()
+    ax.grid(True, linestyle="--", alpha=0.7, axis="y")
+    _save(fig, f"{output_dir}/payload_sizes.png")
+
+
+def generate_graphs(results, output_dir="benchmark_graphs", samples_file=None):
+    """
+    Generate graphs from benchmark results (result dicts or column arrays from
+    load_results_csv) and, when samples_file is given, from the per-request
+    samples. Returns the statistics of the clean measured runs, warm-up runs
+    are reported separately under "Warm-up ..." categories.
+    """
+    columns = results if isinstance(results, dict) else results_to_arrays(results)
+    valid = valid_mask(columns)
+    warmup = valid_mask(columns, include_warmup=True) & columns["warmup"]
+    warmup_runs = columns["run_number"][columns["warmup"]]
+
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+
+    stats = {}
+    if valid.any():
+        stats = {
+            category: describe(columns[name][valid])
+            for category, name in TIME_COLUMNS.items()
+        }
+        if warmup.any():
+            for category, name in TIME_COLUMNS.items():
+                stats[f"Warm-up {category}"] = describe(columns[name][warmup])
+        strategies = list(dict.fromkeys(columns["fetch_strategy"][valid]))
+        if len(strategies) > 1:
+            for strategy in strategies:
+                mask = valid & (columns["fetch_strategy"] == strategy)
+                stats[f"Total Execution ({strategy})"] = describe(
+                    columns["total_execution_time"][mask]
+                )
+        plot_run_graphs(columns, stats, output_dir)
+    else:
+        logger.error("No valid results to generate run graphs")
+
+    error_rows = []
+    if samples_file:
+        samples, sidecar = load_samples(samples_file)
+        if len(samples["latency"]):
+            operations = sidecar["operations"]
+            errors = sidecar.get("errors", [])
+            stats.update(sample_statistics(samples, operations, errors, warmup_runs))
+            plot_sample_graphs(samples, operations, output_dir, warmup_runs)
+
+            # The error rate is reported even when nothing failed (all zeros)
+            error_rows = error_rate_series(samples, errors)
+            save_error_rates(error_rows, output_dir)
+            plot_error_rates(error_rows, errors, output_dir)
+
+            payload_rows = payload_statistics(
+                samples, operations, sidecar.get("encodings", [])
+            )
+            if payload_rows:
+                save_payload_statistics(payload_rows, output_dir)
+                plot_payload_graphs(payload_rows, output_dir)
+
+    if not error_rows:
+        error_rows, errors = run_error_rate_series(columns)
+        if error_rows:
+            save_error_rates(error_rows, output_dir)
+            plot_error_rates(error_rows, errors, output_dir)
+
+    logger.info(f"Graphs saved to {output_dir}/")
+
+    # Return statistics for display
+    return stats if valid.any() else None
@@ -1,17 +1,22 @@
 import asyncio
 import os
-from gql import gql, Client
-from gql.transport.aiohttp import AIOHTTPTransport
+from gql import gql
 import time
 import csv
-import statistics
 from datetime import datetime
-import matplotlib.pyplot as plt
-import numpy as np
 import random
 import logging
-import aiohttp
-from gql.transport.exceptions import TransportQueryError
+import statistics
+import zlib
+from collections import Counter
+from loop_monitor import LoopMonitor, run_event_loop
+from harness_profiler import PhaseCounters, profile_run
+from live_metrics import LiveMetrics, MetricsExporter
+from request_samples import RequestSamples
+from graphql_http import MeasuredSession, check_compression
+from app_list_cache import AppListCache, cursors_from_edges
+from error_taxonomy import ERROR_CATEGORIES, RATE_LIMITED, classify_error
+from steady_state import WARMUP_RUNS, WARMUP_SECONDS, WarmupController
 
 # Set up logging
 logging.basicConfig(
@@ -101,6 +106,151 @@ query Apps($cursor: String) {
 }
 """
 
+# Change indicator for the app list: 100 apps per request instead of pages
+# of 10, with the edge cursors and every field PARALLEL_QUERY displays except
+# the createdAt timestamps, which never change for a given delivery or
+# attempt ID. A new or retried delivery changes its app's fingerprint.
+CHANGES_QUERY = """
+query AppChanges($cursor: String) {
+  apps(first: 100, after: $cursor) {
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+    edges {
+      cursor
+      node {
+        id
+        name
+        created
+        isActive
+        type
+        brand {
+          logo {
+            default(format: WEBP, size: 24)
+          }
+        }
+        webhooks {
+          failedDelivers: eventDeliveries(
+            first: 1
+            filter: {status: FAILED}
+            sortBy: {field: CREATED_AT, direction: DESC}
+          ) {
+            edges {
+              node {
+                id
+                attempts(first: 1, sortBy: {field: CREATED_AT, direction: DESC}) {
+                  edges {
+                    node {
+                      id
+                      status
+                    }
+                  }
+                }
+              }
+            }
+          }
+          pendingDelivers: eventDeliveries(
+            first: 6
+            filter: {status: PENDING}
+            sortBy: {field: CREATED_AT, direction: DESC}
+          ) {
+            edges {
+              node {
+                id
+                attempts(first: 6, sortBy: {field: CREATED_AT, direction: DESC}) {
+                  edges {
+                    node {
+                      id
+                      status
+                    }
+                  }
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+# Lean query listing only app IDs, at the largest page size Saleor allows
+APP_IDS_QUERY = """
+query AppIds($cursor: String) {
+  apps(first: 100, after: $cursor) {
+    pageInfo {
+      endCursor
+    }
+    edges {
+      node {
+        id
+      }
+    }
+  }
+}
+"""
+
+# App fields of the batched strategy, the same as the nodes of PARALLEL_QUERY
+APP_DETAILS_FRAGMENT = """
+fragment AppDetails on App {
+  id
+  name
+  created
+  isActive
+  type
+  brand {
+    logo {
+      default(format: WEBP, size: 24)
+    }
+  }
+  webhooks {
+    failedDelivers: eventDeliveries(
+      first: 1
+      filter: {status: FAILED}
+      sortBy: {field: CREATED_AT, direction: DESC}
+    ) {
+      edges {
+        node {
+          id
+          createdAt
+          attempts(first: 1, sortBy: {field: CREATED_AT, direction: DESC}) {
+            edges {
+              node {
+                id
+                status
+                createdAt
+              }
+            }
+          }
+        }
+      }
+    }
+    pendingDelivers: eventDeliveries(
+      first: 6
+      filter: {status: PENDING}
+      sortBy: {field: CREATED_AT, direction: DESC}
+    ) {
+      edges {
+        node {
+          id
+          attempts(first: 6, sortBy: {field: CREATED_AT, direction: DESC}) {
+            edges {
+              node {
+                id
+                status
+                createdAt
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
 # Query for fetching plugins data
 PLUGINS_QUERY = """
 query Plugins {
@@ -124,66 +274,160 @@ query Plugins {
 # Number of times to run the benchmark
 NUM_RUNS = 50
 
+# Apps per page of SEQUENTIAL_QUERY and PARALLEL_QUERY
+APP_PAGE_SIZE = 10
+
+# Maximum number of page requests running concurrently
+PAGE_CONCURRENCY = 10
+
+# Accept-Encoding mode ("none", "gzip" or "br"), "all" alternates them between runs
+COMPRESSION = "gzip"
+COMPRESSION_MODES = ("none", "gzip", "br")
+
+# How app details are loaded: "cursors" (walk the cursors, then one request
+# per page of 10), "batched" (list all IDs, then aliased app(id:) documents)
+# or "all" (alternate cursors and every batch size between runs)
+FETCH_STRATEGY = "cursors"
+FETCH_STRATEGIES = ("cursors", "batched", "all")
+
+# Apps per AppBatch document, and AppBatch documents in flight
+BATCH_SIZES = (25,)
+BATCH_CONCURRENCY = 4
+
 # Retry configuration
 MAX_RETRIES = 5
 BASE_BACKOFF_TIME = 20  # Base time in seconds
 MAX_BACKOFF_TIME = 120  # Maximum backoff time in seconds
 JITTER_FACTOR = 0.2  # Add randomness to backoff time
 
-fetch_cursors_query = gql(SEQUENTIAL_QUERY)
-fetch_details_query = gql(PARALLEL_QUERY)
-fetch_plugins_query = gql(PLUGINS_QUERY)
+# Time spent by the harness itself, saved next to the latency results
+phase_counters = PhaseCounters()
+
+with phase_counters.measure("gql_parse"):
+    fetch_cursors_query = gql(SEQUENTIAL_QUERY)
+    fetch_details_query = gql(PARALLEL_QUERY)
+    fetch_plugins_query = gql(PLUGINS_QUERY)
+    fetch_changes_query = gql(CHANGES_QUERY)
+    fetch_app_ids_query = gql(APP_IDS_QUERY)
+
+# Parsed AppBatch documents by batch size, built on first use
+batch_queries = {}
+
+# Samples event-loop lag, CPU usage and in-flight requests during each run
+loop_monitor = LoopMonitor()
+
+# Counters and latency histograms exported while the benchmark is running
+live_metrics = LiveMetrics()
+live_metrics.in_flight_source = lambda: loop_monitor.in_flight
+
+# Latency of every single request, memory-mapped by the report
+request_samples = RequestSamples()
+
+# Failed requests of the current run per error category
+run_errors = Counter()
+
+
+def run_error_counts():
+    """errors_<category> result columns of the current run"""
+    return {f"errors_{category}": run_errors[category] for category in ERROR_CATEGORIES}
+
+
+def app_batch_query(batch_size):
+    """
+    Parsed AppBatch document fetching batch_size apps by ID, every app under
+    its own alias (app0, app1, ...) with the variables $id0, $id1, ...
+    """
+    if batch_size not in batch_queries:
+        variables = ", ".join(f"$id{index}: ID!" for index in range(batch_size))
+        fields = "\n".join(
+            f"  app{index}: app(id: $id{index}) {{\n    ...AppDetails\n  }}"
+            for index in range(batch_size)
+        )
+        with phase_counters.measure("gql_parse"):
+            batch_queries[batch_size] = gql(
+                f"query AppBatch({variables}) {{\n{fields}\n}}\n{APP_DETAILS_FRAGMENT}"
+            )
+    return batch_queries[batch_size]
+
+
+def fetch_variants(fetch_strategy=FETCH_STRATEGY, batch_sizes=BATCH_SIZES):
+    """(strategy, batch size) of the runs in the order they are interleaved"""
+    variants = []
+    if fetch_strategy in ("cursors", "all"):
+        variants.append(("cursors", None))
+    if fetch_strategy in ("batched", "all"):
+        variants.extend(("batched", batch_size) for batch_size in batch_sizes)
+    return variants
+
+
+def operation_name(document):
+    """Return the name of the first operation defined in a parsed query"""
+    definition = document.definitions[0]
+    return definition.name.value if definition.name else "anonymous"
+
+
+class ResultAggregator:
+    """
+    Counts and checksums app and plugin nodes as each response arrives, so
+    the payloads can be dropped right away. The checksum sums the CRC32 of
+    every node ID modulo 2**32, so it does not depend on the order pages
+    complete in but does change when an app is duplicated or dropped.
+    With retain_payloads the nodes are also kept for validation runs.
+    """
+
+    def __init__(self, retain_payloads=False):
+        self.retain_payloads = retain_payloads
+        self.num_apps = 0
+        self.num_plugins = 0
+        self.num_deliveries = 0
+        self.apps_checksum = 0
+        self.apps = []
+        self.plugins = []
+
+    def add_apps(self, edges):
+        with phase_counters.measure("aggregation"):
+            for edge in edges:
+                node = edge.get("node") or {}
+                self.num_apps += 1
+                self.apps_checksum = (
+                    self.apps_checksum + zlib.crc32(str(node.get("id")).encode())
+                ) % 2**32
+                for webhook in node.get("webhooks") or []:
+                    for deliveries in ("failedDelivers", "pendingDelivers"):
+                        self.num_deliveries += len(
+                            (webhook.get(deliveries) or {}).get("edges") or []
+                        )
+                if self.retain_payloads:
+                    self.apps.append(node)
+
+    def add_plugins(self, edges):
+        with phase_counters.measure("aggregation"):
+            self.num_plugins += len(edges)
+            if self.retain_payloads:
+                self.plugins.extend(edge.get("node", {}) for edge in edges)
+
+    def duplicate_apps(self):
+        """Number of app nodes returned more than once (only with retained payloads)"""
+        if not self.retain_payloads:
+            return None
+        return len(self.apps) - len({app.get("id") for app in self.apps})
 
 
 class RateLimitException(Exception):
-    """Custom exception to indicate rate limiting occurred during execution"""
-
-    pass
-
-
-def is_rate_limit_error(error):
-    """Check if an error is a rate limit error (429 Too Many Requests)"""
-    # Check different error formats
-    if isinstance(error, TransportQueryError):
-        # Check for GraphQL error format
-        if hasattr(error, "errors") and error.errors:
-            for err in error.errors:
-                if isinstance(err, dict):
-                    message = err.get("message", "")
-                    if (
-                        "429" in message
-                        or "too many requests" in message.lower()
-                        or "throttled" in message.lower()
-                    ):
-                        return True
-
-        # Check for underlying HTTP error
-        if hasattr(error, "original_error"):
-            original = error.original_error
-            if hasattr(original, "status") and original.status == 429:
-                return True
-            if hasattr(original, "message") and (
-                "429" in original.message
-                or "too many requests" in original.message.lower()
-            ):
-                return True
-
-    # Check for aiohttp ClientResponseError
-    if isinstance(error, aiohttp.ClientResponseError) and error.status == 429:
-        return True
-
-    # Check for string representation containing 429
-    error_str = str(error).lower()
-    return (
-        "429" in error_str
-        or "too many requests" in error_str
-        or "throttled" in error_str
-    )
+    """
+    Custom exception to indicate rate limiting occurred during execution,
+    result holds the data of the request that eventually succeeded
+    """
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
 
 
 async def execute_with_retry(session, query, variables=None):
     """
     Execute a GraphQL query with retry logic for rate limiting.
+    Every failed attempt is classified and counted per operation and category.
     Raises RateLimitException if rate limiting occurred during execution.
     """
     if variables is None:
@@ -191,17 +435,26 @@ async def execute_with_retry(session, query, variables=None):
 
     retries = 0
     rate_limited = False
-    result = None
+    operation = operation_name(query)
 
     while True:
+        request_start = time.perf_counter()
         try:
-            result = await session.execute(query, variable_values=variables)
-            # If we had rate limiting but eventually succeeded, signal this to the caller
-            if rate_limited:
-                raise RateLimitException("Rate limiting occurred during execution")
-            return result
+            with loop_monitor.track_request():
+                result, response_stats = await session.execute_measured(
+                    query, variable_values=variables
+                )
         except Exception as e:
-            if is_rate_limit_error(e) and retries < MAX_RETRIES:
+            request_latency = time.perf_counter() - request_start
+            with phase_counters.measure("error_classification"):
+                category = classify_error(e)
+            live_metrics.observe_error(operation, category, request_latency)
+            request_samples.record(
+                operation, request_start, request_latency, error=category
+            )
+            run_errors[category] += 1
+
+            if category == RATE_LIMITED and retries < MAX_RETRIES:
                 retries += 1
                 rate_limited = True
                 # Calculate backoff time with exponential increase and jitter
@@ -211,20 +464,32 @@ async def execute_with_retry(session, query, variables=None):
                 # Add jitter (randomness) to avoid thundering herd problem
                 jitter = backoff_time * JITTER_FACTOR * random.random()
                 wait_time = backoff_time + jitter
+                live_metrics.observe_rate_limit(operation, wait_time)
 
                 logger.warning(
                     f"Rate limited (429). Retry {retries}/{MAX_RETRIES} after {wait_time:.2f}s"
                 )
                 await asyncio.sleep(wait_time)
+                continue
+
+            # Either not a rate limit error or we've exceeded max retries
+            if retries >= MAX_RETRIES:
+                logger.error(
+                    f"GraphQL query failed ({category}) after {retries} retries: {str(e)}"
+                )
             else:
-                # Either not a rate limit error or we've exceeded max retries
-                if retries >= MAX_RETRIES:
-                    logger.error(
-                        f"GraphQL query failed after {retries} retries: {str(e)}"
-                    )
-                else:
-                    logger.error(f"GraphQL query failed: {str(e)}")
-                raise
+                logger.error(f"GraphQL query failed ({category}): {str(e)}")
+            raise
+
+        request_latency = time.perf_counter() - request_start
+        live_metrics.observe_request(operation, request_latency)
+        request_samples.record(
+            operation, request_start, request_latency, response_stats
+        )
+        # If we had rate limiting but eventually succeeded, signal this to the caller
+        if rate_limited:
+            raise RateLimitException("Rate limiting occurred during execution", result)
+        return result
 
 
 async def fetch_all_cursors(session):
@@ -242,33 +507,107 @@ async def fetch_all_cursors(session):
         variables = {"cursor": current_cursor}
         try:
             result = await execute_with_retry(session, fetch_cursors_query, variables)
-            end_cursor = result["apps"]["pageInfo"]["endCursor"]
-
-            if end_cursor:
-                cursors.append(end_cursor)
-                current_cursor = end_cursor
-            else:
-                break
-        except RateLimitException:
+        except RateLimitException as e:
             was_rate_limited = True
             # Continue with the query that succeeded after rate limiting
-            if result is not None:
-                end_cursor = result["apps"]["pageInfo"]["endCursor"]
+            result = e.result
 
-                if end_cursor:
-                    cursors.append(end_cursor)
-                    current_cursor = end_cursor
-                else:
-                    break
+        end_cursor = result["apps"]["pageInfo"]["endCursor"]
+        if end_cursor:
+            cursors.append(end_cursor)
+            current_cursor = end_cursor
+        else:
+            break
 
     return cursors, was_rate_limited
 
 
-async def fetch_page_data(session, cursor, semaphore):
+async def fetch_app_signals(session):
+    """
+    Walk the whole app list with the cheap CHANGES_QUERY, 100 apps per request.
+    Returns a tuple of (edges, was_rate_limited)
+    """
+    edges = []
+    current_cursor = None
+    was_rate_limited = False
+
+    while True:
+        variables = {"cursor": current_cursor}
+        try:
+            result = await execute_with_retry(session, fetch_changes_query, variables)
+        except RateLimitException as e:
+            was_rate_limited = True
+            result = e.result
+
+        edges.extend(result["apps"]["edges"])
+        page_info = result["apps"]["pageInfo"]
+        current_cursor = page_info["endCursor"]
+        if not page_info["hasNextPage"] or not current_cursor:
+            break
+
+    return edges, was_rate_limited
+
+
+async def record_app_signals(session, app_cache):
+    """
+    Store the change indicator fingerprints a later visit is compared with,
+    run next to the page requests of a cold visit.
+    Returns a tuple of (num_edges, was_rate_limited)
+    """
+    edges, was_rate_limited = await fetch_app_signals(session)
+    app_cache.store_signals(edges)
+    return len(edges), was_rate_limited
+
+
+async def fetch_changed_pages(session, app_cache, aggregator):
+    """
+    Revalidate a warm app_cache with stale-while-revalidate semantics: when
+    every cached page is fresh or stale the list is rendered from the cache
+    right away, then the app list is walked with CHANGES_QUERY, the page
+    cursors are derived from its edge cursors and every page whose apps did
+    not change since the last walk is handed to the aggregator from the
+    cache. When every page is still fresh no request is sent at all.
+    Returns a tuple of (cursors, changed_cursors, was_rate_limited,
+    rendered_at), rendered_at is the perf_counter() value the cached list
+    was rendered at, None when it had to wait for the fetch.
+    """
+    if app_cache.all_fresh():
+        for cursor in app_cache.cursors:
+            aggregator.add_apps(app_cache.page_edges(cursor))
+        app_cache.hits += len(app_cache.cursors)
+        return list(app_cache.cursors), [], False, time.perf_counter()
+
+    rendered_at = None
+    if app_cache.all_servable():
+        # What the user sees until the revalidation below has finished
+        for cursor in app_cache.cursors:
+            app_cache.page_edges(cursor)
+        app_cache.stale_served += len(app_cache.cursors)
+        rendered_at = time.perf_counter()
+
+    edges, was_rate_limited = await fetch_app_signals(session)
+    cursors = cursors_from_edges(edges, APP_PAGE_SIZE)
+    changed_cursors = []
+    for index, cursor in enumerate(cursors):
+        page = edges[index * APP_PAGE_SIZE : (index + 1) * APP_PAGE_SIZE]
+        if app_cache.is_unchanged(cursor, page):
+            app_cache.hits += 1
+            aggregator.add_apps(app_cache.page_edges(cursor))
+        else:
+            app_cache.misses += 1
+            changed_cursors.append(cursor)
+
+    app_cache.store_signals(edges)
+    app_cache.cursors = cursors
+    return cursors, changed_cursors, was_rate_limited, rendered_at
+
+
+async def fetch_page_data(session, cursor, semaphore, aggregator, app_cache=None):
     """
     This function uses a semaphore to ensure that only a limited number of requests are running concurrently.
     It sends a GraphQL query (the PARALLEL_QUERY) that retrieves detailed data for a given cursor.
-    Returns a tuple of (edges, was_rate_limited)
+    The edges are handed to the aggregator and only kept in app_cache when one is used.
+    Returns a tuple of (num_edges, was_rate_limited)
     """
     was_rate_limited = False
 
@@ -276,56 +615,162 @@ async def fetch_page_data(session, cursor, semaphore):
         variables = {"cursor": cursor}
         try:
             result = await execute_with_retry(session, fetch_details_query, variables)
-            return result["apps"]["edges"], was_rate_limited
-        except RateLimitException:
+        except RateLimitException as e:
             was_rate_limited = True
-            # Return the result that succeeded after rate limiting
-            if result is not None:
-                return result["apps"]["edges"], was_rate_limited
-            else:
-                return [], was_rate_limited
+            # Use the result that succeeded after rate limiting
+            result = e.result
+
+    edges = result["apps"]["edges"]
+    aggregator.add_apps(edges)
+    if app_cache is not None:
+        app_cache.store_page(cursor, edges)
+    return len(edges), was_rate_limited
 
 
-async def fetch_plugins_data(session):
+async def fetch_all_app_ids(session):
+    """
+    Walks the app list with the lean APP_IDS_QUERY (100 apps per page).
+    Returns a tuple of (app_ids, num_pages, was_rate_limited)
+    """
+    app_ids = []
+    num_pages = 0
+    current_cursor = None
+    was_rate_limited = False
+
+    while True:
+        variables = {"cursor": current_cursor}
+        try:
+            result = await execute_with_retry(session, fetch_app_ids_query, variables)
+        except RateLimitException as e:
+            was_rate_limited = True
+            result = e.result
+
+        num_pages += 1
+        app_ids.extend(edge["node"]["id"] for edge in result["apps"]["edges"])
+        current_cursor = result["apps"]["pageInfo"]["endCursor"]
+        if not current_cursor:
+            break
+
+    return app_ids, num_pages, was_rate_limited
+
+
+async def fetch_app_batch(session, app_ids, semaphore, aggregator):
+    """
+    Fetches the details of app_ids with one aliased AppBatch document and
+    hands them to the aggregator as edges, apps deleted since the IDs were
+    listed are skipped.
+    Returns a tuple of (num_apps, was_rate_limited)
+    """
+    was_rate_limited = False
+
+    async with semaphore:
+        variables = {f"id{index}": app_id for index, app_id in enumerate(app_ids)}
+        try:
+            result = await execute_with_retry(
+                session, app_batch_query(len(app_ids)), variables
+            )
+        except RateLimitException as e:
+            was_rate_limited = True
+            result = e.result
+
+    edges = [
+        {"node": result[f"app{index}"]}
+        for index in range(len(app_ids))
+        if result.get(f"app{index}") is not None
+    ]
+    aggregator.add_apps(edges)
+    return len(edges), was_rate_limited
+
+
+async def fetch_plugins_data(session, aggregator):
     """
     This function fetches plugins data in parallel with the apps data.
-    Returns a tuple of (plugins_data, was_rate_limited)
+    The edges are handed to the aggregator and not kept.
+    Returns a tuple of (num_plugins, was_rate_limited)
     """
     was_rate_limited = False
 
     try:
         result = await execute_with_retry(session, fetch_plugins_query)
-        return result["plugins"]["edges"], was_rate_limited
-    except RateLimitException:
+    except RateLimitException as e:
         was_rate_limited = True
-        # Return the result that succeeded after rate limiting
-        if result is not None:
-            return result["plugins"]["edges"], was_rate_limited
-        else:
-            return [], was_rate_limited
-
-
-async def run_benchmark():
-    """Run a single benchmark and return timing statistics"""
+        # Use the result that succeeded after rate limiting
+        result = e.result
+
+    edges = result["plugins"]["edges"]
+    aggregator.add_plugins(edges)
+    return len(edges), was_rate_limited
+
+
+async def run_benchmark(
+    url,
+    token,
+    page_concurrency=PAGE_CONCURRENCY,
+    retain_payloads=False,
+    compression=COMPRESSION,
+    persisted_queries=False,
+    app_cache=None,
+    fetch_strategy="cursors",
+    batch_size=BATCH_SIZES[0],
+    batch_concurrency=BATCH_CONCURRENCY,
+):
+    """
+    Run a single benchmark and return timing statistics.
+    Response payloads are only counted and checksummed unless retain_payloads is set.
+    compression selects the Accept-Encoding sent with every request.
+    persisted_queries sends query hashes instead of the query text.
+    With an AppListCache holding a previous visit only changed pages are
+    fetched again (a warm, repeat visit), an empty one is filled (cold visit).
+    The "batched" fetch_strategy lists all app IDs first and loads the details
+    batch_size apps per request, batch_concurrency requests at a time; its ID
+    listing is timed as cursor fetching. The app cache only applies to the
+    "cursors" strategy.
+    """
     # Initialize timing variables
     cursor_fetch_time = 0
     data_fetch_time = 0
     plugins_fetch_time = 0
 
-    url = os.environ.get("SALEOR_GRAPHQL_URL", "http://localhost:8000/graphql/")
-    token = os.environ.get("AUTH_TOKEN")
-
+    aggregator = ResultAggregator(retain_payloads)
     headers = {"Authorization": f"Bearer {token}"}
-    transport = AIOHTTPTransport(url=url, headers=headers)
-    client = Client(transport=transport, fetch_schema_from_transport=False)
 
-    async with client as session:
+    if fetch_strategy != "cursors":
+        batch_size = batch_size or BATCH_SIZES[0]
+    else:
+        batch_size = None
+    if app_cache is None or fetch_strategy != "cursors":
+        app_cache = None
+        cache_mode = "off"
+    else:
+        cache_mode = "warm" if app_cache.cursors else "cold"
+        app_cache.start_visit()
+
+    run_errors.clear()
+    async with MeasuredSession(
+        url, headers, compression, persisted_queries=persisted_queries
+    ) as session:
         # Step 1: Sequentially collect all page cursors.
         cursor_fetch_start = time.perf_counter()
         rate_limited_during_cursors = False
+        rendered_at = None
 
         try:
-            cursors, rate_limited_during_cursors = await fetch_all_cursors(session)
+            loop_monitor.start()
+            if fetch_strategy == "batched":
+                app_ids, num_pages, rate_limited_during_cursors = (
+                    await fetch_all_app_ids(session)
+                )
+                cursors = range(num_pages)
+            elif cache_mode == "warm":
+                cursors, page_cursors, rate_limited_during_cursors, rendered_at = (
+                    await fetch_changed_pages(session, app_cache, aggregator)
+                )
+            else:
+                cursors, rate_limited_during_cursors = await fetch_all_cursors(session)
+                page_cursors = cursors
+                if app_cache is not None:
+                    app_cache.cursors = cursors
+                    app_cache.misses += len(cursors)
 
             # If rate limited, reset the timer for accurate measurement
             if rate_limited_during_cursors:
@@ -337,20 +782,37 @@ async def run_benchmark():
             cursor_fetch_end = time.perf_counter()
             cursor_fetch_time = cursor_fetch_end - cursor_fetch_start
 
-            logger.info(f"Collected {len(cursors)} cursors")
-
             # Step 2: Launch concurrent requests for detailed data and plugins data
             data_fetch_start = time.perf_counter()
-            semaphore = asyncio.Semaphore(10)
-
-            # Create tasks for fetching page data
             page_tasks = []
-            for cursor in cursors:
-                page_tasks.append(fetch_page_data(session, cursor, semaphore))
+            if fetch_strategy == "batched":
+                logger.info(f"Collected {len(app_ids)} app IDs from {num_pages} pages")
+                semaphore = asyncio.Semaphore(batch_concurrency)
+                for index in range(0, len(app_ids), batch_size):
+                    page_tasks.append(
+                        fetch_app_batch(
+                            session,
+                            app_ids[index : index + batch_size],
+                            semaphore,
+                            aggregator,
+                        )
+                    )
+            else:
+                logger.info(f"Collected {len(cursors)} cursors")
+                semaphore = asyncio.Semaphore(page_concurrency)
+                for cursor in page_cursors:
+                    page_tasks.append(
+                        fetch_page_data(
+                            session, cursor, semaphore, aggregator, app_cache
+                        )
+                    )
+                if cache_mode == "cold":
+                    # Baseline for the change indicator of the next visit
+                    page_tasks.append(record_app_signals(session, app_cache))
 
             # Create task for fetching plugins data
             plugins_fetch_start = time.perf_counter()
-            plugins_task = fetch_plugins_data(session)
+            plugins_task = fetch_plugins_data(session, aggregator)
 
             # Execute all tasks concurrently
             all_results = await asyncio.gather(
@@ -358,17 +820,15 @@ async def run_benchmark():
             )
 
             # Process page results
-            pages = []
             rate_limited_during_data = False
 
             # The last result is from the plugins task
-            plugins_result, plugins_rate_limited = all_results[-1]
+            _, plugins_rate_limited = all_results[-1]
             plugins_fetch_end = time.perf_counter()
             plugins_fetch_time = plugins_fetch_end - plugins_fetch_start
 
             # Process page results (all except the last one)
-            for page_data, was_rate_limited in all_results[:-1]:
-                pages.append(page_data)
+            for _, was_rate_limited in all_results[:-1]:
                 if was_rate_limited:
                     rate_limited_during_data = True
 
@@ -391,18 +851,9 @@ async def run_benchmark():
                 )
                 plugins_fetch_time = None
 
-            # Aggregate all the app nodes from each page.
-            apps = []
-            for page in pages:
-                for edge in page:
-                    node = edge.get("node", {})
-                    apps.append(node)
-
-            # Aggregate all plugin nodes
-            plugins = []
-            for edge in plugins_result:
-                node = edge.get("node", {})
-                plugins.append(node)
+            duplicate_apps = aggregator.duplicate_apps()
+            if duplicate_apps:
+                logger.warning(f"{duplicate_apps} apps were returned more than once")
 
             # Calculate total execution time only if no rate limiting occurred
             if (
@@ -414,18 +865,47 @@ async def run_benchmark():
             else:
                 total_execution_time = None
 
+            # Without stale pages to show the list renders once it is loaded
+            if rendered_at is not None:
+                first_render_time = rendered_at - cursor_fetch_start
+            else:
+                first_render_time = total_execution_time
+
             return {
                 "cursor_fetch_time": cursor_fetch_time,
                 "data_fetch_time": data_fetch_time,
                 "plugins_fetch_time": plugins_fetch_time,
                 "total_execution_time": total_execution_time,
+                "first_render_time": first_render_time,
                 "num_cursors": len(cursors),
-                "num_apps": len(apps),
-                "num_plugins": len(plugins),
+                "num_apps": aggregator.num_apps,
+                "num_plugins": aggregator.num_plugins,
+                "num_deliveries": aggregator.num_deliveries,
+                "apps_checksum": f"{aggregator.apps_checksum:08x}",
+                "compression": compression,
+                "fetch_strategy": fetch_strategy,
+                "batch_size": batch_size,
+                "num_requests": session.requests,
+                "response_bytes": session.uncompressed_bytes,
+                "response_bytes_compressed": session.compressed_bytes,
+                "decode_time": session.decode_time,
+                "persisted_queries": session.persisted_queries,
+                "request_bytes": session.request_bytes,
+                "server_parse_time": session.server_parse_time,
+                "persisted_query_misses": session.persisted_query_misses,
+                "app_cache": cache_mode,
+                "cache_hits": app_cache.hits if app_cache else None,
+                "cache_misses": app_cache.misses if app_cache else None,
+                "cache_hit_rate": app_cache.hit_rate if app_cache else None,
+                "stale_served": app_cache.stale_served if app_cache else None,
+                "duplicate_apps": duplicate_apps,
                 "rate_limited_during_cursors": rate_limited_during_cursors,
                 "rate_limited_during_data": rate_limited_during_data,
                 "rate_limited_during_plugins": plugins_rate_limited,
                 "error": None,
+                "error_category": None,
+                **run_error_counts(),
+                **(await loop_monitor.stop()),
             }
 
         except Exception as e:
@@ -435,24 +915,72 @@ async def run_benchmark():
                 "data_fetch_time": None,
                 "plugins_fetch_time": None,
                 "total_execution_time": None,
+                "first_render_time": None,
                 "num_cursors": 0,
                 "num_apps": 0,
                 "num_plugins": 0,
+                "num_deliveries": 0,
+                "apps_checksum": None,
+                "compression": compression,
+                "fetch_strategy": fetch_strategy,
+                "batch_size": batch_size,
+                "num_requests": session.requests,
+                "response_bytes": session.uncompressed_bytes,
+                "response_bytes_compressed": session.compressed_bytes,
+                "decode_time": session.decode_time,
+                "persisted_queries": session.persisted_queries,
+                "request_bytes": session.request_bytes,
+                "server_parse_time": session.server_parse_time,
+                "persisted_query_misses": session.persisted_query_misses,
+                "app_cache": cache_mode,
+                "cache_hits": app_cache.hits if app_cache else None,
+                "cache_misses": app_cache.misses if app_cache else None,
+                "cache_hit_rate": app_cache.hit_rate if app_cache else None,
+                "stale_served": app_cache.stale_served if app_cache else None,
+                "duplicate_apps": None,
                 "rate_limited_during_cursors": rate_limited_during_cursors,
                 "rate_limited_during_data": False,
                 "rate_limited_during_plugins": False,
                 "error": str(e),
+                "error_category": classify_error(e),
+                **run_error_counts(),
+                **(await loop_monitor.stop()),
             }
-
-
-async def run_benchmark_with_retry():
+        finally:
+            # Already stopped unless the run was cancelled, stop() is idempotent
+            await loop_monitor.stop()
+
+
+async def run_benchmark_with_retry(
+    url,
+    token,
+    page_concurrency=PAGE_CONCURRENCY,
+    retain_payloads=False,
+    compression=COMPRESSION,
+    persisted_queries=False,
+    app_cache=None,
+    fetch_strategy="cursors",
+    batch_size=BATCH_SIZES[0],
+    batch_concurrency=BATCH_CONCURRENCY,
+):
     """Run a single benchmark with retry logic for the entire run"""
     max_run_retries = 3
     run_retry_count = 0
 
     while run_retry_count <= max_run_retries:
         try:
-            result = await run_benchmark()
+            result = await run_benchmark(
+                url,
+                token,
+                page_concurrency,
+                retain_payloads,
+                compression,
+                persisted_queries,
+                app_cache,
+                fetch_strategy,
+                batch_size,
+                batch_concurrency,
+            )
 
             # If we got results but they were affected by rate limiting,
             # and we haven't exceeded max retries, try again
@@ -464,6 +992,7 @@ async def run_benchmark_with_retry():
                 run_retry_count += 1
                 # Calculate backoff time with exponential increase
                 backoff_time = BASE_BACKOFF_TIME * (2**run_retry_count)
+                live_metrics.backoff_seconds += backoff_time
                 logger.warning(
                     f"Results affected by rate limiting. Retrying entire run ({run_retry_count}/{max_run_retries}) after {backoff_time}s"
                 )
@@ -472,10 +1001,13 @@ async def run_benchmark_with_retry():
                 # Either no rate limiting or we've exceeded max retries
                 return result
         except Exception as e:
-            if is_rate_limit_error(e) and run_retry_count < max_run_retries:
+            with phase_counters.measure("error_classification"):
+                category = classify_error(e)
+            if category == RATE_LIMITED and run_retry_count < max_run_retries:
                 run_retry_count += 1
                 # Calculate backoff time with exponential increase
                 backoff_time = BASE_BACKOFF_TIME * (2**run_retry_count)
+                live_metrics.backoff_seconds += backoff_time
                 logger.warning(
                     f"Benchmark run failed due to rate limiting. Retrying entire run ({run_retry_count}/{max_run_retries}) after {backoff_time}s"
                 )
@@ -488,16 +1020,110 @@ async def run_benchmark_with_retry():
                     "data_fetch_time": None,
                     "plugins_fetch_time": None,
                     "total_execution_time": None,
+                    "first_render_time": None,
                     "num_cursors": 0,
                     "num_apps": 0,
                     "num_plugins": 0,
+                    "num_deliveries": 0,
+                    "apps_checksum": None,
+                    "compression": compression,
+                    "fetch_strategy": fetch_strategy,
+                    "batch_size": batch_size if fetch_strategy != "cursors" else None,
+                    "num_requests": 0,
+                    "response_bytes": 0,
+                    "response_bytes_compressed": 0,
+                    "decode_time": 0,
+                    "persisted_queries": persisted_queries,
+                    "request_bytes": 0,
+                    "server_parse_time": 0,
+                    "persisted_query_misses": 0,
+                    "app_cache": (
+                        "off"
+                        if app_cache is None or fetch_strategy != "cursors"
+                        else ("warm" if app_cache.cursors else "cold")
+                    ),
+                    "cache_hits": None,
+                    "cache_misses": None,
+                    "cache_hit_rate": None,
+                    "stale_served": None,
+                    "duplicate_apps": None,
                     "rate_limited_during_cursors": False,
                     "rate_limited_during_data": False,
                     "rate_limited_during_plugins": False,
                     "error": str(e),
+                    "error_category": category,
+                    **run_error_counts(),
+                    "loop_lag_p99": None,
+                    "loop_lag_max": None,
+                    "cpu_usage": None,
+                    "max_in_flight": 0,
+                    "generator_saturated": False,
                 }
 
 
+def cache_summary(results):
+    """
+    Median total execution time of clean cold and warm app cache runs, the
+    relative reduction of the warm ones, the median and reduction of their
+    time to first render (stale pages shown before revalidation) and their
+    mean page hit rate. Returns None unless there are clean runs of both
+    kinds.
+    """
+    totals = {"cold": [], "warm": []}
+    first_renders = []
+    hit_rates = []
+    for result in results:
+        if result.get("total_execution_time") is None or result.get("error"):
+            continue
+        if result.get("app_cache") in totals:
+            totals[result["app_cache"]].append(result["total_execution_time"])
+            if result["app_cache"] == "warm":
+                first_renders.append(result["first_render_time"])
+                hit_rates.append(result["cache_hit_rate"] or 0)
+    if not totals["cold"] or not totals["warm"]:
+        return None
+    cold_median = statistics.median(totals["cold"])
+    warm_median = statistics.median(totals["warm"])
+    first_render_median = statistics.median(first_renders)
+    return {
+        "cold_median": cold_median,
+        "warm_median": warm_median,
+        "reduction": 1 - warm_median / cold_median if cold_median else 0,
+        "first_render_median": first_render_median,
+        "first_render_reduction": (
+            1 - first_render_median / cold_median if cold_median else 0
+        ),
+        "hit_rate": statistics.mean(hit_rates),
+    }
+
+
+def strategy_summary(results):
+    """
+    Median total execution time, mean number of requests and mean decoded
+    bytes per request of the clean runs of every (fetch strategy, batch
+    size), fastest first.
+    """
+    groups = {}
+    for result in results:
+        if result.get("total_execution_time") is None or result.get("error"):
+            continue
+        key = (result["fetch_strategy"], result["batch_size"])
+        groups.setdefault(key, []).append(result)
+    summary = [
+        {
+            "fetch_strategy": strategy,
+            "batch_size": batch_size,
+            "median": statistics.median(r["total_execution_time"] for r in runs),
+            "requests": statistics.mean(r["num_requests"] for r in runs),
+            "bytes_per_request": statistics.mean(
+                r["response_bytes"] / r["num_requests"] for r in runs
+            ),
+        }
+        for (strategy, batch_size), runs in groups.items()
+    ]
+    return sorted(summary, key=lambda row: row["median"])
+
+
 def save_results_to_csv(results, filename="benchmark_results.csv"):
     """Save benchmark results to a CSV file"""
     if not results:
@@ -515,164 +1141,112 @@ def save_results_to_csv(results, filename="benchmark_results.csv"):
     logger.info(f"Results saved to {filename}")
 
 
-def generate_graphs(results, output_dir="benchmark_graphs"):
-    """Generate graphs from benchmark results"""
-    # Filter out runs with errors or rate limiting
-    valid_results = [
-        r
-        for r in results
-        if r.get("error") is None
-        and not r.get("rate_limited_during_cursors")
-        and not r.get("rate_limited_during_data")
-        and r.get("cursor_fetch_time") is not None
-        and r.get("data_fetch_time") is not None
-        and r.get("total_execution_time") is not None
-    ]
-
-    if not valid_results:
-        logger.error("No valid results to generate graphs")
-        return None
+async def main(
+    url=None,
+    token=None,
+    num_runs=NUM_RUNS,
+    page_concurrency=PAGE_CONCURRENCY,
+    retain_payloads=False,
+    compression=COMPRESSION,
+    persisted_queries=False,
+    app_cache=False,
+    fetch_strategy=FETCH_STRATEGY,
+    batch_sizes=BATCH_SIZES,
+    batch_concurrency=BATCH_CONCURRENCY,
+    warmup_runs=WARMUP_RUNS,
+    warmup_seconds=WARMUP_SECONDS,
+    steady_state=False,
+    graphs=True,
+    metrics_port=None,
+    metrics_snapshots=False,
+):
+    check_compression(compression)
+    url = url or os.environ.get("SALEOR_GRAPHQL_URL", "http://localhost:8000/graphql/")
+    token = token or os.environ.get("AUTH_TOKEN")
+
+    logger.info(f"Running GraphQL benchmark {num_runs} times...")
+    all_results = []
 
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Extract timing data
-    cursor_times = [r["cursor_fetch_time"] for r in valid_results]
-    data_times = [r["data_fetch_time"] for r in valid_results]
-    total_times = [r["total_execution_time"] for r in valid_results]
-    run_numbers = [r["run_number"] for r in valid_results]
-
-    # Calculate statistics
-    stats = {
-        "Cursor Fetching": {
-            "min": min(cursor_times),
-            "max": max(cursor_times),
-            "mean": statistics.mean(cursor_times),
-            "median": statistics.median(cursor_times),
-        },
-        "Data Fetching": {
-            "min": min(data_times),
-            "max": max(data_times),
-            "mean": statistics.mean(data_times),
-            "median": statistics.median(data_times),
-        },
-        "Total Execution": {
-            "min": min(total_times),
-            "max": max(total_times),
-            "mean": statistics.mean(total_times),
-            "median": statistics.median(total_times),
-        },
-    }
+    # Generate timestamp for filenames
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-    # 1. Line graph showing all three timing metrics across runs
-    plt.figure(figsize=(12, 6))
-    plt.plot(run_numbers, cursor_times, "o-", label="Cursor Fetching")
-    plt.plot(run_numbers, data_times, "s-", label="Data Fetching")
-    plt.plot(run_numbers, total_times, "^-", label="Total Execution")
-    plt.xlabel("Run Number")
-    plt.ylabel("Time (seconds)")
-    plt.title("GraphQL Query Performance Across Runs")
-    plt.legend()
-    plt.grid(True, linestyle="--", alpha=0.7)
-    plt.savefig(f"{output_dir}/performance_across_runs.png")
-
-    # 2. Bar chart comparing min, median, and max times for each phase
-    categories = ["Cursor Fetching", "Data Fetching", "Total Execution"]
-    min_values = [stats[c]["min"] for c in categories]
-    median_values = [stats[c]["median"] for c in categories]
-    max_values = [stats[c]["max"] for c in categories]
-
-    x = np.arange(len(categories))
-    width = 0.25
-
-    plt.figure(figsize=(12, 6))
-    plt.bar(x - width, min_values, width, label="Min")
-    plt.bar(x, median_values, width, label="Median")
-    plt.bar(x + width, max_values, width, label="Max")
-
-    plt.xlabel("Operation")
-    plt.ylabel("Time (seconds)")
-    plt.title("Min, Median, and Max Execution Times")
-    plt.xticks(x, categories)
-    plt.legend()
-    plt.grid(True, linestyle="--", alpha=0.7, axis="y")
-    plt.savefig(f"{output_dir}/min_median_max_comparison.png")
-
-    # 3. Pie chart showing proportion of time spent in each phase (using median values)
-    plt.figure(figsize=(10, 8))
-    median_cursor = stats["Cursor Fetching"]["median"]
-    median_data = stats["Data Fetching"]["median"]
-    # Calculate "other time" (overhead not in the two main phases)
-    median_total = stats["Total Execution"]["median"]
-    median_other = max(0, median_total - (median_cursor + median_data))
-    median_other = max(0, median_other)  # Ensure non-negative
-
-    labels = ["Cursor Fetching", "Data Fetching", "Other Operations"]
-    sizes = [median_cursor, median_data, median_other]
-
-    plt.pie(
-        sizes,
-        labels=labels,
-        autopct="%1.1f%%",
-        startangle=90,
-        shadow=True,
-        explode=(0.05, 0.05, 0.05),
+    # Optionally expose live metrics over HTTP and/or as periodic snapshots
+    exporter = MetricsExporter(
+        live_metrics,
+        port=metrics_port,
+        snapshot_path=(
+            f"benchmark_metrics_{timestamp}.jsonl" if metrics_snapshots else None
+        ),
     )
-    plt.axis("equal")
-    plt.title("Proportion of Time Spent in Each Phase (Median Values)")
-    plt.savefig(f"{output_dir}/time_proportion_pie.png")
-
-    # 4. Box plot showing distribution of times
-    plt.figure(figsize=(10, 6))
-    plt.boxplot([cursor_times, data_times, total_times], labels=categories)
-    plt.ylabel("Time (seconds)")
-    plt.title("Distribution of Execution Times")
-    plt.grid(True, linestyle="--", alpha=0.7, axis="y")
-    plt.savefig(f"{output_dir}/time_distribution_boxplot.png")
-
-    # 5. Add a new graph showing success rate and rate limiting occurrences
-    plt.figure(figsize=(10, 6))
-
-    # Count different result types
-    total_runs = len(results)
-    clean_runs = len(valid_results)
-    rate_limited_cursor = sum(
-        1 for r in results if r.get("rate_limited_during_cursors")
-    )
-    rate_limited_data = sum(1 for r in results if r.get("rate_limited_during_data"))
-    error_runs = sum(1 for r in results if r.get("error") is not None)
-
-    # Create bar chart
-    categories = [
-        "Clean Runs",
-        "Rate Limited (Cursors)",
-        "Rate Limited (Data)",
-        "Error Runs",
+    await exporter.start()
+
+    samples_filename = f"benchmark_samples_{timestamp}.bin"
+    request_samples.open(samples_filename)
+
+    # Odd cursor runs start from an empty cache (cold full reload), even ones
+    # are repeat visits that only re-fetch changed pages
+    cache = AppListCache() if app_cache else None
+    cursor_runs = 0
+
+    # Strategies, batch sizes and ("all") compression modes are interleaved so
+    # they share server conditions. Runs cycle through every combination, the
+    # fetch variant changing every run, so the effects of a strategy and of a
+    # compression mode can be told apart even when their counts share a factor
+    variants = fetch_variants(fetch_strategy, batch_sizes)
+    compression_modes = COMPRESSION_MODES if compression == "all" else (compression,)
+    run_variants = [
+        (run_compression, *variant)
+        for run_compression in compression_modes
+        for variant in variants
     ]
-    counts = [clean_runs, rate_limited_cursor, rate_limited_data, error_runs]
-
-    plt.bar(categories, counts, color=["green", "orange", "orange", "red"])
-    plt.xlabel("Run Type")
-    plt.ylabel("Count")
-    plt.title("Distribution of Run Types")
-    plt.grid(True, linestyle="--", alpha=0.7, axis="y")
-    plt.savefig(f"{output_dir}/run_type_distribution.png")
-
-    logger.info(f"Graphs saved to {output_dir}/")
-
-    # Return statistics for display
-    return stats
 
-
-async def main():
-    logger.info(f"Running GraphQL benchmark {NUM_RUNS} times...")
-    all_results = []
-
-    for i in range(1, NUM_RUNS + 1):
-        logger.info(f"\nRun {i}/{NUM_RUNS}")
-        result = await run_benchmark_with_retry()
+    # Warm-up runs are executed before the num_runs measured runs
+    warmup = WarmupController(warmup_runs, warmup_seconds, steady_state)
+    measured_runs = 0
+    i = 0
+    # Runs record when they started, for the error rate over time
+    benchmark_start = time.perf_counter()
+    while measured_runs < num_runs:
+        i += 1
+        if warmup.in_warmup():
+            phase = "warmup"
+            logger.info(f"\nWarm-up run {i}")
+        else:
+            if measured_runs == 0 and warmup.runs:
+                logger.info(
+                    f"\nMeasurement starts after {warmup.runs} warm-up runs"
+                    + (" (steady state)" if warmup.detector.is_steady() else "")
+                )
+            phase = "measured"
+            measured_runs += 1
+            logger.info(f"\nRun {measured_runs}/{num_runs}")
+        request_samples.run_number = i
+        run_compression, run_strategy, run_batch_size = run_variants[
+            (i - 1) % len(run_variants)
+        ]
+        if run_strategy == "cursors":
+            cursor_runs += 1
+            if cache is not None and cursor_runs % 2 == 1:
+                cache.clear()
+        run_start = time.perf_counter() - benchmark_start
+        result = await run_benchmark_with_retry(
+            url,
+            token,
+            page_concurrency,
+            retain_payloads,
+            run_compression,
+            persisted_queries,
+            cache,
+            run_strategy,
+            run_batch_size,
+            batch_concurrency,
+        )
         result["run_number"] = i
+        result["run_start"] = run_start
+        result["phase"] = phase
         all_results.append(result)
+        if phase == "warmup":
+            warmup.add_run(result.get("total_execution_time"))
 
         # Print current run results
         if result.get("error"):
@@ -685,6 +1259,12 @@ async def main():
             if rate_limited:
                 logger.warning("  Rate limiting occurred during this run")
 
+            if result.get("generator_saturated"):
+                logger.warning(
+                    f"  Load generator saturated (p99 loop lag {result['loop_lag_p99'] * 1000:.1f}ms, "
+                    f"CPU {result['cpu_usage']:.0%}), timings include client-side delay"
+                )
+
             if result.get("cursor_fetch_time") is not None:
                 logger.info(f"  Cursor fetching: {result['cursor_fetch_time']:.4f}s")
             else:
@@ -700,26 +1280,62 @@ async def main():
             else:
                 logger.info("  Total execution: N/A (affected by rate limiting)")
 
+            if result["fetch_strategy"] == "batched":
+                logger.info(
+                    f"  Fetched {result['num_cursors']} ID pages and {result['num_apps']} apps "
+                    f"in batches of {result['batch_size']} ({result['num_requests']} requests)"
+                )
+            else:
+                logger.info(
+                    f"  Fetched {result['num_cursors']} cursors and {result['num_apps']} apps "
+                    f"({result['num_requests']} requests)"
+                )
+            logger.info(
+                f"  Received {result['response_bytes_compressed'] / 1024:.1f} KiB "
+                f"({result['response_bytes'] / 1024:.1f} KiB decoded, {result['compression']}), "
+                f"{result['num_deliveries']} deliveries, apps checksum {result['apps_checksum']}"
+            )
             logger.info(
-                f"  Fetched {result['num_cursors']} cursors and {result['num_apps']} apps"
+                f"  Sent {result['request_bytes'] / 1024:.1f} KiB of requests"
+                + (
+                    f" as persisted queries ({result['persisted_query_misses']} registered)"
+                    if result["persisted_queries"]
+                    else ""
+                )
             )
+            if result["app_cache"] != "off":
+                logger.info(
+                    f"  App cache ({result['app_cache']}): {result['cache_hits']} pages cached, "
+                    f"{result['cache_misses']} fetched, {result['stale_served']} served stale"
+                )
 
-    # Generate timestamp for filenames
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    await exporter.stop()
+    request_samples.close()
 
     # Save results to CSV
     csv_filename = f"benchmark_results_{timestamp}.csv"
-    save_results_to_csv(all_results, csv_filename)
+    with phase_counters.measure("csv_write"):
+        save_results_to_csv(all_results, csv_filename)
 
     # Generate and save graphs
-    output_dir = f"benchmark_graphs_{timestamp}"
-    stats = generate_graphs(all_results, output_dir)
+    stats = None
+    if graphs:
+        output_dir = f"benchmark_graphs_{timestamp}"
+        with phase_counters.measure("report"):
+            # Plotting libraries are only loaded when a report is generated
+            from benchmark_report import generate_graphs
 
-    # Count valid and rate-limited runs
+            stats = generate_graphs(all_results, output_dir, samples_filename)
+
+    # Save the time the harness spent on its own work next to the results
+    phase_counters.save_to_csv(f"benchmark_overhead_{timestamp}.csv")
+
+    # Count valid and rate-limited runs, warm-up runs are reported separately
+    measured_results = [r for r in all_results if r["phase"] == "measured"]
     valid_runs = len(
         [
             r
-            for r in all_results
+            for r in measured_results
             if r.get("error") is None
             and not r.get("rate_limited_during_cursors")
             and not r.get("rate_limited_during_data")
@@ -728,17 +1344,42 @@ async def main():
     rate_limited_runs = len(
         [
             r
-            for r in all_results
+            for r in measured_results
             if r.get("rate_limited_during_cursors") or r.get("rate_limited_during_data")
         ]
     )
-    error_runs = len([r for r in all_results if r.get("error") is not None])
+    error_runs = len([r for r in measured_results if r.get("error") is not None])
+    saturated_runs = len([r for r in measured_results if r.get("generator_saturated")])
 
     logger.info("Run Summary:")
-    logger.info(f"  Total runs: {NUM_RUNS}")
+    logger.info(f"  Total runs: {num_runs}")
+    logger.info(f"  Warm-up runs: {len(all_results) - len(measured_results)}")
     logger.info(f"  Clean runs: {valid_runs}")
     logger.info(f"  Rate-limited runs: {rate_limited_runs}")
     logger.info(f"  Error runs: {error_runs}")
+    logger.info(f"  Generator-saturated runs: {saturated_runs}")
+
+    if app_cache:
+        summary = cache_summary(measured_results)
+        if summary:
+            logger.info(
+                f"  Repeat visits: first render {summary['first_render_median']:.4f}s "
+                f"({summary['first_render_reduction']:.0%} faster), revalidated "
+                f"{summary['warm_median']:.4f}s ({summary['reduction']:.0%} faster) vs "
+                f"{summary['cold_median']:.4f}s cold full reload, "
+                f"cache hit rate {summary['hit_rate']:.0%}"
+            )
+
+    if len(variants) > 1:
+        logger.info("  Fetch strategies (fastest first):")
+        for row in strategy_summary(measured_results):
+            label = row["fetch_strategy"] + (
+                f" x{row['batch_size']}" if row["batch_size"] else ""
+            )
+            logger.info(
+                f"    {label}: median {row['median']:.4f}s, "
+                f"{row['requests']:.1f} requests of {row['bytes_per_request'] / 1024:.1f} KiB"
+            )
 
     if stats:
         # Print summary statistics
@@ -747,9 +1388,33 @@ async def main():
             logger.info(f"\n{category}:")
             for stat_name, stat_value in values.items():
                 logger.info(f"  {stat_name}: {stat_value:.4f}s")
-    else:
+    elif graphs:
         logger.warning("Could not generate statistics due to insufficient clean runs")
 
+    return all_results
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    with profile_run(f"benchmark_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}"):
+        metrics_port = os.environ.get("METRICS_PORT")
+        run_event_loop(
+            main(
+                metrics_port=int(metrics_port) if metrics_port else None,
+                metrics_snapshots=bool(os.environ.get("METRICS_SNAPSHOTS")),
+                persisted_queries=bool(os.environ.get("PERSISTED_QUERIES")),
+                app_cache=bool(os.environ.get("APP_CACHE")),
+                fetch_strategy=os.environ.get("FETCH_STRATEGY", FETCH_STRATEGY),
+                batch_sizes=tuple(
+                    int(size)
+                    for size in os.environ.get(
+                        "BATCH_SIZES", ",".join(map(str, BATCH_SIZES))
+                    ).split(",")
+                ),
+                batch_concurrency=int(
+                    os.environ.get("BATCH_CONCURRENCY", BATCH_CONCURRENCY)
+                ),
+                warmup_runs=int(os.environ.get("WARMUP_RUNS", WARMUP_RUNS)),
+                warmup_seconds=float(os.environ.get("WARMUP_SECONDS", WARMUP_SECONDS)),
+                steady_state=bool(os.environ.get("STEADY_STATE")),
+            )
+        )
@@ -0,0 +1,440 @@
+"""
+Coordinator/agent mode for the cursor benchmark and the seeding tools.
+
+Agents connect to the coordinator over TCP and exchange newline-delimited
+JSON messages:
+
+    agent -> coordinator  {"type": "hello", "name": ..., "pid": ...}
+    coordinator -> agent  {"type": "clock", "time": <coordinator time>}
+    agent -> coordinator  {"type": "clock", "time": <agent time>}
+    coordinator -> agent  {"type": "job", "tool": ..., "options": {...}, "start_at": <agent time>}
+    agent -> coordinator  {"type": "result", "result": {...}} or {"type": "result", "error": ...}
+    coordinator -> agent  {"type": "shutdown"}
+
+The coordinator splits the workload (benchmark runs or number of apps)
+between the agents, estimates every agent's clock offset so they all start
+at the same moment, and merges the histograms, error counters and per-run
+results they send back into one report. Agents whose job failed are listed
+in the report and make the coordinator exit with a non-zero status. Agents use their own URL and token,
+credentials are never sent over the socket.
+"""
+
+import asyncio
+import csv
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+from live_metrics import LiveMetrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds between sending the jobs and the synchronised start of all agents
+START_DELAY = 2
+
+# Seconds to wait for all agents to connect
+CONNECT_TIMEOUT = 60
+
+# Seconds local agent processes get to exit after the shutdown message
+SHUTDOWN_TIMEOUT = 10
+
+# Largest message accepted, per-run results of long benchmarks are big
+MESSAGE_LIMIT = 64 * 1024**2
+
+# Tool name -> (module, option holding the workload size that is split)
+TOOLS = {
+    "cursors": ("cursors_benchmark", "num_runs"),
+    "install": ("mass_install", "count"),
+    "seed-webhooks": ("mass_create_webhook", "count"),
+}
+
+APP_STRESS_TEST = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "app_stress_test.py"
+)
+
+
+def split_workload(total, parts):
+    """Split total into parts integers that differ by at most one"""
+    share, remainder = divmod(total, parts)
+    return [share + (1 if index < remainder else 0) for index in range(parts)]
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+async def send(writer, message):
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+
+async def receive(reader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed")
+    return json.loads(line)
+
+
+class AgentConnection:
+    def __init__(self, reader, writer, name):
+        self.reader = reader
+        self.writer = writer
+        self.name = name
+        self.clock_offset = 0.0
+
+    async def measure_clock_offset(self):
+        """Estimate agent time - coordinator time from one round trip"""
+        sent = time.time()
+        await send(self.writer, {"type": "clock", "time": sent})
+        reply = await receive(self.reader)
+        received = time.time()
+        self.clock_offset = reply["time"] - (sent + received) / 2
+        return self.clock_offset
+
+
+class Coordinator:
+    """
+    Accepts agent connections on host:port, optionally spawning local agent
+    processes, and runs one tool on all of them. Every local agent runs in
+    its own directory under work_dir so their output files do not collide.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        local_agents=0,
+        remote_agents=0,
+        work_dir="benchmark_agents",
+    ):
+        self.host = host
+        self.port = port
+        self.local_agents = local_agents
+        self.remote_agents = remote_agents
+        self.work_dir = work_dir
+        self.agents = []
+        # (agent name, error) of the agents whose job failed or that disconnected
+        self.failed_agents = []
+        self.processes = []
+        self._connected = asyncio.Condition()
+
+    async def _accept(self, reader, writer):
+        hello = await receive(reader)
+        agent = AgentConnection(
+            reader, writer, hello.get("name") or f"agent-{len(self.agents) + 1}"
+        )
+        async with self._connected:
+            self.agents.append(agent)
+            self._connected.notify_all()
+        logger.info(f"Agent {agent.name} connected (pid {hello.get('pid')})")
+
+    async def _spawn_local_agents(self, url, token, event_loop):
+        # Credentials are handed over in the environment, not on the command line
+        env = dict(os.environ)
+        if url:
+            env["SALEOR_GRAPHQL_URL"] = url
+        if token:
+            env["AUTH_TOKEN"] = token
+        for index in range(self.local_agents):
+            name = f"local-{index + 1}"
+            agent_dir = os.path.join(self.work_dir, name)
+            os.makedirs(agent_dir, exist_ok=True)
+            process = await asyncio.create_subprocess_exec(
+                sys.executable,
+                APP_STRESS_TEST,
+                "--event-loop",
+                event_loop,
+                "agent",
+                "--coordinator",
+                f"{self.host}:{self.port}",
+                "--name",
+                name,
+                env=env,
+                cwd=agent_dir,
+            )
+            self.processes.append(process)
+
+    async def run(self, tool, options, url=None, token=None, event_loop="asyncio"):
+        """
+        Split the workload of tool between all agents, start them at the same
+        time and return a list of (agent name, result) pairs. Agents whose
+        job failed or that disconnected are left out and recorded in
+        failed_agents.
+        """
+        expected = self.local_agents + self.remote_agents
+        server = await asyncio.start_server(
+            self._accept, self.host, self.port, limit=MESSAGE_LIMIT
+        )
+        self.port = server.sockets[0].getsockname()[1]
+        logger.info(
+            f"Coordinator listening on {self.host}:{self.port}, waiting for {expected} agents"
+        )
+        try:
+            await self._spawn_local_agents(url, token, event_loop)
+            async with self._connected:
+                await asyncio.wait_for(
+                    self._connected.wait_for(lambda: len(self.agents) >= expected),
+                    CONNECT_TIMEOUT,
+                )
+
+            for agent in self.agents:
+                offset = await agent.measure_clock_offset()
+                logger.info(f"Agent {agent.name} clock offset {offset * 1000:.1f}ms")
+
+            _, workload_option = TOOLS[tool]
+            shares = split_workload(options[workload_option], len(self.agents))
+            start_at = time.time() + START_DELAY
+            for agent, share in zip(self.agents, shares):
+                await send(
+                    agent.writer,
+                    {
+                        "type": "job",
+                        "tool": tool,
+                        "options": {**options, workload_option: share},
+                        "start_at": start_at + agent.clock_offset,
+                    },
+                )
+            logger.info(
+                f"Started {tool} on {len(self.agents)} agents, workload split {shares}"
+            )
+
+            # An agent that crashes or drops its connection must not discard
+            # the results of the others
+            replies = await asyncio.gather(
+                *(receive(agent.reader) for agent in self.agents),
+                return_exceptions=True,
+            )
+            results = []
+            for agent, reply in zip(self.agents, replies):
+                if isinstance(reply, Exception):
+                    logger.error(f"Agent {agent.name} disconnected: {reply!r}")
+                    self.failed_agents.append((agent.name, f"Disconnected: {reply!r}"))
+                elif isinstance(reply, BaseException):
+                    raise reply
+                elif reply.get("error"):
+                    logger.error(f"Agent {agent.name} failed: {reply['error']}")
+                    self.failed_agents.append((agent.name, reply["error"]))
+                else:
+                    logger.info(
+                        f"Agent {agent.name} started {reply['start_skew'] * 1000:.1f}ms after the scheduled time"
+                    )
+                    results.append((agent.name, reply["result"]))
+            return results
+        finally:
+            for agent in self.agents:
+                try:
+                    await send(agent.writer, {"type": "shutdown"})
+                    agent.writer.close()
+                except ConnectionError:
+                    pass
+            for process in self.processes:
+                try:
+                    await asyncio.wait_for(process.wait(), SHUTDOWN_TIMEOUT)
+                except asyncio.TimeoutError:
+                    process.kill()
+                    await process.wait()
+            server.close()
+            await server.wait_closed()
+
+
+async def run_job(tool, options, url, token):
+    """Run a tool in this process and return its JSON-serializable result"""
+    module_name, _ = TOOLS[tool]
+    module = importlib.import_module(module_name)
+    # Metrics are module globals, only report what this job observed
+    module.live_metrics.reset()
+    if tool != "cursors":
+        result = await module.main(url=url, token=token, **options)
+        return {**result, "metrics": module.live_metrics.to_dict()}
+
+    results = await module.main(url=url, token=token, graphs=False, **options)
+    return {"runs": results, "metrics": module.live_metrics.to_dict()}
+
+
+async def run_agent(coordinator, name=None, url=None, token=None):
+    """Connect to the coordinator at host:port and run the jobs it sends"""
+    host, port = parse_address(coordinator)
+    reader, writer = await asyncio.open_connection(host, port, limit=MESSAGE_LIMIT)
+    await send(writer, {"type": "hello", "name": name, "pid": os.getpid()})
+    try:
+        while True:
+            message = await receive(reader)
+            if message["type"] == "clock":
+                await send(writer, {"type": "clock", "time": time.time()})
+            elif message["type"] == "job":
+                await asyncio.sleep(max(0.0, message["start_at"] - time.time()))
+                start_skew = time.time() - message["start_at"]
+                try:
+                    result = await run_job(
+                        message["tool"], message["options"], url, token
+                    )
+                except Exception as e:
+                    logger.exception("Job failed")
+                    await send(writer, {"type": "result", "error": str(e)})
+                    continue
+                await send(
+                    writer,
+                    {"type": "result", "result": result, "start_skew": start_skew},
+                )
+            elif message["type"] == "shutdown":
+                break
+    except ConnectionError:
+        logger.warning("Coordinator closed the connection")
+    finally:
+        writer.close()
+
+
+def merge_benchmark_results(agent_results):
+    """
+    Merge cursor benchmark results of all agents: per-run results are
+    interleaved by run number and renumbered, metrics are summed.
+    Returns (runs, metrics).
+    """
+    metrics = merge_metrics(agent_results)
+    runs = []
+    for agent, result in agent_results:
+        for run in result["runs"]:
+            runs.append({**run, "agent": agent, "agent_run_number": run["run_number"]})
+    runs.sort(key=lambda run: run["agent_run_number"])
+    for run_number, run in enumerate(runs, start=1):
+        run["run_number"] = run_number
+    return runs, metrics
+
+
+def merge_metrics(agent_results):
+    """Sum the metrics of all agents into one LiveMetrics"""
+    metrics = LiveMetrics()
+    for _, result in agent_results:
+        metrics.merge_dict(result["metrics"])
+    return metrics
+
+
+def save_failed_agents(failed_agents, filename):
+    with open(filename, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["agent", "error"])
+        writer.writerows(failed_agents)
+
+
+def log_metrics(metrics):
+    for operation, histogram in metrics.latency.items():
+        logger.info(
+            f"  {operation}: {histogram.count} requests, p50 {histogram.quantile(0.5):.4f}s, "
+            f"p99 {histogram.quantile(0.99):.4f}s"
+        )
+    for (operation, category), count in metrics.errors.items():
+        logger.info(f"  {operation}: {count} {category} errors")
+
+
+def save_metrics(metrics, histograms_filename, errors_filename):
+    """Merged latency and latency-at-failure quantiles per operation"""
+    with open(histograms_filename, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["operation", "requests", "p50", "p90", "p99", "max"])
+        for operation, histogram in metrics.latency.items():
+            writer.writerow(
+                [
+                    operation,
+                    histogram.count,
+                    histogram.quantile(0.5),
+                    histogram.quantile(0.9),
+                    histogram.quantile(0.99),
+                    histogram.max,
+                ]
+            )
+    with open(errors_filename, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(
+            ["operation", "category", "count", "p50_latency", "max_latency"]
+        )
+        for (operation, category), count in metrics.errors.items():
+            histogram = metrics.error_latency[operation, category]
+            writer.writerow(
+                [operation, category, count, histogram.quantile(0.5), histogram.max]
+            )
+
+
+async def main(
+    tool,
+    options,
+    url=None,
+    token=None,
+    listen="127.0.0.1:0",
+    local_agents=0,
+    remote_agents=0,
+    event_loop="asyncio",
+    graphs=True,
+):
+    """
+    Run tool on all agents and write the merged report. Returns a dict with
+    the merged results ("runs" for the benchmark, "count", "successful" and
+    "errors" for the seeding tools) and the "failed_agents" as (name, error)
+    pairs, their jobs are not part of the results.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    prefix = "benchmark" if tool == "cursors" else tool
+    host, port = parse_address(listen)
+    coordinator = Coordinator(
+        host, port, local_agents, remote_agents, f"benchmark_agents_{timestamp}"
+    )
+    agent_results = await coordinator.run(tool, options, url, token, event_loop)
+    failed_agents = coordinator.failed_agents
+    if failed_agents:
+        save_failed_agents(failed_agents, f"{prefix}_failed_agents_{timestamp}.csv")
+        logger.error(
+            f"{len(failed_agents)} of {len(failed_agents) + len(agent_results)} "
+            f"agents failed and are missing from the results: "
+            f"{', '.join(name for name, _ in failed_agents)}"
+        )
+
+    if tool != "cursors":
+        count = sum(result["count"] for _, result in agent_results)
+        successful = sum(result["successful"] for _, result in agent_results)
+        errors = {}
+        for _, result in agent_results:
+            for category, errors_count in result["errors"].items():
+                errors[category] = errors.get(category, 0) + errors_count
+        metrics = merge_metrics(agent_results)
+        save_metrics(
+            metrics,
+            f"{prefix}_histograms_{timestamp}.csv",
+            f"{prefix}_errors_{timestamp}.csv",
+        )
+        logger.info(
+            f"Completed {successful} out of {count} on {len(agent_results)} agents, errors: {errors}"
+        )
+        log_metrics(metrics)
+        return {
+            "count": count,
+            "successful": successful,
+            "errors": errors,
+            "failed_agents": failed_agents,
+        }
+
+    # Only imported for the benchmark, it sets up its own module state
+    from cursors_benchmark import save_results_to_csv
+
+    runs, metrics = merge_benchmark_results(agent_results)
+    if not runs:
+        logger.error("No agent returned results")
+        return {"runs": runs, "failed_agents": failed_agents}
+    save_results_to_csv(runs, f"benchmark_results_{timestamp}.csv")
+    save_metrics(
+        metrics,
+        f"benchmark_histograms_{timestamp}.csv",
+        f"benchmark_errors_{timestamp}.csv",
+    )
+
+    logger.info(f"Merged {len(runs)} runs from {len(agent_results)} agents:")
+    log_metrics(metrics)
+
+    if graphs:
+        from benchmark_report import generate_graphs
+
+        generate_graphs(runs, f"benchmark_graphs_{timestamp}")
+    return {"runs": runs, "failed_agents": failed_agents}
@@ -0,0 +1,101 @@
+import asyncio
+
+import aiohttp
+from gql.transport.exceptions import (
+    TransportProtocolError,
+    TransportQueryError,
+    TransportServerError,
+)
+
+# Categories every failed request is counted under
+RATE_LIMITED = "rate_limited"
+TIMEOUT = "timeout"
+CONNECTION = "connection"
+SERVER_ERROR = "server_error"
+CLIENT_ERROR = "client_error"
+PERMISSION_DENIED = "permission_denied"
+GRAPHQL_ERROR = "graphql_error"
+PROTOCOL_ERROR = "protocol_error"
+OTHER = "other"
+
+ERROR_CATEGORIES = (
+    RATE_LIMITED,
+    TIMEOUT,
+    CONNECTION,
+    SERVER_ERROR,
+    CLIENT_ERROR,
+    PERMISSION_DENIED,
+    GRAPHQL_ERROR,
+    PROTOCOL_ERROR,
+    OTHER,
+)
+
+# GraphQL error codes (extensions.code or Saleor's extensions.exception.code)
+PERMISSION_CODES = {"PermissionDenied", "PERMISSION_DENIED", "FORBIDDEN"}
+RATE_LIMIT_CODES = {"THROTTLED", "TOO_MANY_REQUESTS", "RATE_LIMITED"}
+
+# Lowercase message fragments of rate limit errors that carry no error code,
+# e.g. throttling reported by a proxy inside an HTTP 200 GraphQL response
+RATE_LIMIT_MESSAGES = ("429", "too many requests", "throttled")
+
+
+def classify_status(status):
+    """Category of an HTTP error status"""
+    if status == 429:
+        return RATE_LIMITED
+    if status in (408, 504):
+        return TIMEOUT
+    if status in (401, 403):
+        return PERMISSION_DENIED
+    if status is not None and status >= 500:
+        return SERVER_ERROR
+    return CLIENT_ERROR
+
+
+def graphql_error_code(error):
+    extensions = error.get("extensions") or {}
+    return extensions.get("code") or (extensions.get("exception") or {}).get("code")
+
+
+def is_rate_limit_message(error):
+    """Fallback for errors without a code: match the message text"""
+    message = str(error.get("message") or "").lower()
+    return any(fragment in message for fragment in RATE_LIMIT_MESSAGES)
+
+
+def classify_graphql_errors(errors):
+    """Category of the errors list of a GraphQL response"""
+    errors = [error for error in errors if isinstance(error, dict)]
+    codes = {graphql_error_code(error) for error in errors}
+    if codes & RATE_LIMIT_CODES:
+        return RATE_LIMITED
+    if codes & PERMISSION_CODES:
+        return PERMISSION_DENIED
+    if any(
+        graphql_error_code(error) is None and is_rate_limit_message(error)
+        for error in errors
+    ):
+        return RATE_LIMITED
+    return GRAPHQL_ERROR
+
+
+def classify_error(error):
+    """
+    Map an exception raised while executing a GraphQL request to one of
+    ERROR_CATEGORIES using the exception type, HTTP status and GraphQL error
+    codes. Only GraphQL errors without a code have their message scanned.
+    """
+    if isinstance(error, TransportServerError):
+        return classify_status(error.code)
+    if isinstance(error, aiohttp.ClientResponseError):
+        return classify_status(error.status)
+    # aiohttp.ServerTimeoutError is also a connection error, check timeouts first
+    if isinstance(error, (asyncio.TimeoutError, aiohttp.ServerTimeoutError)):
+        return TIMEOUT
+    if isinstance(error, (aiohttp.ClientConnectionError, ConnectionError)):
+        return CONNECTION
+    if isinstance(error, TransportQueryError):
+        return classify_graphql_errors(error.errors or [])
+    if isinstance(error, TransportProtocolError):
+        return PROTOCOL_ERROR
+    return OTHER
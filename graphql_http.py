@@ -0,0 +1,372 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import time
+import zlib
+from collections import namedtuple
+
+import aiohttp
+from gql.transport.exceptions import (
+    TransportProtocolError,
+    TransportQueryError,
+    TransportServerError,
+)
+from graphql import OperationType, print_ast
+
+logger = logging.getLogger(__name__)
+
+# Accept-Encoding header sent for every compression mode
+ACCEPT_ENCODINGS = {
+    "none": "identity",
+    "gzip": "gzip",
+    "br": "br",
+}
+
+# Error codes servers return for a persisted query hash they have not seen
+# and when they do not support persisted queries at all
+PERSISTED_QUERY_NOT_FOUND = "PERSISTED_QUERY_NOT_FOUND"
+PERSISTED_QUERY_NOT_SUPPORTED = "PERSISTED_QUERY_NOT_SUPPORTED"
+
+ResponseStats = namedtuple(
+    "ResponseStats",
+    [
+        "status",
+        "encoding",
+        "compressed_bytes",
+        "uncompressed_bytes",
+        "decode_time",
+        "request_bytes",
+        "server_parse_time",
+    ],
+)
+
+
+def server_timing(header, metric):
+    """Duration in seconds of a Server-Timing metric, NaN when not reported"""
+    for entry in header.split(","):
+        name, *params = entry.strip().split(";")
+        if name != metric:
+            continue
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                return float(value) / 1000
+    return math.nan
+
+
+def persisted_query_error(errors):
+    """PERSISTED_QUERY_NOT_FOUND / _NOT_SUPPORTED when errors contain one"""
+    for error in errors:
+        code = (error.get("extensions") or {}).get("code")
+        if code in (PERSISTED_QUERY_NOT_FOUND, PERSISTED_QUERY_NOT_SUPPORTED):
+            return code
+        if error.get("message") == "PersistedQueryNotFound":
+            return PERSISTED_QUERY_NOT_FOUND
+        if error.get("message") == "PersistedQueryNotSupported":
+            return PERSISTED_QUERY_NOT_SUPPORTED
+    return None
+
+
+def check_compression(compression):
+    """
+    Fail before any request is sent when an Accept-Encoding mode needs an
+    optional module that is not installed ("br" and "all" need brotli).
+    """
+    if compression in ("br", "all"):
+        try:
+            import brotli  # noqa: F401
+        except ImportError as e:
+            raise ImportError(
+                f"--compression {compression} requires brotli: "
+                "pip install brotli (or poetry install --extras brotli)"
+            ) from e
+
+
+def decompress(body, content_encoding):
+    """Decompress a raw response body according to its Content-Encoding"""
+    if content_encoding in ("", "identity"):
+        return body
+    if content_encoding == "gzip":
+        return zlib.decompress(body, wbits=zlib.MAX_WBITS | 16)
+    if content_encoding == "deflate":
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            # Some servers send raw deflate streams without the zlib header
+            return zlib.decompress(body, wbits=-zlib.MAX_WBITS)
+    if content_encoding == "br":
+        try:
+            import brotli
+        except ImportError as e:
+            raise TransportProtocolError(
+                "Brotli responses require `pip install brotli`"
+            ) from e
+        return brotli.decompress(body)
+    raise TransportProtocolError(f"Unsupported Content-Encoding {content_encoding!r}")
+
+
+class MeasuredSession:
+    """
+    Drop-in replacement for a gql client session that measures every response:
+    bytes on the wire, bytes after decompression and the time spent
+    decompressing and decoding JSON on the client. aiohttp's automatic
+    decompression is disabled so the compressed size can be observed.
+    Errors are raised as the same gql exceptions a gql session raises.
+
+    With persisted_queries every request sends only the sha256 hash of the
+    query (automatic persisted queries), the full text is sent once when the
+    server answers PersistedQueryNotFound so it can register it. A server
+    without persisted query support turns the mode off for the session.
+    """
+
+    def __init__(
+        self,
+        url,
+        headers=None,
+        compression="gzip",
+        connector_limit=100,
+        persisted_queries=False,
+    ):
+        if compression not in ACCEPT_ENCODINGS:
+            raise Exception(
+                f"Unknown compression {compression!r}, use one of {tuple(ACCEPT_ENCODINGS)}"
+            )
+        self.url = url
+        self.compression = compression
+        self.headers = {
+            **(headers or {}),
+            "Accept-Encoding": ACCEPT_ENCODINGS[compression],
+        }
+        self.connector_limit = connector_limit
+        self.persisted_queries = persisted_queries
+        self.requests = 0
+        self.request_bytes = 0
+        self.compressed_bytes = 0
+        self.uncompressed_bytes = 0
+        self.decode_time = 0.0
+        self.server_parse_time = 0.0
+        self.persisted_query_misses = 0
+        # id(document) -> (document, query text, sha256), the document is kept
+        # so its id cannot be reused by another one
+        self._queries = {}
+        self._http = None
+
+    async def __aenter__(self):
+        self._http = aiohttp.ClientSession(
+            headers=self.headers,
+            auto_decompress=False,
+            connector=aiohttp.TCPConnector(limit=self.connector_limit),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._http.close()
+        self._http = None
+
+    async def post(self, payload):
+        """
+        Send a raw GraphQL payload and return (result, stats) where result is
+        the decoded JSON response.
+        """
+        data = json.dumps(payload).encode()
+        async with self._http.post(
+            self.url, data=data, headers={"Content-Type": "application/json"}
+        ) as resp:
+            body = await resp.read()
+            status = resp.status
+            content_encoding = resp.headers.get("Content-Encoding", "").lower()
+            parse_time = server_timing(resp.headers.get("Server-Timing", ""), "parse")
+            reason = resp.reason
+
+        # Every error status but 400 (the GraphQL validation errors) is raised
+        # with its status even when the body is a GraphQL response, so rate
+        # limits, auth failures, timeouts and server errors can be classified
+        if status > 400:
+            raise TransportServerError(f"{status}, {reason}", status)
+
+        decode_start = time.perf_counter()
+        try:
+            text = decompress(body, content_encoding)
+            result = json.loads(text)
+        except (ValueError, zlib.error) as e:
+            if status >= 400:
+                raise TransportServerError(f"{status}, {body[:200]!r}", status) from e
+            raise TransportProtocolError(
+                f"Server did not return a GraphQL result: {body[:200]!r}"
+            ) from e
+        decode_time = time.perf_counter() - decode_start
+
+        stats = ResponseStats(
+            status,
+            content_encoding or "identity",
+            len(body),
+            len(text),
+            decode_time,
+            len(data),
+            parse_time,
+        )
+        self.requests += 1
+        self.request_bytes += stats.request_bytes
+        self.compressed_bytes += stats.compressed_bytes
+        self.uncompressed_bytes += stats.uncompressed_bytes
+        self.decode_time += decode_time
+        if not math.isnan(parse_time):
+            self.server_parse_time += parse_time
+
+        if not isinstance(result, dict) or (
+            "data" not in result and "errors" not in result
+        ):
+            if status >= 400:
+                raise TransportServerError(f"{status}, {result!r}", status)
+            raise TransportProtocolError(
+                f'No "data" or "errors" keys in answer: {result!r}'
+            )
+        return result, stats
+
+    def _query(self, document):
+        cached = self._queries.get(id(document))
+        if cached is None:
+            query = print_ast(document)
+            query_hash = hashlib.sha256(query.encode()).hexdigest()
+            cached = self._queries[id(document)] = (document, query, query_hash)
+        return cached[1], cached[2]
+
+    async def execute_measured(self, document, variable_values=None):
+        """Execute a parsed query, returning (data, stats)"""
+        query, query_hash = self._query(document)
+        if self.persisted_queries:
+            payload = {
+                "extensions": {
+                    "persistedQuery": {"version": 1, "sha256Hash": query_hash}
+                }
+            }
+        else:
+            payload = {"query": query}
+        if variable_values:
+            payload["variables"] = variable_values
+
+        result, stats = await self.post(payload)
+        persisted_error = (
+            persisted_query_error(result["errors"])
+            if "extensions" in payload and result.get("errors")
+            else None
+        )
+        if persisted_error is not None:
+            # Resend with the text, the rejected request still counts as traffic
+            if persisted_error == PERSISTED_QUERY_NOT_SUPPORTED:
+                logger.warning("Server does not support persisted queries")
+                self.persisted_queries = False
+                del payload["extensions"]
+            else:
+                self.persisted_query_misses += 1
+            payload["query"] = query
+            result, registered = await self.post(payload)
+            stats = registered._replace(
+                request_bytes=stats.request_bytes + registered.request_bytes,
+                compressed_bytes=stats.compressed_bytes + registered.compressed_bytes,
+                uncompressed_bytes=stats.uncompressed_bytes
+                + registered.uncompressed_bytes,
+                decode_time=stats.decode_time + registered.decode_time,
+            )
+        if result.get("errors"):
+            raise TransportQueryError(
+                str(result["errors"][0]),
+                errors=result["errors"],
+                data=result.get("data"),
+                extensions=result.get("extensions"),
+            )
+        return result["data"], stats
+
+    async def execute(self, document, variable_values=None):
+        """Execute a parsed query and return its data, like a gql session"""
+        data, _ = await self.execute_measured(document, variable_values)
+        return data
+
+
+class CoalescingSession:
+    """
+    Single-flight layer in front of a MeasuredSession shared by several
+    virtual users, like a dashboard backend with a shared cache: identical
+    queries (same query text and variables) in flight at the same time are
+    sent once and every caller gets the same result (callers of a cancelled
+    request send it again), and with ttl successful results are reused for
+    ttl seconds. Mutations are always sent.
+
+    Callers served without a request get stats with the encoding
+    "coalesced" or "cached" and no bytes, the wrapped session only counts
+    the traffic that was actually sent.
+    """
+
+    def __init__(self, session, ttl=0):
+        self.session = session
+        self.ttl = ttl
+        self.requests = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+        # (query sha256, variables JSON) -> future of (data, stats)
+        self._in_flight = {}
+        # (query sha256, variables JSON) -> (expires at, data, stats)
+        self._cache = {}
+
+    def _served(self, stats, encoding):
+        return stats._replace(
+            encoding=encoding,
+            compressed_bytes=0,
+            uncompressed_bytes=0,
+            decode_time=0.0,
+            request_bytes=0,
+            server_parse_time=math.nan,
+        )
+
+    async def execute_measured(self, document, variable_values=None):
+        """Execute a parsed query, returning (data, stats)"""
+        self.requests += 1
+        definition = document.definitions[0]
+        if getattr(definition, "operation", None) is OperationType.MUTATION:
+            return await self.session.execute_measured(document, variable_values)
+
+        # Keyed on the printed query, equal documents parsed twice coalesce too
+        _, query_hash = self.session._query(document)
+        key = (query_hash, json.dumps(variable_values or {}, sort_keys=True))
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > now:
+            self.cache_hits += 1
+            return cached[1], self._served(cached[2], "cached")
+
+        while (future := self._in_flight.get(key)) is not None:
+            try:
+                data, stats = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only the leading caller was cancelled: send the query again
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                continue
+            self.coalesced += 1
+            return data, self._served(stats, "coalesced")
+
+        future = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        try:
+            data, stats = await self.session.execute_measured(document, variable_values)
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result((data, stats))
+        finally:
+            # The caller was cancelled, the callers waiting for it retry
+            del self._in_flight[key]
+            if not future.done():
+                future.cancel()
+        if self.ttl:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+            self._cache[key] = (time.monotonic() + self.ttl, data, stats)
+        return data, stats
+
+    async def execute(self, document, variable_values=None):
+        data, _ = await self.execute_measured(document, variable_values)
+        return data
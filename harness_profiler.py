@@ -0,0 +1,175 @@
+import cProfile
+import csv
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Profiler modes selectable with the PROFILE environment variable
+PROFILE_MODES = ("off", "cprofile", "sample")
+
+# Interval between stack samples in "sample" mode (seconds)
+SAMPLE_INTERVAL = 0.005
+
+# Number of functions listed in the text stats
+TOP_FUNCTIONS = 40
+
+
+class PhaseCounters:
+    """
+    Accumulates the time the harness itself spends in named phases
+    (rate limit checks, result aggregation, CSV writing, ...).
+    """
+
+    def __init__(self):
+        self.calls = Counter()
+        self.totals = Counter()
+
+    @contextmanager
+    def measure(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[phase] += time.perf_counter() - start
+            self.calls[phase] += 1
+
+    def rows(self):
+        return [
+            {
+                "phase": phase,
+                "calls": self.calls[phase],
+                "total_time": self.totals[phase],
+                "mean_time": self.totals[phase] / self.calls[phase],
+            }
+            for phase in sorted(self.calls)
+        ]
+
+    def save_to_csv(self, filename):
+        """Save the per-phase client overhead to a CSV file"""
+        rows = self.rows()
+        if not rows:
+            return
+
+        with open(filename, "w", newline="") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=rows[0].keys())
+            writer.writeheader()
+            writer.writerows(rows)
+
+        logger.info(f"Client overhead saved to {filename}")
+
+
+class StackSampler:
+    """
+    Sampling profiler for the main thread. A background thread records the
+    main thread's stack every SAMPLE_INTERVAL and counts identical stacks,
+    which is the "folded" format understood by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = threading.main_thread().ident
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def function_stats(self):
+        """Return (function, self samples, total samples) sorted by total samples"""
+        own = Counter()
+        total = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        return sorted(
+            ((name, own[name], total[name]) for name in total),
+            key=lambda row: row[2],
+            reverse=True,
+        )
+
+    def save(self, prefix):
+        with open(f"{prefix}.folded", "w") as folded_file:
+            for stack, count in self.stacks.items():
+                folded_file.write(f"{stack} {count}\n")
+
+        total_samples = sum(self.stacks.values()) or 1
+        with open(f"{prefix}_stats.txt", "w") as stats_file:
+            stats_file.write(f"{total_samples} samples every {self.interval}s\n\n")
+            stats_file.write(f"{'self %':>8} {'total %':>8}  function\n")
+            for name, own, total in self.function_stats()[:TOP_FUNCTIONS]:
+                stats_file.write(
+                    f"{own / total_samples:>8.1%} {total / total_samples:>8.1%}  {name}\n"
+                )
+
+        logger.info(f"Profile saved to {prefix}.folded and {prefix}_stats.txt")
+
+
+@contextmanager
+def profile_run(prefix, mode=None):
+    """
+    Profile the enclosed block when profiling is enabled
+    (mode or the PROFILE environment variable, "off" by default).
+    "cprofile" writes {prefix}.pstats and {prefix}_stats.txt,
+    "sample" writes {prefix}.folded (flamegraph input) and {prefix}_stats.txt.
+    """
+    mode = mode or os.environ.get("PROFILE", "off")
+    if mode not in PROFILE_MODES:
+        raise Exception(f"Unknown PROFILE {mode!r}, use one of {PROFILE_MODES}")
+
+    if mode == "off":
+        yield
+        return
+
+    logger.info(f"Profiling benchmark harness ({mode})")
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(f"{prefix}.pstats")
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(
+                TOP_FUNCTIONS
+            )
+            with open(f"{prefix}_stats.txt", "w") as stats_file:
+                stats_file.write(text.getvalue())
+            logger.info(f"Profile saved to {prefix}.pstats and {prefix}_stats.txt")
+    else:
+        sampler = StackSampler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            sampler.save(prefix)
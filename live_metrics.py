@@ -0,0 +1,335 @@
+import asyncio
+import json
+import logging
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Latency bucket upper bounds: 1ms growing by 10% per bucket up to ~2 minutes
+LATENCY_BUCKETS = tuple(0.001 * 1.1**i for i in range(124))
+
+# Seconds between snapshot file writes
+SNAPSHOT_INTERVAL = 10
+
+
+class Histogram:
+    """Fixed-bucket latency histogram, observe() is a single bisect and a few adds"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimate the q quantile (0-1) by interpolating inside its bucket"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                upper = min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.max
+
+    def merge(self, other):
+        for index, bucket_count in enumerate(other.counts):
+            self.counts[index] += bucket_count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def to_dict(self):
+        return {
+            "counts": self.counts,
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.counts = list(data["counts"])
+        histogram.count = data["count"]
+        histogram.sum = data["sum"]
+        histogram.max = data["max"]
+        return histogram
+
+
+def render_histogram(name, labels, histogram):
+    """Prometheus text lines of one labelled histogram"""
+    lines = []
+    cumulative = 0
+    for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+        cumulative += bucket_count
+        lines.append(f'{name}_bucket{{{labels},le="{bound:.6g}"}} {cumulative}')
+    return lines + [
+        f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}',
+        f"{name}_sum{{{labels}}} {histogram.sum}",
+        f"{name}_count{{{labels}}} {histogram.count}",
+    ]
+
+
+class LiveMetrics:
+    """
+    Rolling counters and latency histograms per GraphQL operation, kept in
+    memory for the whole benchmark and rendered on demand. Failed requests
+    are counted per operation and error_taxonomy category, with the latency
+    at which they failed.
+    """
+
+    def __init__(self):
+        self.in_flight_source = None
+        self.reset()
+
+    def reset(self):
+        """Forget everything observed so far, keeping in_flight_source"""
+        self.started = time.time()
+        self.requests = defaultdict(int)
+        # (operation, category) -> count / latency-at-failure histogram
+        self.errors = defaultdict(int)
+        self.error_latency = defaultdict(Histogram)
+        self.rate_limited = defaultdict(int)
+        self.backoff_seconds = 0.0
+        self.latency = defaultdict(Histogram)
+        self._last_snapshot = (self.started, 0)
+
+    def observe_request(self, operation, latency):
+        self.requests[operation] += 1
+        self.latency[operation].observe(latency)
+
+    def observe_error(self, operation, category, latency):
+        self.errors[operation, category] += 1
+        self.error_latency[operation, category].observe(latency)
+
+    def observe_rate_limit(self, operation, backoff):
+        self.rate_limited[operation] += 1
+        self.backoff_seconds += backoff
+
+    def to_dict(self):
+        """Counters and histograms as JSON, for merging metrics of several processes"""
+        return {
+            "requests": self.requests,
+            "rate_limited": self.rate_limited,
+            "backoff_seconds": self.backoff_seconds,
+            "latency": {
+                operation: histogram.to_dict()
+                for operation, histogram in self.latency.items()
+            },
+            "errors": [
+                [
+                    operation,
+                    category,
+                    count,
+                    self.error_latency[operation, category].to_dict(),
+                ]
+                for (operation, category), count in self.errors.items()
+            ],
+        }
+
+    def merge_dict(self, data):
+        """Add the metrics of another process, as returned by to_dict()"""
+        for operation, count in data["requests"].items():
+            self.requests[operation] += count
+        for operation, count in data["rate_limited"].items():
+            self.rate_limited[operation] += count
+        self.backoff_seconds += data["backoff_seconds"]
+        for operation, histogram in data["latency"].items():
+            self.latency[operation].merge(Histogram.from_dict(histogram))
+        for operation, category, count, histogram in data["errors"]:
+            self.errors[operation, category] += count
+            self.error_latency[operation, category].merge(
+                Histogram.from_dict(histogram)
+            )
+
+    def in_flight(self):
+        return self.in_flight_source() if self.in_flight_source else 0
+
+    def snapshot(self):
+        """
+        Current values as a JSON-serializable dict, request_rate is measured
+        since the previous snapshot.
+        """
+        now = time.time()
+        total_requests = sum(self.requests.values())
+        last_time, last_requests = self._last_snapshot
+        self._last_snapshot = (now, total_requests)
+        return {
+            "timestamp": now,
+            "elapsed": now - self.started,
+            "requests_total": total_requests,
+            "request_rate": (
+                (total_requests - last_requests) / (now - last_time)
+                if now > last_time
+                else 0
+            ),
+            "in_flight": self.in_flight(),
+            "rate_limited_total": sum(self.rate_limited.values()),
+            "backoff_seconds_total": self.backoff_seconds,
+            "operations": {
+                operation: {
+                    "requests": self.requests[operation],
+                    "errors": {
+                        category: count
+                        for (error_operation, category), count in self.errors.items()
+                        if error_operation == operation
+                    },
+                    "rate_limited": self.rate_limited[operation],
+                    "p50": self.latency.get(operation, Histogram()).quantile(0.5),
+                    "p99": self.latency.get(operation, Histogram()).quantile(0.99),
+                }
+                for operation in {
+                    *self.latency,
+                    *(operation for operation, _ in self.errors),
+                }
+            },
+        }
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP benchmark_requests_total GraphQL requests completed.",
+            "# TYPE benchmark_requests_total counter",
+        ]
+        for operation, count in self.requests.items():
+            lines.append(f'benchmark_requests_total{{operation="{operation}"}} {count}')
+
+        lines += [
+            "# HELP benchmark_errors_total GraphQL requests that failed, by error category.",
+            "# TYPE benchmark_errors_total counter",
+        ]
+        for (operation, category), count in self.errors.items():
+            lines.append(
+                f'benchmark_errors_total{{operation="{operation}",category="{category}"}} {count}'
+            )
+
+        lines += [
+            "# HELP benchmark_rate_limited_total Responses rejected with 429.",
+            "# TYPE benchmark_rate_limited_total counter",
+        ]
+        for operation, count in self.rate_limited.items():
+            lines.append(
+                f'benchmark_rate_limited_total{{operation="{operation}"}} {count}'
+            )
+
+        lines += [
+            "# HELP benchmark_backoff_seconds_total Time spent waiting after 429s.",
+            "# TYPE benchmark_backoff_seconds_total counter",
+            f"benchmark_backoff_seconds_total {self.backoff_seconds}",
+            "# HELP benchmark_in_flight Requests waiting for a response.",
+            "# TYPE benchmark_in_flight gauge",
+            f"benchmark_in_flight {self.in_flight()}",
+            "# HELP benchmark_request_latency_seconds GraphQL request latency.",
+            "# TYPE benchmark_request_latency_seconds histogram",
+        ]
+        for operation, histogram in self.latency.items():
+            lines += render_histogram(
+                "benchmark_request_latency_seconds",
+                f'operation="{operation}"',
+                histogram,
+            )
+
+        lines += [
+            "# HELP benchmark_error_latency_seconds Time until a request failed, by error category.",
+            "# TYPE benchmark_error_latency_seconds histogram",
+        ]
+        for (operation, category), histogram in self.error_latency.items():
+            lines += render_histogram(
+                "benchmark_error_latency_seconds",
+                f'operation="{operation}",category="{category}"',
+                histogram,
+            )
+
+        lines += [
+            "# HELP benchmark_request_latency_quantile_seconds Estimated latency quantiles.",
+            "# TYPE benchmark_request_latency_quantile_seconds gauge",
+        ]
+        for operation, histogram in self.latency.items():
+            for quantile in (0.5, 0.99):
+                lines.append(
+                    f'benchmark_request_latency_quantile_seconds{{operation="{operation}",quantile="{quantile}"}} {histogram.quantile(quantile)}'
+                )
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """
+    Exposes LiveMetrics on http://<host>:<port>/metrics and/or appends a JSON
+    snapshot to snapshot_path every SNAPSHOT_INTERVAL seconds.
+    """
+
+    def __init__(
+        self,
+        metrics,
+        port=None,
+        host="127.0.0.1",
+        snapshot_path=None,
+        snapshot_interval=SNAPSHOT_INTERVAL,
+    ):
+        self.metrics = metrics
+        self.port = port
+        self.host = host
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._runner = None
+        self._snapshot_task = None
+
+    async def _handle_metrics(self, request):
+        return web.Response(
+            text=self.metrics.render_prometheus(),
+            content_type="text/plain",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+    async def _write_snapshots(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            self.write_snapshot()
+
+    def write_snapshot(self):
+        with open(self.snapshot_path, "a") as snapshot_file:
+            snapshot_file.write(json.dumps(self.metrics.snapshot()) + "\n")
+
+    async def start(self):
+        if self.port:
+            app = web.Application()
+            app.router.add_get("/metrics", self._handle_metrics)
+            self._runner = web.AppRunner(app, access_log=None)
+            await self._runner.setup()
+            await web.TCPSite(self._runner, self.host, self.port).start()
+            logger.info(
+                f"Serving live metrics on http://{self.host}:{self.port}/metrics"
+            )
+
+        if self.snapshot_path:
+            self._snapshot_task = asyncio.create_task(self._write_snapshots())
+            logger.info(f"Writing metrics snapshots to {self.snapshot_path}")
+
+    async def stop(self):
+        if self._snapshot_task is not None:
+            self._snapshot_task.cancel()
+            try:
+                await self._snapshot_task
+            except asyncio.CancelledError:
+                pass
+            self.write_snapshot()
+        if self._runner is not None:
+            await self._runner.cleanup()
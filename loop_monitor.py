@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# How often the event loop is sampled (seconds)
+SAMPLE_INTERVAL = 0.05
+
+# A run is marked as saturated when the p99 loop lag exceeds this (seconds) ...
+LAG_THRESHOLD = 0.02
+
+# ... or when the process uses more than this fraction of one CPU core
+CPU_THRESHOLD = 0.9
+
+# Event loop implementations selectable with the EVENT_LOOP environment variable
+EVENT_LOOPS = ("asyncio", "uvloop")
+
+
+class LoopMonitor:
+    """
+    Samples event-loop lag, process CPU usage and in-flight requests while a run
+    is in progress. Lag is how late a sleep of SAMPLE_INTERVAL wakes up, i.e. how
+    long the loop was blocked by client-side work (JSON decoding, logging, ...).
+    """
+
+    def __init__(
+        self,
+        interval=SAMPLE_INTERVAL,
+        lag_threshold=LAG_THRESHOLD,
+        cpu_threshold=CPU_THRESHOLD,
+    ):
+        self.interval = interval
+        self.lag_threshold = lag_threshold
+        self.cpu_threshold = cpu_threshold
+        self.in_flight = 0
+        self.samples = []
+        self._task = None
+        self._max_in_flight = 0
+        self._wall_start = None
+        self._cpu_start = None
+
+    @contextmanager
+    def track_request(self):
+        """Count a request as in flight for the duration of the block"""
+        self.in_flight += 1
+        if self.in_flight > self._max_in_flight:
+            self._max_in_flight = self.in_flight
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def start(self):
+        """Start sampling on the running event loop, discarding previous samples"""
+        if self._task is not None:
+            self._task.cancel()
+        self.samples = []
+        self._max_in_flight = self.in_flight
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._task = asyncio.create_task(self._sample())
+
+    async def stop(self):
+        """Stop sampling and return the summary of the monitored period"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        return self.summary()
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        last_wall = time.perf_counter()
+        last_cpu = time.process_time()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+
+            wall = time.perf_counter()
+            cpu = time.process_time()
+            cpu_usage = (cpu - last_cpu) / (wall - last_wall) if wall > last_wall else 0
+            last_wall, last_cpu = wall, cpu
+
+            self.samples.append(
+                (wall - self._wall_start, lag, cpu_usage, self.in_flight)
+            )
+
+    def summary(self):
+        """Aggregate the samples into the fields stored with every benchmark result"""
+        lags = sorted(sample[1] for sample in self.samples)
+        wall = time.perf_counter() - self._wall_start if self._wall_start else 0
+        cpu = time.process_time() - self._cpu_start if self._cpu_start else 0
+        cpu_usage = cpu / wall if wall > 0 else 0
+
+        if lags:
+            lag_p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+            lag_max = lags[-1]
+        else:
+            lag_p99 = lag_max = 0.0
+
+        return {
+            "loop_lag_p99": lag_p99,
+            "loop_lag_max": lag_max,
+            "cpu_usage": cpu_usage,
+            "max_in_flight": self._max_in_flight,
+            "generator_saturated": lag_p99 > self.lag_threshold
+            or cpu_usage > self.cpu_threshold,
+        }
+
+
+def run_event_loop(coro, event_loop=None):
+    """
+    Run coro to completion on the selected event loop implementation
+    ("asyncio" or "uvloop", defaults to the EVENT_LOOP environment variable).
+    """
+    event_loop = event_loop or os.environ.get("EVENT_LOOP", "asyncio")
+    if event_loop not in EVENT_LOOPS:
+        raise Exception(f"Unknown EVENT_LOOP {event_loop!r}, use one of {EVENT_LOOPS}")
+
+    loop_factory = None
+    if event_loop == "uvloop":
+        try:
+            import uvloop
+        except ImportError as e:
+            raise Exception(
+                "EVENT_LOOP=uvloop requires the optional uvloop package "
+                "(`poetry install --extras uvloop` or `pip install uvloop`)"
+            ) from e
+        loop_factory = uvloop.new_event_loop
+
+    logger.info(f"Using {event_loop} event loop")
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        return runner.run(coro)
@@ -1,9 +1,13 @@
 import asyncio
+import time
 import uuid
 import os
 from gql import gql, Client
 from gql.transport.aiohttp import AIOHTTPTransport
 
+from error_taxonomy import classify_error
+from live_metrics import LiveMetrics
+
 app_mutation_str = """
 mutation AppCreate($input: AppInput!) {
   appCreate(input: $input) {
@@ -142,8 +146,33 @@ webhook_query = """subscription {\n  event {\n    ... on OrderCancelled {\n
 app_mutation = gql(app_mutation_str)
 webhook_mutation = gql(webhook_mutation_str)
 
-# Semaphore to control request rate
-rate_limiter = asyncio.Semaphore(2)
+# Number of apps (each with one webhook) to create
+NUM_APPS = 100
+
+# Maximum number of apps being created concurrently
+CONCURRENCY = 2
+
+# Seconds to wait after each app before releasing its slot
+DELAY = 1
+
+WEBHOOK_TARGET_URL = "https://example.com"
+
+# Latency histograms and error counters of the mutations
+live_metrics = LiveMetrics()
+
+
+async def execute_measured(session, operation, document, variables):
+    """Execute a mutation, recording its latency in live_metrics"""
+    request_start = time.perf_counter()
+    try:
+        result = await session.execute(document, variable_values=variables)
+    except Exception as e:
+        live_metrics.observe_error(
+            operation, classify_error(e), time.perf_counter() - request_start
+        )
+        raise
+    live_metrics.observe_request(operation, time.perf_counter() - request_start)
+    return result
 
 
 async def execute_app_mutation(client) -> str:
@@ -157,15 +186,15 @@ async def execute_app_mutation(client) -> str:
     }
 
     async with client as session:
-        result = await session.execute(app_mutation, variable_values=variables)
+        result = await execute_measured(session, "AppCreate", app_mutation, variables)
         return result["appCreate"]["app"]["id"]
 
 
-async def execute_webhook_mutation(client, app_id):
+async def execute_webhook_mutation(client, app_id, target_url=WEBHOOK_TARGET_URL):
     variables = {
         "input": {
             "name": f"Test app webhook ${app_id}",
-            "targetUrl": "https://example.com",
+            "targetUrl": target_url,
             "asyncEvents": ["ORDER_CREATED"],
             "syncEvents": [],
             "isActive": True,
@@ -176,11 +205,20 @@ async def execute_webhook_mutation(client, app_id):
     }
 
     async with client as session:
-        result = await session.execute(webhook_mutation, variable_values=variables)
+        result = await execute_measured(
+            session, "WebhookCreate", webhook_mutation, variables
+        )
         return result["webhookCreate"]["webhook"]["id"]
 
 
-async def execute_mutations(saleorApiUrl, token, index):
+async def execute_mutations(
+    saleorApiUrl,
+    token,
+    index,
+    rate_limiter,
+    target_url=WEBHOOK_TARGET_URL,
+    delay=DELAY,
+):
     headers = {"Authorization": f"Bearer {token}"}
     transport = AIOHTTPTransport(url=saleorApiUrl, headers=headers)
     client = Client(transport=transport, fetch_schema_from_transport=False)
@@ -191,30 +229,49 @@ async def execute_mutations(saleorApiUrl, token, index):
             app_id = await execute_app_mutation(client)
             print(f"Created app no. {index + 1} (id: {app_id})")
 
-            webhook_id = await execute_webhook_mutation(client, app_id)
+            webhook_id = await execute_webhook_mutation(client, app_id, target_url)
             print(f"Created webhook for app no. {index + 1} (id: {webhook_id})")
 
-            # Wait for 1 second before releasing the semaphore
-            await asyncio.sleep(1)
+            # Wait before releasing the semaphore
+            await asyncio.sleep(delay)
     except Exception as e:
         return e
 
 
-async def main():
+async def main(
+    url=None,
+    token=None,
+    count=NUM_APPS,
+    concurrency=CONCURRENCY,
+    target_url=WEBHOOK_TARGET_URL,
+    delay=DELAY,
+):
     # Replace with your GraphQL endpoint
-    url = os.environ.get("SALEOR_GRAPHQL_URL", "http://localhost:8000/graphql/")
-    token = os.environ.get("AUTH_TOKEN")
+    url = url or os.environ.get("SALEOR_GRAPHQL_URL", "http://localhost:8000/graphql/")
+    token = token or os.environ.get("AUTH_TOKEN")
 
     if not token:
         raise Exception("Please provide an AUTH_TOKEN environment variable")
 
-    # Execute 100 mutations concurrently
-    tasks = [execute_mutations(url, token, i) for i in range(100)]
+    # Semaphore to control request rate
+    rate_limiter = asyncio.Semaphore(concurrency)
+
+    # Execute the mutations concurrently
+    tasks = [
+        execute_mutations(url, token, i, rate_limiter, target_url, delay)
+        for i in range(count)
+    ]
     results = await asyncio.gather(*tasks)
 
-    # Count successful queries
-    successful = sum(1 for r in results if r is None)
-    print(f"\nCompleted {successful} out of 100 queries successfully")
+    # Count successful queries and failures per error category
+    errors = {}
+    for r in results:
+        if r is not None:
+            category = classify_error(r)
+            errors[category] = errors.get(category, 0) + 1
+    successful = count - sum(errors.values())
+    print(f"\nCompleted {successful} out of {count} queries successfully")
+    return {"count": count, "successful": successful, "errors": errors}
 
 
 if __name__ == "__main__":
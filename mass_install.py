@@ -1,9 +1,13 @@
 import asyncio
+import time
 import uuid
 import os
 from gql import gql, Client
 from gql.transport.aiohttp import AIOHTTPTransport
 
+from error_taxonomy import classify_error
+from live_metrics import LiveMetrics
+
 # Define the GraphQL mutation
 mutation_str = """
 mutation AppInstall($input: AppInstallInput!) {
@@ -35,17 +39,30 @@ fragment AppError on AppError {
 # Parse the mutation string
 mutation = gql(mutation_str)
 
-# Semaphore to control request rate
-rate_limiter = asyncio.Semaphore(1)
+# Number of apps to install
+NUM_APPS = 30
+
+# Maximum number of installations running concurrently
+CONCURRENCY = 1
+
+# Seconds to wait after each installation before releasing its slot
+DELAY = 1
 
+MANIFEST_URL = "https://9d311d3d.saleor-app-hono-pages-template.pages.dev/api/manifest"
 
-async def execute_mutation(url, token, index):
+# Latency histograms and error counters of the installations
+live_metrics = LiveMetrics()
+
+
+async def execute_mutation(
+    url, token, index, rate_limiter, manifest_url=MANIFEST_URL, delay=DELAY
+):
     # Create unique app name for each request
     unique_id = str(uuid.uuid4())
     variables = {
         "input": {
             "appName": f"Test app - {unique_id}",
-            "manifestUrl": "https://9d311d3d.saleor-app-hono-pages-template.pages.dev/api/manifest",
+            "manifestUrl": manifest_url,
             "permissions": ["MANAGE_ORDERS"],
         }
     }
@@ -60,33 +77,64 @@ async def execute_mutation(url, token, index):
         async with rate_limiter:
             print(f"Starting query {index+1}")
             async with client as session:
-                result = await session.execute(mutation, variable_values=variables)
+                request_start = time.perf_counter()
+                try:
+                    result = await session.execute(mutation, variable_values=variables)
+                except Exception as e:
+                    live_metrics.observe_error(
+                        "AppInstall",
+                        classify_error(e),
+                        time.perf_counter() - request_start,
+                    )
+                    raise
+                live_metrics.observe_request(
+                    "AppInstall", time.perf_counter() - request_start
+                )
                 print(f"Query {index+1} completed successfully")
 
-                # Wait for 1 second before releasing the semaphore
-                await asyncio.sleep(1)
+                # Wait before releasing the semaphore
+                await asyncio.sleep(delay)
 
                 return result
     except Exception as e:
         print(f"Query {index+1} failed: {str(e)}")
-        return None
+        return e
 
 
-async def main():
+async def main(
+    url=None,
+    token=None,
+    count=NUM_APPS,
+    concurrency=CONCURRENCY,
+    manifest_url=MANIFEST_URL,
+    delay=DELAY,
+):
     # Replace with your GraphQL endpoint
-    url = os.environ.get("SALEOR_GRAPHQL_URL", "http://localhost:8000/graphql/")
-    token = os.environ.get("AUTH_TOKEN")
+    url = url or os.environ.get("SALEOR_GRAPHQL_URL", "http://localhost:8000/graphql/")
+    token = token or os.environ.get("AUTH_TOKEN")
 
     if not token:
         raise Exception("Please provide an AUTH_TOKEN environment variable")
 
-    # Execute 100 mutations concurrently
-    tasks = [execute_mutation(url, token, i) for i in range(30)]
+    # Semaphore to control request rate
+    rate_limiter = asyncio.Semaphore(concurrency)
+
+    # Execute the mutations concurrently
+    tasks = [
+        execute_mutation(url, token, i, rate_limiter, manifest_url, delay)
+        for i in range(count)
+    ]
     results = await asyncio.gather(*tasks)
 
-    # Count successful queries
-    successful = sum(1 for r in results if r is not None)
-    print(f"\nCompleted {successful} out of 100 queries successfully")
+    # Count successful queries and failures per error category
+    errors = {}
+    for r in results:
+        if isinstance(r, Exception):
+            category = classify_error(r)
+            errors[category] = errors.get(category, 0) + 1
+    successful = count - sum(errors.values())
+    print(f"\nCompleted {successful} out of {count} queries successfully")
+    return {"count": count, "successful": successful, "errors": errors}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,267 @@
+import asyncio
+import csv
+import json
+import logging
+import os
+import re
+import statistics
+import time
+from datetime import datetime, timezone
+
+import aiohttp
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Disable verbose logging from libraries
+logging.getLogger("aiohttp").setLevel(logging.WARNING)
+
+# Recorded request log, one JSON object per line:
+# {"timestamp": 1718000000.123, "operationName": "Apps", "query": "...", "variables": {...}}
+# "timestamp" may also be an ISO 8601 string, read as UTC when it has no
+# offset. Lines without "query" are skipped.
+REPLAY_LOG = "requests.jsonl"
+
+# 1.0 replays with the original inter-arrival timing, 2.0 twice as fast, etc.
+REPLAY_SPEED = 1.0
+
+# Upper bound for requests waiting on a response (and pooled connections)
+MAX_IN_FLIGHT = 10
+
+# Request timeout in seconds
+REQUEST_TIMEOUT = 60
+
+OPERATION_NAME_RE = re.compile(r"^\s*(?:query|mutation|subscription)\s+(\w+)")
+
+
+def parse_timestamp(value):
+    """
+    Convert a recorded timestamp (epoch seconds or ISO 8601 string) to
+    seconds. ISO timestamps without an offset are taken as UTC, not as the
+    local time of the replaying machine.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def operation_name_for(entry):
+    """Return the operation name of a recorded request, parsing the query if needed"""
+    name = entry.get("operationName")
+    if name:
+        return name
+    match = OPERATION_NAME_RE.match(entry["query"])
+    return match.group(1) if match else "anonymous"
+
+
+def iter_request_log(path):
+    """
+    Stream entries from a JSONL request log one line at a time.
+    Yields (timestamp, operation_name, payload) tuples, the log is never held in memory.
+    """
+    with open(path) as log_file:
+        for line_number, line in enumerate(log_file, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping line {line_number}: invalid JSON ({e})")
+                continue
+            if not isinstance(entry, dict) or not entry.get("query"):
+                logger.warning(f"Skipping line {line_number}: no GraphQL query")
+                continue
+
+            payload = {"query": entry["query"]}
+            if entry.get("variables"):
+                payload["variables"] = entry["variables"]
+            if entry.get("operationName"):
+                payload["operationName"] = entry["operationName"]
+
+            yield parse_timestamp(entry.get("timestamp")), operation_name_for(
+                entry
+            ), payload
+
+
+def percentile(sorted_values, q):
+    """Linear-interpolated percentile (q in 0-100) of an already sorted list"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = position - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+async def send_request(http, url, operation_name, payload, latencies, errors):
+    """Send one recorded request and record its latency under its operation name"""
+    start = time.perf_counter()
+    try:
+        async with http.post(url, json=payload) as resp:
+            body = await resp.json(content_type=None)
+            failed = resp.status >= 400 or (
+                isinstance(body, dict) and bool(body.get("errors"))
+            )
+    except Exception as e:
+        logger.debug(f"{operation_name} failed: {str(e)}")
+        failed = True
+    latencies.setdefault(operation_name, []).append(time.perf_counter() - start)
+    if failed:
+        errors[operation_name] = errors.get(operation_name, 0) + 1
+
+
+async def replay(url, token, log_path, speed=REPLAY_SPEED, max_in_flight=MAX_IN_FLIGHT):
+    """
+    Re-issue every request from the log against url, keeping the recorded
+    inter-arrival times divided by speed. At most max_in_flight requests are
+    outstanding; when the limit is reached reading the log pauses, so the
+    dispatch falls behind schedule instead of buffering requests.
+    Returns (latencies, errors, late_dispatches, max_dispatch_delay), the
+    delay in seconds behind the scaled recorded time.
+    """
+    latencies = {}
+    errors = {}
+    late_dispatches = 0
+    max_dispatch_delay = 0.0
+    pending = set()
+
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    connector = aiohttp.TCPConnector(limit=max_in_flight)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    semaphore = asyncio.Semaphore(max_in_flight)
+    loop = asyncio.get_running_loop()
+
+    async with aiohttp.ClientSession(
+        connector=connector, headers=headers, timeout=timeout
+    ) as http:
+        replay_start = loop.time()
+        first_timestamp = None
+        offset = 0.0
+
+        for timestamp, operation_name, payload in iter_request_log(log_path):
+            # Entries without a timestamp are sent together with the previous one
+            if timestamp is not None:
+                if first_timestamp is None:
+                    first_timestamp = timestamp
+                offset = max(0.0, timestamp - first_timestamp) / speed
+
+            delay = replay_start + offset - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            await semaphore.acquire()
+            dispatch_delay = loop.time() - (replay_start + offset)
+            if dispatch_delay > 0.01:
+                late_dispatches += 1
+                max_dispatch_delay = max(max_dispatch_delay, dispatch_delay)
+
+            task = asyncio.create_task(
+                send_request(http, url, operation_name, payload, latencies, errors)
+            )
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            task.add_done_callback(lambda _: semaphore.release())
+
+        if pending:
+            await asyncio.gather(*pending)
+
+    return latencies, errors, late_dispatches, max_dispatch_delay
+
+
+def summarize_latencies(latencies, errors):
+    """Build per-operation latency statistics rows"""
+    rows = []
+    for operation_name in sorted(latencies):
+        values = sorted(latencies[operation_name])
+        rows.append(
+            {
+                "operation": operation_name,
+                "count": len(values),
+                "errors": errors.get(operation_name, 0),
+                "min": values[0],
+                "mean": statistics.mean(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+                "max": values[-1],
+            }
+        )
+    return rows
+
+
+def save_summary_to_csv(rows, filename):
+    """Save per-operation latency statistics to a CSV file"""
+    if not rows:
+        logger.error("No results to save to CSV")
+        return
+
+    with open(filename, "w", newline="") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+
+    logger.info(f"Results saved to {filename}")
+
+
+async def main(
+    url=None,
+    token=None,
+    log_path=REPLAY_LOG,
+    speed=REPLAY_SPEED,
+    max_in_flight=MAX_IN_FLIGHT,
+):
+    url = url or os.environ.get("SALEOR_GRAPHQL_URL", "http://localhost:8000/graphql/")
+    token = token or os.environ.get("AUTH_TOKEN")
+
+    if speed <= 0:
+        raise Exception("REPLAY_SPEED must be greater than 0")
+
+    logger.info(
+        f"Replaying {log_path} against {url} at {speed}x speed "
+        f"(max {max_in_flight} in flight)"
+    )
+    replay_start = time.perf_counter()
+    latencies, errors, late_dispatches, max_dispatch_delay = await replay(
+        url, token, log_path, speed, max_in_flight
+    )
+    elapsed = time.perf_counter() - replay_start
+
+    rows = summarize_latencies(latencies, errors)
+    total = sum(row["count"] for row in rows)
+    logger.info(f"Replayed {total} requests in {elapsed:.2f}s")
+    if late_dispatches:
+        logger.warning(
+            f"{late_dispatches} requests were sent late, up to "
+            f"{max_dispatch_delay * 1000:.1f}ms behind the recorded timing "
+            f"({max_in_flight} requests in flight or a busy event loop)"
+        )
+
+    for row in rows:
+        logger.info(
+            f"{row['operation']}: count={row['count']} errors={row['errors']} "
+            f"mean={row['mean']:.4f}s p50={row['p50']:.4f}s "
+            f"p90={row['p90']:.4f}s p99={row['p99']:.4f}s max={row['max']:.4f}s"
+        )
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    save_summary_to_csv(rows, f"replay_results_{timestamp}.csv")
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            log_path=os.environ.get("REPLAY_LOG", REPLAY_LOG),
+            speed=float(os.environ.get("REPLAY_SPEED", REPLAY_SPEED)),
+            max_in_flight=int(os.environ.get("REPLAY_MAX_IN_FLIGHT", MAX_IN_FLIGHT)),
+        )
+    )
@@ -0,0 +1,142 @@
+import json
+import logging
+import time
+from array import array
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Every sample is stored as float64 values in this order, request/response
+# sizes and timings are NaN when the request was not measured and error is
+# NaN for successful requests
+SAMPLE_FIELDS = (
+    "run_number",
+    "operation",
+    "start",
+    "latency",
+    "encoding",
+    "compressed_bytes",
+    "uncompressed_bytes",
+    "decode_time",
+    "request_bytes",
+    "server_parse_time",
+    "error",
+)
+
+NAN = float("nan")
+
+# Number of samples buffered in memory before they are appended to the file
+FLUSH_EVERY = 65536
+
+
+class RequestSamples:
+    """
+    Appends one record per GraphQL request to a raw float64 file that the
+    report memory-maps. Operation names, response encodings and error
+    categories are stored as indexes into the lists saved in the
+    "<path>.json" sidecar when the file is closed. Tools that share the
+    benchmark's request functions without wanting samples pause recording.
+    """
+
+    def __init__(self):
+        self.path = None
+        self.run_number = 0
+        self.operations = {}
+        self.encodings = {}
+        self.errors = {}
+        self.count = 0
+        self.enabled = True
+        self.flush_every = FLUSH_EVERY
+        self._buffer = array("d")
+        self._file = None
+        self._discard_warned = False
+        self._started = time.perf_counter()
+
+    def open(self, path, flush_every=FLUSH_EVERY):
+        self.path = path
+        self.flush_every = flush_every
+        self._file = open(path, "wb")
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def paused(self):
+        """Record nothing inside the with block"""
+        enabled, self.enabled = self.enabled, False
+        try:
+            yield
+        finally:
+            self.enabled = enabled
+
+    def _index(self, names, name):
+        index = names.get(name)
+        if index is None:
+            index = names[name] = len(names)
+        return index
+
+    def record(self, operation, start, latency, response_stats=None, error=None):
+        """
+        Record a request that started at perf_counter() value start,
+        response_stats is the graphql_http.ResponseStats of its response and
+        error the error_taxonomy category of a failed request.
+        """
+        if not self.enabled:
+            return
+        if response_stats is None:
+            measurements = (NAN, NAN, NAN, NAN, NAN, NAN)
+        else:
+            measurements = (
+                self._index(self.encodings, response_stats.encoding),
+                response_stats.compressed_bytes,
+                response_stats.uncompressed_bytes,
+                response_stats.decode_time,
+                response_stats.request_bytes,
+                response_stats.server_parse_time,
+            )
+        self._buffer.extend(
+            (
+                self.run_number,
+                self._index(self.operations, operation),
+                start - self._started,
+                latency,
+                *measurements,
+                NAN if error is None else self._index(self.errors, error),
+            )
+        )
+        self.count += 1
+        if len(self._buffer) >= self.flush_every * len(SAMPLE_FIELDS):
+            self.flush()
+
+    def flush(self):
+        """
+        Append the buffered samples to the file. Without an open() file they
+        are dropped, which is logged once since the caller may have forgotten
+        to open one.
+        """
+        if self._file is not None:
+            self._buffer.tofile(self._file)
+            self._file.flush()
+        elif self._buffer and not self._discard_warned:
+            self._discard_warned = True
+            logger.warning(
+                f"No request samples file is open, discarding "
+                f"{len(self._buffer) // len(SAMPLE_FIELDS)} samples and all later ones"
+            )
+        del self._buffer[:]
+
+    def close(self):
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+        with open(f"{self.path}.json", "w") as sidecar:
+            json.dump(
+                {
+                    "fields": SAMPLE_FIELDS,
+                    "operations": sorted(self.operations, key=self.operations.get),
+                    "encodings": sorted(self.encodings, key=self.encodings.get),
+                    "errors": sorted(self.errors, key=self.errors.get),
+                    "count": self.count,
+                },
+                sidecar,
+            )
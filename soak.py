@@ -0,0 +1,575 @@
+import asyncio
+import csv
+import logging
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from gql import gql
+from gql.transport.exceptions import TransportQueryError
+
+from cursors_benchmark import (
+    BATCH_SIZES,
+    COMPRESSION,
+    PAGE_CONCURRENCY,
+    RateLimitException,
+    execute_with_retry,
+    fetch_all_app_ids,
+    live_metrics,
+    request_samples,
+    run_benchmark,
+)
+from error_taxonomy import classify_error
+from graphql_http import MeasuredSession, check_compression
+from live_metrics import MetricsExporter
+
+logger = logging.getLogger(__name__)
+
+# Failed deliveries of one app, as shown on the app's webhook details page
+DELIVERIES_QUERY = """
+query WebhookDeliveries($app: ID!) {
+  app(id: $app) {
+    id
+    webhooks {
+      id
+      failedDelivers: eventDeliveries(
+        first: 20
+        filter: {status: FAILED}
+        sortBy: {field: CREATED_AT, direction: DESC}
+      ) {
+        edges {
+          node {
+            id
+            createdAt
+            attempts(first: 6, sortBy: {field: CREATED_AT, direction: DESC}) {
+              edges {
+                node {
+                  id
+                  status
+                  createdAt
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+# Makes Saleor send a failed delivery to the app's webhook handler again
+DELIVERY_RETRY_MUTATION = """
+mutation DeliveryRetry($id: ID!) {
+  eventDeliveryRetry(id: $id) {
+    delivery {
+      id
+      status
+    }
+    errors {
+      field
+      message
+      code
+    }
+  }
+}
+"""
+
+# Newest attempt of the recent deliveries of a webhook, polled after a retry
+# until the app's webhook handler has answered the new attempt
+DELIVERY_ATTEMPTS_QUERY = """
+query DeliveryAttempts($webhook: ID!) {
+  webhook(id: $webhook) {
+    id
+    eventDeliveries(first: 100, sortBy: {field: CREATED_AT, direction: DESC}) {
+      edges {
+        node {
+          id
+          attempts(first: 1, sortBy: {field: CREATED_AT, direction: DESC}) {
+            edges {
+              node {
+                id
+                status
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+deliveries_query = gql(DELIVERIES_QUERY)
+delivery_retry_mutation = gql(DELIVERY_RETRY_MUTATION)
+delivery_attempts_query = gql(DELIVERY_ATTEMPTS_QUERY)
+
+# Seconds the soak test runs, 0 runs until interrupted
+SOAK_DURATION = 4 * 3600
+
+# Seconds between the starts of two app list visits / webhook delivery
+# retries, kept fixed regardless of how long each iteration takes
+APP_LIST_INTERVAL = 10
+DELIVERY_INTERVAL = 5
+
+# Iterations of one workload allowed in flight, ticks beyond that are skipped
+# and counted (app list visits share the benchmark's per-run state)
+APP_LIST_MAX_IN_FLIGHT = 1
+DELIVERY_MAX_IN_FLIGHT = 4
+
+# Seconds between polls for the attempt of a retried delivery, and seconds
+# after which a delivery the app did not answer counts as a timeout
+DELIVERY_POLL_INTERVAL = 0.25
+DELIVERY_TIMEOUT = 120
+
+# Seconds between refreshes of the app IDs deliveries are retried for
+APP_IDS_REFRESH_INTERVAL = 600
+
+# Returned by an iteration that found nothing to do (an app without failed
+# deliveries), counted apart from the measured iterations
+IDLE = "idle"
+
+# Request samples buffered before they are appended to the samples file,
+# small so the buffer does not show up in the memory drift (about 90 KB)
+SOAK_SAMPLES_FLUSH_EVERY = 1024
+
+# Latency percentiles are computed over the last SOAK_WINDOW seconds and
+# written every SOAK_REPORT_INTERVAL seconds
+SOAK_WINDOW = 300
+SOAK_REPORT_INTERVAL = 60
+
+# Drift tolerated per hour, relative to the fitted value at the start of the
+# soak test, evaluated once there are DRIFT_MIN_SECONDS of reports
+MAX_P99_DRIFT = 0.1
+MAX_MEMORY_DRIFT = 0.1
+DRIFT_MIN_SECONDS = 1800
+
+SOAK_FIELDS = [
+    "timestamp",
+    "elapsed",
+    "workload",
+    "iterations",
+    "errors",
+    "skipped",
+    "idle",
+    "p50",
+    "p90",
+    "p99",
+    "max",
+    "rss_bytes",
+    "p99_drift_per_hour",
+    "memory_drift_per_hour",
+    "drifting",
+]
+
+
+def process_memory():
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak instead of current RSS, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[
+        min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    ]
+
+
+class RollingWindow:
+    """Latencies and errors of the iterations finished in the last `seconds`"""
+
+    def __init__(self, seconds=SOAK_WINDOW):
+        self.seconds = seconds
+        # (finished at, latency, error category or None)
+        self.samples = deque()
+
+    def add(self, latency, error=None, now=None):
+        self.samples.append((time.monotonic() if now is None else now, latency, error))
+
+    def summary(self, now=None):
+        now = time.monotonic() if now is None else now
+        while self.samples and self.samples[0][0] < now - self.seconds:
+            self.samples.popleft()
+        latencies = sorted(
+            latency for _, latency, error in self.samples if error is None
+        )
+        summary = {
+            "iterations": len(self.samples),
+            "errors": len(self.samples) - len(latencies),
+        }
+        for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+            summary[name] = percentile(latencies, fraction) if latencies else None
+        summary["max"] = latencies[-1] if latencies else None
+        return summary
+
+
+class DriftDetector:
+    """
+    Relative change per hour of a series (p99 latency, memory use), from a
+    least-squares fit over all points: the slope divided by the fitted value
+    at the start. Drift is only reported once the points span min_seconds.
+    """
+
+    def __init__(self, max_drift, min_seconds=DRIFT_MIN_SECONDS):
+        self.max_drift = max_drift
+        self.min_seconds = min_seconds
+        self.elapsed = []
+        self.values = []
+
+    def add(self, elapsed, value):
+        if value is not None:
+            self.elapsed.append(elapsed / 3600)
+            self.values.append(value)
+
+    def drift(self):
+        if len(self.values) < 3:
+            return None
+        span = self.elapsed[-1] - self.elapsed[0]
+        if span == 0 or span * 3600 < self.min_seconds:
+            return None
+        slope, intercept = statistics.linear_regression(self.elapsed, self.values)
+        baseline = intercept if intercept > 0 else statistics.mean(self.values)
+        return slope / baseline if baseline else None
+
+    def is_drifting(self):
+        drift = self.drift()
+        return drift is not None and drift > self.max_drift
+
+
+class FixedRateWorkload:
+    """
+    Starts iteration() every interval seconds, independent of how long the
+    previous iterations take, with at most max_in_flight of them running.
+    iteration() returns None, IDLE when it had nothing to do or the error
+    category of a failure it handled itself, exceptions it raises are
+    classified here. Idle iterations are counted but not measured.
+    """
+
+    def __init__(self, name, iteration, interval, max_in_flight, window, p99_drift):
+        self.name = name
+        self.iteration = iteration
+        self.interval = interval
+        self.max_in_flight = max_in_flight
+        self.window = window
+        self.p99_drift = p99_drift
+        self.in_flight = 0
+        self.skipped = 0
+        self.idle = 0
+        self.iterations = 0
+        self.errors = Counter()
+        self._tasks = set()
+
+    async def _run_iteration(self):
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            error = await self.iteration()
+        except Exception as e:
+            error = classify_error(e)
+            logger.error(f"{self.name} failed ({error}): {str(e)}")
+        self.in_flight -= 1
+        if error == IDLE:
+            self.idle += 1
+            return
+        self.iterations += 1
+        if error is not None:
+            self.errors[error] += 1
+        self.window.add(time.perf_counter() - start, error)
+
+    async def run(self, until):
+        """Run until the monotonic time until, then wait for iterations in flight"""
+        next_at = time.monotonic()
+        try:
+            while until is None or next_at < until:
+                await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+                if self.in_flight >= self.max_in_flight:
+                    self.skipped += 1
+                else:
+                    task = asyncio.create_task(self._run_iteration())
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                next_at += self.interval
+        finally:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+async def execute(session, query, variables):
+    """execute_with_retry, also returning results that succeeded after a 429"""
+    try:
+        return await execute_with_retry(session, query, variables)
+    except RateLimitException as e:
+        return e.result
+
+
+async def latest_attempt(session, webhook_id, delivery_id):
+    """Newest attempt of a delivery of webhook_id, None when it has none"""
+    result = await execute(session, delivery_attempts_query, {"webhook": webhook_id})
+    for edge in ((result["webhook"] or {}).get("eventDeliveries") or {}).get(
+        "edges"
+    ) or []:
+        if edge["node"]["id"] == delivery_id:
+            attempts = edge["node"]["attempts"]["edges"]
+            return attempts[0]["node"] if attempts else None
+    return None
+
+
+async def retry_failed_delivery(
+    session, app_id, poll_interval=DELIVERY_POLL_INTERVAL, timeout=DELIVERY_TIMEOUT
+):
+    """
+    Load the failed deliveries of one app, retry the newest one and wait
+    until Saleor has sent it to the app again and the app's webhook handler
+    answered: a new attempt of the delivery is no longer PENDING. Returns the
+    retried delivery ID, or IDLE when the app has no failed deliveries.
+    """
+    result = await execute(session, deliveries_query, {"app": app_id})
+    failed = [
+        (webhook["id"], edge["node"])
+        for webhook in (result["app"] or {}).get("webhooks") or []
+        for edge in webhook["failedDelivers"]["edges"]
+    ]
+    if not failed:
+        return IDLE
+    webhook_id, delivery = failed[0]
+    previous_attempts = {edge["node"]["id"] for edge in delivery["attempts"]["edges"]}
+
+    result = await execute(session, delivery_retry_mutation, {"id": delivery["id"]})
+    errors = result["eventDeliveryRetry"]["errors"]
+    if errors:
+        raise TransportQueryError(str(errors), errors=errors)
+
+    async with asyncio.timeout(timeout):
+        while True:
+            attempt = await latest_attempt(session, webhook_id, delivery["id"])
+            if (
+                attempt is not None
+                and attempt["id"] not in previous_attempts
+                and attempt["status"] != "PENDING"
+            ):
+                return delivery["id"]
+            await asyncio.sleep(poll_interval)
+
+
+async def main(
+    url=None,
+    token=None,
+    duration=SOAK_DURATION,
+    app_list_interval=APP_LIST_INTERVAL,
+    delivery_interval=DELIVERY_INTERVAL,
+    window=SOAK_WINDOW,
+    report_interval=SOAK_REPORT_INTERVAL,
+    max_p99_drift=MAX_P99_DRIFT,
+    max_memory_drift=MAX_MEMORY_DRIFT,
+    drift_min_seconds=DRIFT_MIN_SECONDS,
+    page_concurrency=PAGE_CONCURRENCY,
+    compression=COMPRESSION,
+    persisted_queries=False,
+    fetch_strategy="cursors",
+    batch_size=BATCH_SIZES[0],
+    metrics_port=None,
+    delivery_timeout=DELIVERY_TIMEOUT,
+    app_ids_refresh_interval=APP_IDS_REFRESH_INTERVAL,
+):
+    """
+    Run the app list and webhook delivery workloads at a fixed rate for
+    duration seconds (0 = until interrupted), writing rolling-window latency
+    percentiles, memory use and drift to soak_<timestamp>.csv and every
+    request to soak_samples_<timestamp>.bin. The app IDs
+    deliveries are retried for are refreshed every app_ids_refresh_interval
+    seconds.
+    Returns the names of the series that drifted.
+    """
+    check_compression(compression)
+    url = url or os.environ.get("SALEOR_GRAPHQL_URL", "http://localhost:8000/graphql/")
+    token = token or os.environ.get("AUTH_TOKEN")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"soak_{timestamp}.csv"
+    exporter = MetricsExporter(live_metrics, port=metrics_port)
+    await exporter.start()
+    request_samples.open(
+        f"soak_samples_{timestamp}.bin", flush_every=SOAK_SAMPLES_FLUSH_EVERY
+    )
+
+    async with MeasuredSession(
+        url, headers, compression, persisted_queries=persisted_queries
+    ) as session:
+        app_ids, _, _ = await fetch_all_app_ids(session)
+
+        async def app_list_visit():
+            result = await run_benchmark(
+                url,
+                token,
+                page_concurrency,
+                False,
+                compression,
+                persisted_queries,
+                None,
+                fetch_strategy,
+                batch_size,
+            )
+            return result["error_category"]
+
+        async def delivery_retry():
+            if not app_ids:
+                return IDLE
+            result = await retry_failed_delivery(
+                session,
+                random.choice(app_ids),
+                timeout=delivery_timeout,
+            )
+            return IDLE if result == IDLE else None
+
+        workloads = []
+        if app_list_interval:
+            workloads.append(
+                FixedRateWorkload(
+                    "app_list",
+                    app_list_visit,
+                    app_list_interval,
+                    APP_LIST_MAX_IN_FLIGHT,
+                    RollingWindow(window),
+                    DriftDetector(max_p99_drift, drift_min_seconds),
+                )
+            )
+        if delivery_interval:
+            if not app_ids:
+                logger.warning(
+                    "No apps found yet, webhook delivery retries are idle until "
+                    "the app IDs are refreshed"
+                )
+            workloads.append(
+                FixedRateWorkload(
+                    "webhook_delivery",
+                    delivery_retry,
+                    delivery_interval,
+                    DELIVERY_MAX_IN_FLIGHT,
+                    RollingWindow(window),
+                    DriftDetector(max_p99_drift, drift_min_seconds),
+                )
+            )
+        memory_drift = DriftDetector(max_memory_drift, drift_min_seconds)
+
+        started = time.monotonic()
+        until = started + duration if duration else None
+        logger.info(
+            f"Soak test of {', '.join(w.name for w in workloads)} for "
+            + (f"{duration / 3600:.1f}h" if duration else "until interrupted")
+            + f", results in {filename}"
+        )
+
+        drifting = set()
+        csvfile = open(filename, "w", newline="")
+        writer = csv.DictWriter(csvfile, fieldnames=SOAK_FIELDS)
+        writer.writeheader()
+
+        def report():
+            elapsed = time.monotonic() - started
+            rss = process_memory()
+            memory_drift.add(elapsed, rss)
+            for workload in workloads:
+                summary = workload.window.summary()
+                workload.p99_drift.add(elapsed, summary["p99"])
+                p99_drift = workload.p99_drift.drift()
+                is_drifting = workload.p99_drift.is_drifting()
+                if is_drifting and workload.name not in drifting:
+                    logger.warning(
+                        f"{workload.name} p99 latency is drifting: "
+                        f"{p99_drift:+.1%} per hour (limit {max_p99_drift:.0%})"
+                    )
+                    drifting.add(workload.name)
+                writer.writerow(
+                    {
+                        "timestamp": datetime.now().isoformat(timespec="seconds"),
+                        "elapsed": round(elapsed, 1),
+                        "workload": workload.name,
+                        "skipped": workload.skipped,
+                        "idle": workload.idle,
+                        **summary,
+                        "rss_bytes": rss,
+                        "p99_drift_per_hour": p99_drift,
+                        "memory_drift_per_hour": memory_drift.drift(),
+                        "drifting": is_drifting or memory_drift.is_drifting(),
+                    }
+                )
+                logger.info(
+                    f"  {workload.name}: {summary['iterations']} iterations, "
+                    f"{summary['errors']} errors, {workload.skipped} skipped, "
+                    f"{workload.idle} idle, p99 "
+                    + (
+                        f"{summary['p99']:.4f}s"
+                        if summary["p99"] is not None
+                        else "N/A"
+                    )
+                    + (f" ({p99_drift:+.1%}/h)" if p99_drift is not None else "")
+                )
+            csvfile.flush()
+            if memory_drift.is_drifting() and "memory" not in drifting:
+                logger.warning(
+                    f"Load generator memory is drifting: {memory_drift.drift():+.1%} "
+                    f"per hour (limit {max_memory_drift:.0%}), RSS {rss / 1024**2:.1f} MiB"
+                )
+                drifting.add("memory")
+
+        async def report_periodically():
+            while True:
+                await asyncio.sleep(report_interval)
+                logger.info(
+                    f"Soak test at {(time.monotonic() - started) / 60:.0f} min, "
+                    f"RSS {process_memory() / 1024**2:.1f} MiB"
+                )
+                report()
+
+        async def refresh_app_ids_periodically():
+            while True:
+                await asyncio.sleep(app_ids_refresh_interval)
+                try:
+                    refreshed, _, _ = await fetch_all_app_ids(session)
+                except Exception as e:
+                    logger.warning(
+                        f"Refreshing the app IDs failed ({classify_error(e)}), "
+                        f"keeping {len(app_ids)}"
+                    )
+                    continue
+                app_ids[:] = refreshed
+
+        reporter = asyncio.create_task(report_periodically())
+        refresher = None
+        if app_ids_refresh_interval:
+            refresher = asyncio.create_task(refresh_app_ids_periodically())
+        try:
+            await asyncio.gather(*(workload.run(until) for workload in workloads))
+        finally:
+            reporter.cancel()
+            if refresher is not None:
+                refresher.cancel()
+            report()
+            csvfile.close()
+            request_samples.close()
+            await exporter.stop()
+
+    logger.info("Soak test summary:")
+    for workload in workloads:
+        drift = workload.p99_drift.drift()
+        logger.info(
+            f"  {workload.name}: {workload.iterations} iterations, "
+            f"errors {dict(workload.errors)}, {workload.skipped} skipped, "
+            f"{workload.idle} idle, p99 drift "
+            + (f"{drift:+.1%}/h" if drift is not None else "N/A")
+        )
+    drift = memory_drift.drift()
+    logger.info("  Memory drift " + (f"{drift:+.1%}/h" if drift is not None else "N/A"))
+    if drifting:
+        logger.warning(f"Drift detected: {', '.join(sorted(drifting))}")
+    return sorted(drifting)
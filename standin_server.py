@@ -0,0 +1,497 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+from graphql import build_schema, execute, parse, validate
+from graphql.error import GraphQLError
+
+logger = logging.getLogger(__name__)
+
+# The Saleor schema the dashboard queries are written against
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "graphql", "schema.graphql")
+
+DEFAULT_PORT = 8000
+
+# Errors returned for an unknown automatic persisted query hash and for any
+# hash when persisted queries are disabled, as Apollo servers do
+PERSISTED_QUERY_NOT_FOUND = "PersistedQueryNotFound"
+PERSISTED_QUERY_NOT_SUPPORTED = "PersistedQueryNotSupported"
+
+DELIVERY_STATUSES = ("FAILED", "PENDING", "SUCCESS")
+
+_schema = None
+
+
+def load_schema():
+    """Build the GraphQL schema once per process (takes about a second)"""
+    global _schema
+    if _schema is None:
+        with open(SCHEMA_PATH) as schema_file:
+            _schema = build_schema(schema_file.read())
+    return _schema
+
+
+def global_id(type_name, pk):
+    return base64.b64encode(f"{type_name}:{pk}".encode()).decode()
+
+
+def connection(nodes, first=None, after=None, prefix="cursor"):
+    """Relay connection over a list, cursors are base64 encoded list offsets"""
+    start = 0
+    if after:
+        start = int(base64.b64decode(after).decode().split(":")[1]) + 1
+    end = len(nodes) if first is None else min(start + first, len(nodes))
+    edges = [
+        {"node": node, "cursor": global_id(prefix, index)}
+        for index, node in enumerate(nodes[start:end], start=start)
+    ]
+    return {
+        "edges": edges,
+        "pageInfo": {
+            "hasNextPage": end < len(nodes),
+            "hasPreviousPage": start > 0,
+            "startCursor": edges[0]["cursor"] if edges else None,
+            "endCursor": edges[-1]["cursor"] if edges else None,
+        },
+        "totalCount": len(nodes),
+    }
+
+
+def every_nth(n):
+    """rate_limit / server_error policy selecting every nth request"""
+    return lambda request_number, operation: request_number % n == 0
+
+
+def operation_name_for(document, payload):
+    if payload.get("operationName"):
+        return payload["operationName"]
+    for definition in document.definitions:
+        if getattr(definition, "name", None):
+            return definition.name.value
+    return "anonymous"
+
+
+class StandinServer:
+    """
+    In-process stand-in for the Saleor GraphQL API, serving the app list,
+    plugins, webhook deliveries and the install/seeding/delivery retry
+    mutations from generated data. Queries are parsed and validated against
+    the real schema, so the parse cost saved by persisted queries is
+    measurable. Latency and 429 responses can
+    be injected for harness tests.
+
+    rate_limit is called with (request_number, operation_name) and returns
+    True when the request should be rejected with 429, server_error likewise
+    selects requests answered with 500. With change_every a
+    new failed delivery is added to a random app every that many requests,
+    so client caches see the app list change. A retried delivery gets a
+    PENDING attempt that fails after delivery_latency seconds, standing in
+    for the app's webhook handler.
+    """
+
+    def __init__(
+        self,
+        num_apps=100,
+        webhooks_per_app=1,
+        deliveries_per_webhook=6,
+        attempts_per_delivery=2,
+        num_plugins=20,
+        latency=0.0,
+        latency_jitter=0.0,
+        operation_latency=None,
+        rate_limit=None,
+        server_error=None,
+        change_every=0,
+        persisted_queries=True,
+        compression=True,
+        delivery_latency=0.0,
+    ):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.operation_latency = operation_latency or {}
+        self.rate_limit = rate_limit
+        self.server_error = server_error
+        self.change_every = change_every
+        self.delivery_latency = delivery_latency
+        self.persisted_queries = persisted_queries
+        self.compression = compression
+        self.webhooks_per_app = webhooks_per_app
+        self.deliveries_per_webhook = deliveries_per_webhook
+        self.attempts_per_delivery = attempts_per_delivery
+        self.persisted = {}
+        self.stats = {
+            "requests": 0,
+            "request_bytes": 0,
+            "parse_time": 0.0,
+            "persisted_hits": 0,
+            "persisted_misses": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "changes": 0,
+            "delivery_retries": 0,
+            "operations": {},
+        }
+        self._created = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self._next_pk = 1
+        self.apps = []
+        for _ in range(num_apps):
+            app = self.create_app(f"Stand-in app {self._next_pk}", "THIRDPARTY")
+            for _ in range(webhooks_per_app):
+                self.create_webhook(app, "https://example.com")
+        self.plugins = [
+            {
+                "id": f"plugin.{index}",
+                "name": f"Plugin {index}",
+                "description": "",
+                "globalConfiguration": {"active": index % 2 == 0},
+                "channelConfigurations": [],
+            }
+            for index in range(num_plugins)
+        ]
+        self.root = {
+            "apps": self.resolve_apps,
+            "app": self.resolve_app,
+            "webhook": self.resolve_webhook,
+            "plugins": self.resolve_plugins,
+            "appCreate": self.resolve_app_create,
+            "appInstall": self.resolve_app_install,
+            "webhookCreate": self.resolve_webhook_create,
+            "eventDeliveryRetry": self.resolve_event_delivery_retry,
+        }
+
+    def _timestamp(self, offset):
+        return (self._created + timedelta(seconds=offset)).isoformat()
+
+    def create_app(self, name, app_type):
+        pk = self._next_pk
+        self._next_pk += 1
+        app = {
+            "id": global_id("App", pk),
+            "name": name,
+            "created": self._timestamp(pk),
+            "isActive": True,
+            "type": app_type,
+            "brand": {"logo": {"default": lambda info, **args: f"/logo/{pk}.webp"}},
+            "webhooks": [],
+            "metadata": [],
+            "privateMetadata": [],
+            "tokens": [],
+            "extensions": [],
+            "permissions": [],
+        }
+        self.apps.append(app)
+        return app
+
+    def _delivery(self, pk, created, status, attempts):
+        return {
+            "id": global_id("EventDelivery", pk),
+            "createdAt": self._timestamp(created),
+            "status": status,
+            "eventType": "ORDER_CREATED",
+            "attempts": lambda info, first=None, after=None, **args: connection(
+                attempts, first, after
+            ),
+            "_attempts": attempts,
+        }
+
+    def add_failed_delivery(self, app):
+        """Add the newest delivery to the first webhook of app"""
+        webhook = app["webhooks"][0]
+        pk = self._next_pk
+        self._next_pk += 1
+        # Deliveries are kept newest first
+        webhook["_deliveries"].insert(0, self._delivery(pk, pk, "FAILED", []))
+        self.stats["changes"] += 1
+
+    def create_webhook(self, app, target_url, name=None):
+        pk = self._next_pk
+        self._next_pk += 1
+        deliveries = []
+        for index in range(self.deliveries_per_webhook):
+            status = DELIVERY_STATUSES[index % len(DELIVERY_STATUSES)]
+            attempts = [
+                {
+                    "id": global_id("EventDeliveryAttempt", f"{pk}-{index}-{attempt}"),
+                    "status": status,
+                    "createdAt": self._timestamp(pk + index + attempt),
+                }
+                for attempt in range(self.attempts_per_delivery)
+            ]
+            deliveries.append(
+                self._delivery(f"{pk}-{index}", pk + index, status, attempts)
+            )
+
+        def event_deliveries(info, first=None, after=None, filter=None, **args):
+            status = (filter or {}).get("status")
+            nodes = [d for d in deliveries if status is None or d["status"] == status]
+            return connection(nodes, first, after)
+
+        webhook = {
+            "id": global_id("Webhook", pk),
+            "name": name,
+            "isActive": True,
+            "app": app,
+            "targetUrl": target_url,
+            "syncEvents": [],
+            "asyncEvents": [],
+            "events": [],
+            "secretKey": "",
+            "subscriptionQuery": None,
+            "customHeaders": None,
+            "eventDeliveries": event_deliveries,
+            "_deliveries": deliveries,
+        }
+        app["webhooks"].append(webhook)
+        return webhook
+
+    def resolve_apps(self, info, first=None, after=None, **args):
+        return connection(self.apps, first, after, prefix="app")
+
+    def resolve_app(self, info, id=None, **args):
+        for app in self.apps:
+            if app["id"] == id:
+                return app
+        return None
+
+    def resolve_webhook(self, info, id=None, **args):
+        for app in self.apps:
+            for webhook in app["webhooks"]:
+                if webhook["id"] == id:
+                    return webhook
+        return None
+
+    def resolve_plugins(self, info, first=None, after=None, **args):
+        return connection(self.plugins, first, after, prefix="plugin")
+
+    def resolve_app_create(self, info, input, **args):
+        app = self.create_app(input.get("name"), "LOCAL")
+        return {"authToken": "stand-in-token", "app": app, "errors": []}
+
+    def resolve_app_install(self, info, input, **args):
+        pk = self._next_pk
+        self.create_app(input.get("appName"), "THIRDPARTY")
+        return {
+            "appInstallation": {
+                "id": global_id("AppInstallation", pk),
+                "status": "PENDING",
+                "appName": input.get("appName"),
+                "manifestUrl": input.get("manifestUrl"),
+            },
+            "errors": [],
+        }
+
+    def resolve_webhook_create(self, info, input, **args):
+        app = self.resolve_app(info, input.get("app"))
+        if app is None:
+            return {
+                "webhook": None,
+                "errors": [
+                    {"code": "NOT_FOUND", "field": "app", "message": "App not found"}
+                ],
+            }
+        webhook = self.create_webhook(app, input.get("targetUrl"), input.get("name"))
+        return {"webhook": webhook, "errors": []}
+
+    def resolve_event_delivery_retry(self, info, id, **args):
+        """
+        Record a new attempt, the stand-in does not call any webhook: the
+        attempt stays PENDING for delivery_latency seconds, then fails.
+        """
+        for app in self.apps:
+            for webhook in app["webhooks"]:
+                for delivery in webhook["_deliveries"]:
+                    if delivery["id"] != id:
+                        continue
+                    pk = self._next_pk
+                    self._next_pk += 1
+                    attempt = {
+                        "id": global_id("EventDeliveryAttempt", pk),
+                        "status": "FAILED",
+                        "createdAt": self._timestamp(pk),
+                    }
+                    if self.delivery_latency:
+                        attempt["status"] = "PENDING"
+                        asyncio.get_running_loop().call_later(
+                            self.delivery_latency, attempt.update, {"status": "FAILED"}
+                        )
+                    delivery["_attempts"].insert(0, attempt)
+                    self.stats["delivery_retries"] += 1
+                    return {"delivery": delivery, "errors": []}
+        return {
+            "delivery": None,
+            "errors": [
+                {"code": "NOT_FOUND", "field": "id", "message": "Delivery not found"}
+            ],
+        }
+
+    def _parse(self, query):
+        document = parse(query)
+        errors = validate(load_schema(), document)
+        if errors:
+            raise GraphQLError("; ".join(error.message for error in errors))
+        return document
+
+    def _resolve_document(self, payload):
+        """
+        Return the parsed document for a request, honouring automatic
+        persisted queries: a known hash skips parsing and validation, an
+        unknown hash without query text asks the client to register it.
+        """
+        persisted = (payload.get("extensions") or {}).get("persistedQuery")
+        if persisted and not self.persisted_queries:
+            raise GraphQLError(
+                PERSISTED_QUERY_NOT_SUPPORTED,
+                extensions={"code": "PERSISTED_QUERY_NOT_SUPPORTED"},
+            )
+        if persisted:
+            query_hash = persisted.get("sha256Hash")
+            query = payload.get("query")
+            if query is None:
+                document = self.persisted.get(query_hash)
+                if document is None:
+                    self.stats["persisted_misses"] += 1
+                    raise GraphQLError(
+                        PERSISTED_QUERY_NOT_FOUND,
+                        extensions={"code": "PERSISTED_QUERY_NOT_FOUND"},
+                    )
+                self.stats["persisted_hits"] += 1
+                return document
+            if hashlib.sha256(query.encode()).hexdigest() != query_hash:
+                raise GraphQLError("provided sha does not match query")
+            document = self._parse(query)
+            self.persisted[query_hash] = document
+            return document
+
+        if not payload.get("query"):
+            raise GraphQLError("Must provide query string.")
+        return self._parse(payload["query"])
+
+    async def handle_graphql(self, request):
+        body = await request.read()
+        self.stats["requests"] += 1
+        self.stats["request_bytes"] += len(body)
+        request_number = self.stats["requests"]
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return web.json_response(
+                {"errors": [{"message": "Invalid JSON"}]}, status=400
+            )
+
+        parse_start = time.perf_counter()
+        try:
+            document = self._resolve_document(payload)
+        except GraphQLError as e:
+            # Like Apollo, an unknown hash is a regular GraphQL error response
+            status = 200 if e.message.startswith("PersistedQuery") else 400
+            return self._response({"errors": [e.formatted]}, status)
+        except Exception as e:
+            return self._response({"errors": [{"message": str(e)}]}, 400)
+        parse_time = time.perf_counter() - parse_start
+        self.stats["parse_time"] += parse_time
+
+        operation = operation_name_for(document, payload)
+        operations = self.stats["operations"]
+        operations[operation] = operations.get(operation, 0) + 1
+
+        if self.change_every and request_number % self.change_every == 0:
+            apps_with_webhooks = [app for app in self.apps if app["webhooks"]]
+            if apps_with_webhooks:
+                self.add_failed_delivery(random.choice(apps_with_webhooks))
+
+        if self.rate_limit is not None and self.rate_limit(request_number, operation):
+            self.stats["rate_limited"] += 1
+            return web.Response(status=429, text="429 Too Many Requests")
+        if self.server_error is not None and self.server_error(
+            request_number, operation
+        ):
+            self.stats["server_errors"] += 1
+            return web.Response(status=500, text="500 Internal Server Error")
+
+        delay = self.operation_latency.get(operation, self.latency)
+        if self.latency_jitter:
+            delay += random.uniform(0, self.latency_jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        execute_start = time.perf_counter()
+        result = execute(
+            load_schema(),
+            document,
+            root_value=self.root,
+            variable_values=payload.get("variables"),
+            operation_name=payload.get("operationName"),
+        )
+        execute_time = time.perf_counter() - execute_start
+
+        response_body = {"data": result.data}
+        if result.errors:
+            response_body["errors"] = [error.formatted for error in result.errors]
+        response = self._response(response_body)
+        response.headers["Server-Timing"] = (
+            f"parse;dur={parse_time * 1000:.3f}, exec;dur={execute_time * 1000:.3f}"
+        )
+        return response
+
+    def _response(self, body, status=200):
+        response = web.json_response(body, status=status)
+        if self.compression:
+            response.enable_compression()
+        return response
+
+    async def handle_stats(self, request):
+        return web.json_response(self.stats)
+
+    def make_app(self):
+        app = web.Application(client_max_size=10 * 1024**2)
+        app.router.add_post("/graphql/", self.handle_graphql)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+    async def start(self, host="127.0.0.1", port=DEFAULT_PORT):
+        """Serve on host:port from the running event loop, returns the URL"""
+        load_schema()
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        # The bound port, port 0 picks a free one
+        port = self._runner.addresses[0][1]
+        return f"http://{host}:{port}/graphql/"
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+async def main(
+    host="127.0.0.1",
+    port=DEFAULT_PORT,
+    rate_limit_every=0,
+    server_error_every=0,
+    **options,
+):
+    if rate_limit_every:
+        options["rate_limit"] = every_nth(rate_limit_every)
+    if server_error_every:
+        options["server_error"] = every_nth(server_error_every)
+    server = StandinServer(**options)
+    url = await server.start(host, port)
+    logger.info(f"Stand-in Saleor API serving {len(server.apps)} apps on {url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    asyncio.run(main(port=int(os.environ.get("STANDIN_PORT", DEFAULT_PORT))))
@@ -0,0 +1,96 @@
+import statistics
+import time
+
+# Runs always executed before measurement starts
+WARMUP_RUNS = 0
+
+# Seconds of warm-up runs before measurement starts
+WARMUP_SECONDS = 0
+
+# Runs in the rolling median, and how many consecutive rolling medians have
+# to stay within STEADY_STATE_TOLERANCE of each other
+STEADY_STATE_WINDOW = 3
+STEADY_STATE_TOLERANCE = 0.1
+
+# Upper bound on warm-up runs when steady state is never detected
+MAX_WARMUP_RUNS = 20
+
+
+class SteadyStateDetector:
+    """
+    Detects the end of the warm-up phase from the total execution time of
+    consecutive runs: steady state is reached once the last `window` rolling
+    medians (each over `window` runs) differ by at most `tolerance` of their
+    median. Runs without a timing (rate limited or failed) are skipped.
+    """
+
+    def __init__(self, window=STEADY_STATE_WINDOW, tolerance=STEADY_STATE_TOLERANCE):
+        self.window = window
+        self.tolerance = tolerance
+        self.values = []
+        self.rolling_medians = []
+
+    def add(self, value):
+        """Add the timing of a run, returns True once steady state is reached"""
+        if value is not None:
+            self.values.append(value)
+            if len(self.values) >= self.window:
+                self.rolling_medians.append(
+                    statistics.median(self.values[-self.window :])
+                )
+        return self.is_steady()
+
+    def is_steady(self):
+        if len(self.rolling_medians) < self.window:
+            return False
+        recent = self.rolling_medians[-self.window :]
+        spread = max(recent) - min(recent)
+        return spread <= self.tolerance * statistics.median(recent)
+
+
+class WarmupController:
+    """
+    Decides whether the next benchmark run is still warm-up: at least
+    warmup_runs runs and warmup_seconds seconds, then, with steady_state,
+    until SteadyStateDetector reports stable timings (at most
+    max_warmup_runs runs in total).
+    """
+
+    def __init__(
+        self,
+        warmup_runs=WARMUP_RUNS,
+        warmup_seconds=WARMUP_SECONDS,
+        steady_state=False,
+        max_warmup_runs=MAX_WARMUP_RUNS,
+    ):
+        self.warmup_runs = warmup_runs
+        self.warmup_seconds = warmup_seconds
+        self.steady_state = steady_state
+        self.max_warmup_runs = max(max_warmup_runs, warmup_runs)
+        self.detector = SteadyStateDetector()
+        self.runs = 0
+        self.started = None
+        self.finished = False
+
+    def in_warmup(self):
+        """True when the next run should be a warm-up run"""
+        if self.finished:
+            return False
+        if self.started is None:
+            self.started = time.monotonic()
+        if self.runs < self.warmup_runs or (
+            time.monotonic() - self.started < self.warmup_seconds
+        ):
+            return True
+        if (
+            self.steady_state
+            and not self.detector.is_steady()
+            and self.runs < self.max_warmup_runs
+        ):
+            return True
+        self.finished = True
+        return False
+
+    def add_run(self, total_execution_time):
+        self.runs += 1
+        self.detector.add(total_execution_time)
@@ -0,0 +1,971 @@
+"""
+Self-tests of the benchmark harness against the in-process stand-in API:
+injected latencies and 429/500 patterns are the ground truth the measured
+timings, retry counts and error categories are checked against.
+"""
+
+import asyncio
+import csv
+import json
+import os
+import socket
+import statistics
+import time
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("gql")
+pytest.importorskip("aiohttp")
+
+import cursors_benchmark
+import distributed
+from app_list_cache import AppListCache
+import mass_create_webhook
+import mass_install
+import replay_requests
+import soak
+import virtual_users
+from aiohttp import web
+from gql import gql
+from gql.transport.exceptions import TransportQueryError
+
+from error_taxonomy import classify_error
+from graphql_http import CoalescingSession, MeasuredSession, ResponseStats
+from request_samples import RequestSamples
+from standin_server import StandinServer
+
+# Latency injected into every stand-in response (seconds)
+LATENCY = 0.05
+
+# Measured timings may exceed the injected latency by this much per
+# sequential request (local HTTP, parsing, harness) plus a fixed margin
+PER_REQUEST_SLACK = 0.025
+FIXED_SLACK = 0.15
+
+# Timed runs per case, the upper bound applies to the fastest one so a
+# scheduling hiccup on a busy machine does not fail the suite
+TIMED_RUNS = 3
+
+# Seconds of harness work allowed per request, without any I/O, exceeding
+# it only warns
+HARNESS_OVERHEAD_BUDGET = 0.001
+
+# A measured overhead this many times the median of the previous runs warns
+HARNESS_OVERHEAD_REGRESSION = 1.5
+
+# Previous runs the regression check compares against
+HARNESS_OVERHEAD_HISTORY_RUNS = 20
+
+
+def run_against_standin(scenario, **server_options):
+    """Run scenario(server, url) with a stand-in server on a free port"""
+
+    async def run():
+        server = StandinServer(**server_options)
+        url = await server.start("127.0.0.1", 0)
+        try:
+            return await scenario(server, url)
+        finally:
+            await server.stop()
+
+    return asyncio.run(run())
+
+
+def first_requests(operation, count):
+    """A rate_limit/server_error pattern hitting the first count requests of operation"""
+    seen = []
+
+    def pattern(request_number, name):
+        if name != operation:
+            return False
+        seen.append(request_number)
+        return len(seen) <= count
+
+    return pattern
+
+
+def assert_duration(measured, requests, latency=LATENCY):
+    """
+    Every measured time covers `requests` sequential requests of `latency`
+    seconds; the fastest one without more than the allowed slack.
+    """
+    expected = requests * latency
+    assert min(measured) >= expected
+    assert min(measured) <= expected + requests * PER_REQUEST_SLACK + FIXED_SLACK
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(cursors_benchmark, "BASE_BACKOFF_TIME", 0.01)
+    monkeypatch.setattr(cursors_benchmark, "MAX_BACKOFF_TIME", 0.05)
+    cursors_benchmark.live_metrics.reset()
+    cursors_benchmark.run_errors.clear()
+
+
+def test_fetch_all_cursors_walks_every_page():
+    async def scenario(server, url):
+        async with cursors_benchmark.MeasuredSession(url) as session:
+            cursors, rate_limited = await cursors_benchmark.fetch_all_cursors(session)
+        return cursors, rate_limited, server.stats["requests"]
+
+    cursors, rate_limited, requests = run_against_standin(scenario, num_apps=45)
+
+    # 5 full pages, then an empty page without an endCursor ends the walk
+    assert len(cursors) == 6
+    assert cursors[0] is None
+    assert len(set(cursors)) == 6
+    assert not rate_limited
+    assert requests == 6
+
+
+@pytest.mark.timing
+@pytest.mark.parametrize("page_concurrency", [10, 1])
+def test_run_timings_match_injected_latency(page_concurrency):
+    plugins_latency = 0.2
+
+    async def scenario(server, url):
+        return [
+            await cursors_benchmark.run_benchmark(
+                url, "token", page_concurrency=page_concurrency
+            )
+            for _ in range(TIMED_RUNS)
+        ]
+
+    results = run_against_standin(
+        scenario,
+        num_apps=45,
+        latency=LATENCY,
+        operation_latency={"Plugins": plugins_latency},
+    )
+
+    pages = results[0]["num_cursors"]
+    for result in results:
+        assert result["error"] is None
+        assert result["num_apps"] == 45
+        assert result["num_cursors"] == pages
+        # The plugins timer stops once the pages have arrived as well
+        assert result["plugins_fetch_time"] == pytest.approx(
+            result["data_fetch_time"], abs=0.01
+        )
+        assert result["total_execution_time"] == pytest.approx(
+            result["cursor_fetch_time"] + result["data_fetch_time"]
+        )
+
+    assert_duration([r["cursor_fetch_time"] for r in results], pages)
+    if page_concurrency >= pages:
+        # All pages in parallel, the plugins request is the slowest one
+        assert_duration([r["data_fetch_time"] for r in results], 1, plugins_latency)
+    else:
+        assert_duration([r["data_fetch_time"] for r in results], pages)
+
+
+def test_runs_return_the_same_apps():
+    async def scenario(server, url):
+        return [
+            await cursors_benchmark.run_benchmark(url, "token", retain_payloads=True)
+            for _ in range(2)
+        ]
+
+    first, second = run_against_standin(scenario, num_apps=45)
+
+    assert first["apps_checksum"] == second["apps_checksum"]
+    assert first["duplicate_apps"] == 0
+    assert first["num_deliveries"] == second["num_deliveries"] > 0
+
+
+def test_checksum_detects_duplicated_and_dropped_pages():
+    pages = [
+        [{"node": {"id": f"app-{page}-{index}"}} for index in range(10)]
+        for page in range(3)
+    ]
+
+    def checksum(*pages):
+        aggregator = cursors_benchmark.ResultAggregator()
+        for edges in pages:
+            aggregator.add_apps(edges)
+        return aggregator.apps_checksum
+
+    complete = checksum(*pages)
+    assert checksum(*reversed(pages)) == complete
+    assert checksum(*pages, pages[1]) != complete
+    assert checksum(pages[0], pages[1], pages[1], pages[1]) != checksum(*pages[:2])
+    assert checksum(*pages[:2]) != complete
+
+
+def test_app_cache_revalidates_with_one_cheap_request():
+    async def scenario(server, url):
+        cache = AppListCache()
+        runs = [await cursors_benchmark.run_benchmark(url, "token", app_cache=cache)]
+        runs.append(
+            await cursors_benchmark.run_benchmark(url, "token", app_cache=cache)
+        )
+        server.add_failed_delivery(server.apps[13])
+        runs.append(
+            await cursors_benchmark.run_benchmark(url, "token", app_cache=cache)
+        )
+        return runs, server.stats
+
+    (cold, warm, changed), stats = run_against_standin(
+        scenario, num_apps=45, latency=LATENCY
+    )
+
+    assert [r["app_cache"] for r in (cold, warm, changed)] == ["cold", "warm", "warm"]
+    assert cold["apps_checksum"] == warm["apps_checksum"] == changed["apps_checksum"]
+    # 45 apps fit into one AppChanges request, the cold visit records the baseline
+    assert stats["operations"]["AppChanges"] == 3
+    assert (warm["cache_hits"], warm["cache_misses"]) == (6, 0)
+    assert warm["num_requests"] == 2
+    # Stale pages are rendered before the revalidating AppChanges request
+    assert warm["stale_served"] == 6
+    assert warm["first_render_time"] < LATENCY <= warm["total_execution_time"]
+    assert cold["first_render_time"] == cold["total_execution_time"]
+    # Only the page holding the app with the new delivery is fetched again
+    assert (changed["cache_hits"], changed["cache_misses"]) == (5, 1)
+    assert changed["num_requests"] == 3
+
+
+def test_expired_app_cache_pages_are_not_rendered_stale():
+    async def scenario(server, url):
+        cache = AppListCache(stale_while_revalidate=0)
+        await cursors_benchmark.run_benchmark(url, "token", app_cache=cache)
+        return await cursors_benchmark.run_benchmark(url, "token", app_cache=cache)
+
+    warm = run_against_standin(scenario, num_apps=45, latency=LATENCY)
+
+    assert (warm["stale_served"], warm["cache_hits"], warm["cache_misses"]) == (0, 0, 6)
+    assert warm["first_render_time"] == warm["total_execution_time"]
+
+
+def test_app_cache_misses_a_retried_delivery():
+    async def scenario(server, url):
+        cache = AppListCache()
+        await cursors_benchmark.run_benchmark(url, "token", app_cache=cache)
+        app = server.apps[13]
+        pending = app["webhooks"][0]["_deliveries"][1]
+        server.resolve_event_delivery_retry(None, pending["id"])
+        warm = await cursors_benchmark.run_benchmark(url, "token", app_cache=cache)
+        return warm, pending, cache.apps[app["id"]]["node"]
+
+    warm, pending, cached = run_against_standin(scenario, num_apps=45)
+
+    # The retry only adds an attempt, the delivery itself stays pending
+    assert (warm["cache_hits"], warm["cache_misses"]) == (5, 1)
+    [served] = cached["webhooks"][0]["pendingDelivers"]["edges"][:1]
+    assert served["node"]["id"] == pending["id"]
+    assert len(served["node"]["attempts"]["edges"]) == len(pending["_attempts"]) == 3
+
+
+def test_app_cache_is_bounded_by_apps():
+    cache = AppListCache(max_apps=25)
+    for page in range(4):
+        edges = [{"node": {"id": f"app-{page}-{index}"}} for index in range(10)]
+        cache.store_page(f"page-{page}", edges, now=0)
+
+    assert len(cache.apps) <= 25
+    assert list(cache.pages) == ["page-2", "page-3"]
+    assert cache.state("page-3", now=0) == "fresh"
+    assert cache.state("page-0", now=0) is None
+
+
+def test_rate_limited_requests_are_retried_and_counted():
+    async def scenario(server, url):
+        async with cursors_benchmark.MeasuredSession(url) as session:
+            with pytest.raises(cursors_benchmark.RateLimitException) as raised:
+                await cursors_benchmark.execute_with_retry(
+                    session, cursors_benchmark.fetch_plugins_query
+                )
+        return raised.value, server.stats
+
+    error, stats = run_against_standin(
+        scenario, rate_limit=lambda request_number, operation: request_number <= 2
+    )
+
+    # The third attempt succeeds and its data is handed back with the exception
+    assert len(error.result["plugins"]["edges"]) == 20
+    assert stats["rate_limited"] == 2
+    assert stats["requests"] == 3
+    assert cursors_benchmark.run_errors == {"rate_limited": 2}
+    assert cursors_benchmark.live_metrics.rate_limited["Plugins"] == 2
+    assert cursors_benchmark.live_metrics.errors["Plugins", "rate_limited"] == 2
+
+
+def test_rate_limited_run_is_flagged_and_repeated():
+    async def scenario(server, url):
+        return await cursors_benchmark.run_benchmark_with_retry(url, "token")
+
+    result = run_against_standin(
+        scenario,
+        num_apps=45,
+        rate_limit=lambda request_number, operation: request_number == 2,
+    )
+
+    # The first run hit the 429 during the cursor walk and was repeated
+    assert cursors_benchmark.live_metrics.rate_limited["Apps"] == 1
+    assert result["error"] is None
+    assert not result["rate_limited_during_cursors"]
+    assert result["total_execution_time"] is not None
+    assert result["errors_rate_limited"] == 0
+
+
+def test_rate_limited_data_fetch_has_no_timing():
+    async def scenario(server, url):
+        return await cursors_benchmark.run_benchmark(url, "token")
+
+    result = run_against_standin(
+        scenario,
+        num_apps=45,
+        rate_limit=first_requests("Plugins", 1),
+    )
+
+    assert result["rate_limited_during_plugins"]
+    assert result["plugins_fetch_time"] is None
+    assert result["total_execution_time"] is None
+    assert result["errors_rate_limited"] == 1
+
+
+@pytest.mark.parametrize(
+    "server_options, category, failures",
+    [
+        (
+            {"server_error": lambda n, operation: operation == "Plugins"},
+            "server_error",
+            1,
+        ),
+        (
+            {"rate_limit": lambda n, operation: operation == "Plugins"},
+            "rate_limited",
+            3,
+        ),
+    ],
+)
+def test_failed_runs_are_classified(monkeypatch, server_options, category, failures):
+    monkeypatch.setattr(cursors_benchmark, "MAX_RETRIES", 2)
+
+    async def scenario(server, url):
+        return await cursors_benchmark.run_benchmark(url, "token")
+
+    result = run_against_standin(scenario, num_apps=45, **server_options)
+
+    assert result["error"] is not None
+    assert result["error_category"] == category
+    assert result[f"errors_{category}"] == failures
+    assert cursors_benchmark.live_metrics.errors["Plugins", category] == failures
+
+
+@pytest.mark.parametrize(
+    "error, category",
+    [
+        ({"message": "Too many requests, slow down"}, "rate_limited"),
+        ({"message": "Request was throttled."}, "rate_limited"),
+        ({"message": "429"}, "rate_limited"),
+        (
+            {"message": "Throttled", "extensions": {"code": "GRAPHQL_ERROR"}},
+            "graphql_error",
+        ),
+        ({"message": "Slow down", "extensions": {"code": "THROTTLED"}}, "rate_limited"),
+        ({"message": "Field not found"}, "graphql_error"),
+    ],
+)
+def test_graphql_errors_are_classified(error, category):
+    assert (
+        classify_error(TransportQueryError(error["message"], errors=[error]))
+        == category
+    )
+
+
+class ThrottlingSession:
+    """Answers the first requests with a code-less throttling error at HTTP 200"""
+
+    def __init__(self, throttled, data):
+        self.throttled = throttled
+        self.data = data
+        self.requests = 0
+
+    async def execute_measured(self, document, variable_values=None):
+        self.requests += 1
+        if self.requests <= self.throttled:
+            raise TransportQueryError(
+                "Too many requests", errors=[{"message": "Too many requests"}]
+            )
+        return self.data, ResponseStats(200, "gzip", 100, 100, 0.0, 100, 0.0)
+
+
+@pytest.mark.parametrize(
+    "status, category",
+    [(401, "permission_denied"), (403, "permission_denied"), (408, "timeout")],
+)
+def test_error_statuses_with_graphql_bodies_are_classified(status, category):
+    async def respond(request):
+        return web.json_response(
+            {"errors": [{"message": "Request failed"}]}, status=status
+        )
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/graphql/", respond)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        url = f"http://127.0.0.1:{runner.addresses[0][1]}/graphql/"
+        try:
+            async with MeasuredSession(url, {}) as session:
+                await session.execute(cursors_benchmark.fetch_plugins_query)
+        except Exception as e:
+            return e
+        finally:
+            await runner.cleanup()
+
+    assert classify_error(asyncio.run(run())) == category
+
+
+def test_code_less_throttling_errors_are_retried():
+    session = ThrottlingSession(2, {"plugins": {"edges": []}})
+
+    with pytest.raises(cursors_benchmark.RateLimitException) as raised:
+        asyncio.run(
+            cursors_benchmark.execute_with_retry(
+                session, cursors_benchmark.fetch_plugins_query
+            )
+        )
+
+    assert raised.value.result == {"plugins": {"edges": []}}
+    assert session.requests == 3
+    assert cursors_benchmark.run_errors == {"rate_limited": 2}
+
+
+def test_error_rate_from_runs_without_samples():
+    benchmark_report = pytest.importorskip("benchmark_report")
+    results = [
+        {"run_start": 1.0, "num_requests": 10, "errors_rate_limited": 0},
+        {"run_start": 4.0, "num_requests": 10, "errors_rate_limited": 2},
+        {"run_start": 12.0, "num_requests": 20, "errors_rate_limited": 5},
+    ]
+
+    rows, errors = benchmark_report.run_error_rate_series(
+        benchmark_report.results_to_arrays(results), interval=10
+    )
+
+    assert errors == ["rate_limited"]
+    assert [(row["start"], row["requests"], row["errors"]) for row in rows] == [
+        (0, 20, 2),
+        (10, 20, 5),
+    ]
+    assert rows[1]["error_rate"] == pytest.approx(0.25)
+
+
+def test_run_types_leave_out_warm_up_runs():
+    benchmark_report = pytest.importorskip("benchmark_report")
+    timings = {
+        "cursor_fetch_time": 0.1,
+        "data_fetch_time": 0.2,
+        "total_execution_time": 0.3,
+    }
+    results = [
+        {"phase": "warmup", "rate_limited_during_cursors": True, **timings},
+        {"phase": "warmup", "error": "timeout"},
+        {"phase": "warmup", **timings},
+        {"rate_limited_during_data": True, **timings},
+        {"error": "server_error"},
+        {**timings},
+    ]
+
+    counts = benchmark_report.run_type_counts(
+        benchmark_report.results_to_arrays(results)
+    )
+
+    assert counts == {
+        "Clean Runs": 1,
+        "Rate Limited (Cursors)": 0,
+        "Rate Limited (Data)": 1,
+        "Error Runs": 1,
+    }
+
+
+def test_benchmark_main_writes_measured_runs(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+
+    async def scenario(server, url):
+        return await cursors_benchmark.main(
+            url, "token", num_runs=2, warmup_runs=1, graphs=False
+        )
+
+    results = run_against_standin(scenario, num_apps=25)
+
+    assert [r["phase"] for r in results] == ["warmup", "measured", "measured"]
+    assert [r["run_number"] for r in results] == [1, 2, 3]
+    assert all(r["num_apps"] == 25 for r in results)
+    assert [r["run_start"] for r in results] == sorted(r["run_start"] for r in results)
+    assert len(list(tmp_path.glob("benchmark_results_*.csv"))) == 1
+
+
+def test_strategies_and_compression_modes_are_crossed(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    # Two modes and two fetch variants, which the same index would pair up
+    monkeypatch.setattr(cursors_benchmark, "COMPRESSION_MODES", ("none", "gzip"))
+    monkeypatch.setattr(cursors_benchmark, "check_compression", lambda mode: None)
+
+    async def scenario(server, url):
+        return await cursors_benchmark.main(
+            url,
+            "token",
+            num_runs=4,
+            compression="all",
+            fetch_strategy="all",
+            batch_sizes=(25,),
+            graphs=False,
+        )
+
+    results = run_against_standin(scenario, num_apps=25)
+
+    assert {(r["compression"], r["fetch_strategy"]) for r in results} == {
+        ("none", "cursors"),
+        ("none", "batched"),
+        ("gzip", "cursors"),
+        ("gzip", "batched"),
+    }
+
+
+def test_concurrent_users_share_identical_requests():
+    async def scenario(server, url):
+        return await virtual_users.run_round(url, "token", "single-flight", users=5)
+
+    result = run_against_standin(scenario, num_apps=25, latency=LATENCY)
+
+    assert result["failed_users"] == 0
+    assert result["sent_requests"] < result["user_requests"]
+    assert result["coalesced"] == result["user_requests"] - result["sent_requests"]
+
+
+def test_equal_documents_are_coalesced():
+    async def scenario(server, url):
+        async with MeasuredSession(url, {}) as session:
+            client = CoalescingSession(session)
+            # Parsed separately, as a per-request gql() call would
+            await asyncio.gather(
+                client.execute(gql(cursors_benchmark.PLUGINS_QUERY)),
+                client.execute(gql(cursors_benchmark.PLUGINS_QUERY)),
+            )
+            return client.coalesced, sum(server.stats["operations"].values())
+
+    coalesced, received = run_against_standin(scenario, latency=LATENCY)
+
+    assert coalesced == 1
+    assert received == 1
+
+
+def test_coalesced_callers_retry_when_the_leader_is_cancelled():
+    async def scenario(server, url):
+        async with MeasuredSession(url, {}) as session:
+            client = CoalescingSession(session)
+            query = cursors_benchmark.fetch_plugins_query
+            leader = asyncio.create_task(client.execute(query))
+            await asyncio.sleep(0.01)
+            waiter = asyncio.create_task(client.execute(query))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await waiter, sum(server.stats["operations"].values())
+
+    data, received = run_against_standin(scenario, num_plugins=3, latency=LATENCY)
+
+    assert len(data["plugins"]["edges"]) == 3
+    assert received == 2
+
+
+def test_persisted_queries_send_hashes_after_one_miss():
+    requests = 10
+
+    async def scenario(server, url):
+        sessions = {}
+        for persisted_queries in (False, True):
+            async with MeasuredSession(
+                url, {}, persisted_queries=persisted_queries
+            ) as session:
+                for _ in range(requests):
+                    await session.execute(cursors_benchmark.fetch_plugins_query)
+            sessions[persisted_queries] = session
+        return sessions[False], sessions[True], server.stats
+
+    plain, persisted, stats = run_against_standin(scenario, num_plugins=3)
+
+    # Only the first hash is unknown, the query text is sent once to register it
+    assert stats["persisted_misses"] == 1
+    assert stats["persisted_hits"] == requests - 1
+    assert persisted.persisted_query_misses == 1
+    assert persisted.requests == requests + 1
+    assert persisted.request_bytes < plain.request_bytes
+    assert persisted.server_parse_time < plain.server_parse_time
+
+
+@pytest.mark.parametrize(
+    "compression, encoding", [("gzip", "gzip"), ("none", "identity")]
+)
+def test_response_bytes_are_counted_before_and_after_decompression(
+    compression, encoding
+):
+    async def scenario(server, url):
+        async with MeasuredSession(url, {}, compression) as session:
+            data, stats = await session.execute_measured(
+                cursors_benchmark.fetch_plugins_query
+            )
+        return data, stats, session
+
+    data, stats, session = run_against_standin(scenario, num_plugins=50)
+
+    assert len(data["plugins"]["edges"]) == 50
+    assert stats.encoding == encoding
+    assert stats.uncompressed_bytes == len(json.dumps({"data": data}))
+    if compression == "none":
+        assert stats.compressed_bytes == stats.uncompressed_bytes
+    else:
+        assert stats.compressed_bytes < stats.uncompressed_bytes
+    assert session.compressed_bytes == stats.compressed_bytes
+    assert session.uncompressed_bytes == stats.uncompressed_bytes
+
+
+@pytest.mark.parametrize(
+    "timestamp",
+    ["2024-06-10T06:13:20", "2024-06-10T06:13:20Z", "2024-06-10T08:13:20+02:00"],
+)
+def test_replay_timestamps_without_offset_are_utc(timestamp):
+    assert replay_requests.parse_timestamp(timestamp) == 1718000000.0
+
+
+def write_request_log(path, timestamps):
+    """Write a replay log sending PLUGINS_QUERY at each recorded timestamp"""
+    with open(path, "w") as log_file:
+        for timestamp in timestamps:
+            entry = {"timestamp": timestamp, "query": cursors_benchmark.PLUGINS_QUERY}
+            log_file.write(json.dumps(entry) + "\n")
+
+
+@pytest.mark.timing
+def test_replay_keeps_the_scaled_inter_arrival_times(tmp_path):
+    log_path = tmp_path / "requests.jsonl"
+    write_request_log(log_path, [1718000000.0 + 0.2 * index for index in range(5)])
+
+    async def scenario(server, url):
+        start = time.perf_counter()
+        result = await replay_requests.replay(url, "token", log_path, speed=2.0)
+        return result, time.perf_counter() - start
+
+    result, elapsed = run_against_standin(scenario, latency=LATENCY)
+    latencies, errors, late_dispatches, _ = result
+
+    # 0.8s of recorded spacing at 2x speed, plus the last response
+    assert len(latencies["Plugins"]) == 5
+    assert not errors
+    assert late_dispatches == 0
+    assert elapsed >= 0.4 + LATENCY
+    assert elapsed <= 0.4 + LATENCY + PER_REQUEST_SLACK + FIXED_SLACK
+
+
+def test_replay_waits_for_max_in_flight_requests(tmp_path):
+    log_path = tmp_path / "requests.jsonl"
+    write_request_log(log_path, [1718000000.0] * 6)
+
+    async def scenario(server, url):
+        start = time.perf_counter()
+        result = await replay_requests.replay(url, "token", log_path, max_in_flight=2)
+        return result, time.perf_counter() - start
+
+    result, elapsed = run_against_standin(scenario, latency=LATENCY)
+    latencies, errors, late_dispatches, max_dispatch_delay = result
+
+    # Six simultaneous requests go out two at a time, the last two wait for
+    # two responses each
+    assert len(latencies["Plugins"]) == 6
+    assert not errors
+    assert late_dispatches == 4
+    assert max_dispatch_delay >= 2 * LATENCY
+    assert elapsed >= 3 * LATENCY
+
+
+def test_samples_flushed_without_a_file_are_reported(caplog):
+    samples = RequestSamples()
+    samples.record("Apps", time.perf_counter(), 0.01)
+    samples.record("Apps", time.perf_counter(), 0.02)
+    samples.flush()
+    samples.record("Apps", time.perf_counter(), 0.03)
+    samples.flush()
+
+    logged = [r for r in caplog.records if r.levelname == "WARNING"]
+    assert len(logged) == 1
+    assert "discarding 2 samples" in logged[0].getMessage()
+
+
+def test_mass_install_counts_failures():
+    async def scenario(server, url):
+        result = await mass_install.main(url, "token", count=6, concurrency=2, delay=0)
+        return result, server.stats
+
+    result, stats = run_against_standin(
+        scenario,
+        num_apps=0,
+        server_error=lambda request_number, operation: request_number % 3 == 0,
+    )
+
+    assert result == {"count": 6, "successful": 4, "errors": {"server_error": 2}}
+    assert stats["operations"] == {"AppInstall": 6}
+
+
+def test_seed_webhooks_counts_failures():
+    async def scenario(server, url):
+        result = await mass_create_webhook.main(
+            url, "token", count=3, concurrency=1, delay=0
+        )
+        return result, server
+
+    # Requests alternate AppCreate, WebhookCreate, the second webhook fails
+    result, server = run_against_standin(
+        scenario,
+        num_apps=0,
+        server_error=lambda request_number, operation: request_number == 4,
+    )
+
+    assert result == {"count": 3, "successful": 2, "errors": {"server_error": 1}}
+    assert len(server.apps) == 3
+    assert sum(len(app["webhooks"]) for app in server.apps) == 2
+
+
+def test_distributed_seeding_merges_metrics_and_reports_failed_agents(
+    monkeypatch, tmp_path
+):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(distributed, "START_DELAY", 0.1)
+    monkeypatch.delenv("AUTH_TOKEN", raising=False)
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    coordinator = f"127.0.0.1:{port}"
+
+    async def agent(name, url, token):
+        while True:
+            try:
+                return await distributed.run_agent(coordinator, name, url, token)
+            except ConnectionRefusedError:
+                await asyncio.sleep(0.05)
+
+    async def scenario(server, url):
+        result, *_ = await asyncio.gather(
+            distributed.main(
+                "install",
+                {"count": 4, "concurrency": 2, "delay": 0},
+                listen=coordinator,
+                remote_agents=2,
+            ),
+            agent("working", url, "token"),
+            # No token, the job fails before sending any request
+            agent("broken", url, None),
+        )
+        return result
+
+    result = run_against_standin(scenario, num_apps=0)
+
+    assert result["count"] == 2
+    assert result["successful"] == 2
+    assert [name for name, _ in result["failed_agents"]] == ["broken"]
+    [histograms] = tmp_path.glob("install_histograms_*.csv")
+    assert histograms.read_text().splitlines()[1].startswith("AppInstall,2,")
+    [failed] = tmp_path.glob("install_failed_agents_*.csv")
+    assert "broken" in failed.read_text()
+
+
+def test_distributed_results_survive_a_disconnected_agent(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(distributed, "START_DELAY", 0.1)
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    coordinator = f"127.0.0.1:{port}"
+
+    async def connect():
+        while True:
+            try:
+                return await asyncio.open_connection("127.0.0.1", port)
+            except ConnectionRefusedError:
+                await asyncio.sleep(0.05)
+
+    async def crashing_agent():
+        """Answers the clock probe, then drops the connection on the job"""
+        reader, writer = await connect()
+        await distributed.send(writer, {"type": "hello", "name": "crashing"})
+        await distributed.receive(reader)
+        await distributed.send(writer, {"type": "clock", "time": time.time()})
+        await distributed.receive(reader)
+        writer.close()
+
+    async def working_agent(url):
+        while True:
+            try:
+                return await distributed.run_agent(coordinator, "working", url, "token")
+            except ConnectionRefusedError:
+                await asyncio.sleep(0.05)
+
+    async def scenario(server, url):
+        result, *_ = await asyncio.gather(
+            distributed.main(
+                "install",
+                {"count": 4, "concurrency": 2, "delay": 0},
+                listen=coordinator,
+                remote_agents=2,
+            ),
+            crashing_agent(),
+            working_agent(url),
+        )
+        return result
+
+    result = run_against_standin(scenario, num_apps=0)
+
+    assert (result["count"], result["successful"]) == (2, 2)
+    [(name, error)] = result["failed_agents"]
+    assert name == "crashing"
+    assert error.startswith("Disconnected")
+
+
+def test_delivery_retry_waits_for_the_webhook_handler():
+    handler_latency = 0.3
+
+    async def scenario(server, url):
+        server.add_failed_delivery(server.apps[1])
+        async with cursors_benchmark.MeasuredSession(url) as session:
+            start = time.perf_counter()
+            retried = await soak.retry_failed_delivery(
+                session, server.apps[1]["id"], poll_interval=0.05
+            )
+            elapsed = time.perf_counter() - start
+            idle = await soak.retry_failed_delivery(session, server.apps[0]["id"])
+        return retried, elapsed, idle, server
+
+    retried, elapsed, idle, server = run_against_standin(
+        scenario,
+        num_apps=2,
+        deliveries_per_webhook=0,
+        delivery_latency=handler_latency,
+    )
+
+    delivery = server.apps[1]["webhooks"][0]["_deliveries"][0]
+    assert retried == delivery["id"]
+    assert delivery["_attempts"][0]["status"] == "FAILED"
+    assert elapsed >= handler_latency
+    assert idle == soak.IDLE
+    assert server.stats["delivery_retries"] == 1
+
+
+def test_idle_iterations_are_not_measured():
+    results = iter([soak.IDLE, None, soak.IDLE])
+
+    async def iteration():
+        return next(results)
+
+    workload = soak.FixedRateWorkload(
+        "deliveries", iteration, 0.1, 1, soak.RollingWindow(), None
+    )
+    asyncio.run(workload.run(time.monotonic() + 0.25))
+
+    assert (workload.iterations, workload.idle, workload.skipped) == (1, 2, 0)
+    assert workload.window.summary()["iterations"] == 1
+
+
+def test_soak_writes_request_samples_to_a_file(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+
+    async def scenario(server, url):
+        await soak.main(
+            url,
+            "token",
+            duration=0.5,
+            app_list_interval=0.2,
+            delivery_interval=0.2,
+            report_interval=10,
+        )
+
+    run_against_standin(scenario, num_apps=15)
+
+    [samples] = tmp_path.glob("soak_samples_*.bin")
+    assert samples.stat().st_size > 0
+    assert not cursors_benchmark.request_samples._buffer
+
+
+def test_paused_samples_record_nothing():
+    samples = RequestSamples()
+    with samples.paused():
+        samples.record("Apps", time.perf_counter(), 0.01)
+    samples.record("Apps", time.perf_counter(), 0.02)
+
+    assert samples.count == 1
+
+
+class InstantSession:
+    """Answers every query immediately, so only the harness's own work is timed"""
+
+    def __init__(self, data):
+        self.data = data
+        self.stats = ResponseStats(200, "gzip", 1000, 5000, 0.0, 200, 0.0)
+
+    async def execute_measured(self, document, variable_values=None):
+        return self.data, self.stats
+
+
+def overhead_history_file(config):
+    """
+    CSV the harness overhead of every run is appended to:
+    $HARNESS_OVERHEAD_HISTORY, or harness/overhead.csv in the pytest cache
+    """
+    if os.environ.get("HARNESS_OVERHEAD_HISTORY"):
+        return Path(os.environ["HARNESS_OVERHEAD_HISTORY"])
+    return config.cache.mkdir("harness") / "overhead.csv"
+
+
+def record_overhead(path, overhead):
+    """Append overhead to the history and return the previous values"""
+    previous = []
+    if path.exists():
+        with open(path, newline="") as csvfile:
+            previous = [
+                float(row["overhead_seconds"]) for row in csv.DictReader(csvfile)
+            ]
+    new_file = not path.exists()
+    with open(path, "a", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        if new_file:
+            writer.writerow(["timestamp", "overhead_seconds"])
+        writer.writerow([datetime.now(timezone.utc).isoformat(), overhead])
+    return previous
+
+
+def test_harness_overhead_per_request(record_property, pytestconfig):
+    requests = 2000
+    edges = [{"node": {"id": f"app-{index}", "webhooks": []}} for index in range(10)]
+    session = InstantSession({"apps": {"edges": edges}})
+    aggregator = cursors_benchmark.ResultAggregator()
+    semaphore = asyncio.Semaphore(10)
+
+    async def fetch_pages():
+        start = time.perf_counter()
+        for _ in range(requests):
+            await cursors_benchmark.fetch_page_data(
+                session, None, semaphore, aggregator
+            )
+        return (time.perf_counter() - start) / requests
+
+    overhead = min(asyncio.run(fetch_pages()) for _ in range(3))
+    record_property("harness_overhead_per_request_seconds", overhead)
+    previous = record_overhead(overhead_history_file(pytestconfig), overhead)
+
+    assert aggregator.num_apps == 3 * requests * 10
+    # Machine speed varies too much on shared CI to fail on it
+    if overhead >= HARNESS_OVERHEAD_BUDGET:
+        warnings.warn(
+            f"Harness overhead {overhead * 1000:.3f}ms per request exceeds "
+            f"the {HARNESS_OVERHEAD_BUDGET * 1000:.3f}ms budget"
+        )
+    if previous:
+        median = statistics.median(previous[-HARNESS_OVERHEAD_HISTORY_RUNS:])
+        if overhead > median * HARNESS_OVERHEAD_REGRESSION:
+            warnings.warn(
+                f"Harness overhead {overhead * 1000:.3f}ms per request regressed "
+                f"from a median of {median * 1000:.3f}ms over the previous runs"
+            )
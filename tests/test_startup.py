@@ -0,0 +1,61 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Seconds the CLI may add on top of a bare interpreter start
+CLI_STARTUP_BUDGET = 0.3
+
+
+def run_python(*args):
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, *args], cwd=ROOT, check=True, capture_output=True, text=True
+    )
+    return time.perf_counter() - start
+
+
+def best_of(runs, *args):
+    return min(run_python(*args) for _ in range(runs))
+
+
+@pytest.mark.timing
+def test_cli_help_startup_time(record_property):
+    baseline = best_of(3, "-c", "pass")
+    startup = best_of(3, "app_stress_test.py", "--help")
+    record_property("cli_startup_seconds", startup)
+    record_property("interpreter_startup_seconds", baseline)
+
+    assert startup - baseline < CLI_STARTUP_BUDGET
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "cursors_benchmark",
+        "mass_install",
+        "mass_create_webhook",
+        "replay_requests",
+        "soak",
+        "virtual_users",
+    ],
+)
+def test_tools_do_not_import_plotting_libraries(module):
+    pytest.importorskip("gql")
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, {module}; "
+            "print(sorted({'matplotlib', 'numpy'} & set(sys.modules)))",
+        ],
+        cwd=ROOT,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import os
+import statistics
+import time
+from collections import Counter
+from datetime import datetime
+
+from cursors_benchmark import (
+    COMPRESSION,
+    PAGE_CONCURRENCY,
+    ResultAggregator,
+    fetch_all_cursors,
+    fetch_page_data,
+    fetch_plugins_data,
+    request_samples,
+    save_results_to_csv,
+)
+from error_taxonomy import classify_error
+from graphql_http import CoalescingSession, MeasuredSession, check_compression
+
+logger = logging.getLogger(__name__)
+
+# Dashboard users loading the app list at the same time in every round
+VIRTUAL_USERS = 20
+
+# Rounds in total, the modes are interleaved between rounds
+NUM_ROUNDS = 9
+
+# Seconds over which the users of a round start, evenly spread
+STAGGER = 0.0
+
+# Seconds the shared cache keeps results in the "cache" mode
+COALESCE_TTL = 5.0
+
+# baseline: every request is sent through the shared backend session,
+# single-flight: identical in-flight requests are sent once,
+# cache: single-flight plus reusing results for COALESCE_TTL seconds
+MODES = ("baseline", "single-flight", "cache")
+
+
+async def user_visit(session, page_concurrency):
+    """
+    One dashboard visit: walk the cursors, then load all pages and the
+    plugins concurrently. Returns (seconds, aggregator).
+    """
+    aggregator = ResultAggregator()
+    start = time.perf_counter()
+    cursors, _ = await fetch_all_cursors(session)
+    semaphore = asyncio.Semaphore(page_concurrency)
+    await asyncio.gather(
+        *(
+            fetch_page_data(session, cursor, semaphore, aggregator)
+            for cursor in cursors
+        ),
+        fetch_plugins_data(session, aggregator),
+    )
+    return time.perf_counter() - start, aggregator
+
+
+async def run_round(
+    url,
+    token,
+    mode,
+    users=VIRTUAL_USERS,
+    stagger=STAGGER,
+    ttl=COALESCE_TTL,
+    page_concurrency=PAGE_CONCURRENCY,
+    compression=COMPRESSION,
+):
+    """
+    Run users concurrent visits through one shared session and return the
+    traffic the users asked for and the traffic that was actually sent.
+    """
+    headers = {"Authorization": f"Bearer {token}"}
+    async with MeasuredSession(url, headers, compression) as session:
+        client = session
+        if mode != "baseline":
+            client = CoalescingSession(session, ttl if mode == "cache" else 0)
+
+        async def user(index):
+            await asyncio.sleep(stagger * index / users)
+            return await user_visit(client, page_concurrency)
+
+        visits = await asyncio.gather(
+            *(user(index) for index in range(users)), return_exceptions=True
+        )
+
+    # Cancelled visits come back as CancelledError, a BaseException
+    errors = Counter(
+        classify_error(visit) for visit in visits if isinstance(visit, BaseException)
+    )
+    times = sorted(visit[0] for visit in visits if not isinstance(visit, BaseException))
+    checksums = {
+        visit[1].apps_checksum
+        for visit in visits
+        if not isinstance(visit, BaseException)
+    }
+    if len(checksums) > 1:
+        logger.warning(f"Users saw {len(checksums)} different app lists")
+
+    requests = client.requests if mode != "baseline" else session.requests
+    return {
+        "mode": mode,
+        "users": users,
+        "stagger": stagger,
+        "ttl": ttl if mode == "cache" else 0,
+        "user_requests": requests,
+        "sent_requests": session.requests,
+        "coalesced": client.coalesced if mode != "baseline" else 0,
+        "cache_hits": client.cache_hits if mode != "baseline" else 0,
+        "duplicate_fraction": (1 - session.requests / requests if requests else None),
+        "response_bytes": session.uncompressed_bytes,
+        "response_bytes_compressed": session.compressed_bytes,
+        "request_bytes": session.request_bytes,
+        "median_visit_time": statistics.median(times) if times else None,
+        "p99_visit_time": (
+            times[min(len(times) - 1, int(len(times) * 0.99))] if times else None
+        ),
+        "failed_users": sum(errors.values()),
+        "error_categories": ";".join(
+            f"{category}={count}" for category, count in sorted(errors.items())
+        ),
+    }
+
+
+def mode_summary(results):
+    """Medians per mode and the traffic each mode saves against the baseline"""
+    by_mode = {}
+    for result in results:
+        by_mode.setdefault(result["mode"], []).append(result)
+    summary = {}
+    for mode, rounds in by_mode.items():
+        visit_times = [
+            r["median_visit_time"] for r in rounds if r["median_visit_time"] is not None
+        ]
+        summary[mode] = {
+            "sent_requests": statistics.median(r["sent_requests"] for r in rounds),
+            "response_bytes_compressed": statistics.median(
+                r["response_bytes_compressed"] for r in rounds
+            ),
+            "median_visit_time": (
+                statistics.median(visit_times) if visit_times else None
+            ),
+        }
+    baseline = summary.get("baseline")
+    for values in summary.values():
+        values["requests_saved"] = (
+            1 - values["sent_requests"] / baseline["sent_requests"]
+            if baseline and baseline["sent_requests"]
+            else None
+        )
+        values["bytes_saved"] = (
+            1
+            - values["response_bytes_compressed"]
+            / baseline["response_bytes_compressed"]
+            if baseline and baseline["response_bytes_compressed"]
+            else None
+        )
+    return summary
+
+
+async def main(
+    url=None,
+    token=None,
+    users=VIRTUAL_USERS,
+    rounds=NUM_ROUNDS,
+    stagger=STAGGER,
+    ttl=COALESCE_TTL,
+    page_concurrency=PAGE_CONCURRENCY,
+    compression=COMPRESSION,
+):
+    check_compression(compression)
+    url = url or os.environ.get("SALEOR_GRAPHQL_URL", "http://localhost:8000/graphql/")
+    token = token or os.environ.get("AUTH_TOKEN")
+
+    modes = MODES if ttl else MODES[:2]
+    results = []
+    for round_number in range(1, rounds + 1):
+        mode = modes[(round_number - 1) % len(modes)]
+        logger.info(f"\nRound {round_number}/{rounds}: {users} users, {mode}")
+        # The visits reuse the benchmark's fetch functions, which would
+        # buffer a sample of every request without a file to write them to
+        with request_samples.paused():
+            result = await run_round(
+                url, token, mode, users, stagger, ttl, page_concurrency, compression
+            )
+        result["round"] = round_number
+        results.append(result)
+        logger.info(
+            f"  {result['user_requests']} requests from users, "
+            f"{result['sent_requests']} sent ({result['coalesced']} coalesced, "
+            f"{result['cache_hits']} cached), "
+            f"{result['response_bytes_compressed'] / 1024:.1f} KiB received"
+        )
+        if result["median_visit_time"] is not None:
+            logger.info(f"  Median visit: {result['median_visit_time']:.4f}s")
+        if result["failed_users"]:
+            logger.error(
+                f"  {result['failed_users']} users failed: {result['error_categories']}"
+            )
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    save_results_to_csv(results, f"virtual_users_{timestamp}.csv")
+
+    summary = mode_summary(results)
+    logger.info("Duplicate traffic a shared-cache backend eliminates:")
+    for mode, values in summary.items():
+        logger.info(
+            f"  {mode}: {values['sent_requests']:.0f} requests"
+            + (
+                f" ({values['requests_saved']:.0%} fewer)"
+                if values["requests_saved"]
+                else ""
+            )
+            + f", {values['response_bytes_compressed'] / 1024:.1f} KiB"
+            + (f" ({values['bytes_saved']:.0%} less)" if values["bytes_saved"] else "")
+            + (
+                f", median visit {values['median_visit_time']:.4f}s"
+                if values["median_visit_time"] is not None
+                else ""
+            )
+        )
+    return summary